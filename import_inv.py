@@ -0,0 +1,113 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import argparse
+import logging
+import pathlib
+import sys
+
+# jbs.logging is imported to create the root logger before the other
+# modules are imported otherwise they get a different root logger.
+import jbs.logging
+import jbs.config as config
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.importer as importer
+
+scriptpath = pathlib.Path(__file__).resolve().parent
+
+default_database = scriptpath.joinpath('3D_Models.db')
+default_config = scriptpath.joinpath('config.json')
+
+
+def print_progress(report: importer.ImportReport) -> None:
+    print(
+        f"\r{report.rows} rows read, {report.added} added, "
+        f"{report.error_count} errors",
+        end='',
+        flush=True
+        )
+
+
+def main() -> None:
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.NOTSET)
+
+    parser = argparse.ArgumentParser(
+        description="Import models, artists or sources from a CSV or "
+            "JSON Lines file."
+        )
+    parser.add_argument('file', type=pathlib.Path, help="File to import")
+    parser.add_argument(
+        '-t', '--type',
+        choices=importer.RECORD_TYPES,
+        default='model',
+        help="What the rows in the file are"
+        )
+    parser.add_argument(
+        '-f', '--format',
+        choices=importer.FILE_FORMATS,
+        help="File format, taken from the file extension if not given"
+        )
+    parser.add_argument(
+        '-c', '--chunk-size',
+        type=int,
+        default=dbqueries.BULK_CHUNK_SIZE,
+        help="Rows written per transaction"
+        )
+    parser.add_argument(
+        '-d', '--database',
+        type=pathlib.Path,
+        help="Database to import into"
+        )
+    args = parser.parse_args()
+
+    configuration = {}
+    if default_config.exists():
+        configuration = config.get_config(config_file=default_config)
+
+    if args.database:
+        database = args.database
+    elif default_database.exists():
+        database = default_database
+    elif 'database' in configuration:
+        database = configuration['database']
+    else:
+        print("No Database Found")
+        sys.exit(1)
+
+    logger.info(f"Importing {args.file} into {database}")
+    connection = db.connect_database(
+        database=database,
+        settings=configuration.get('sqlite')
+        )
+    try:
+        report = importer.import_file(
+            connection=connection,
+            data_file=args.file,
+            record_type=args.type,
+            file_format=args.format,
+            chunk_size=args.chunk_size,
+            progress=print_progress
+            )
+    except (OSError, ValueError) as e:
+        logger.error(e)
+        print(e)
+        sys.exit(1)
+    finally:
+        db.close_database(connection=connection)
+
+    print()
+    if report.created_artists or report.created_sources:
+        print(
+            f"Created {report.created_artists} artists and "
+            f"{report.created_sources} sources"
+            )
+    for line, message in report.errors:
+        print(f"Line {line}: {message}")
+    if report.error_count > len(report.errors):
+        print(f"... {report.error_count - len(report.errors)} more errors")
+
+if __name__ == '__main__':
+    main()
@@ -26,21 +26,3 @@ def get_config(config_file: os.PathLike) -> dict:
     logger.debug(config_file)
 
     return config
-
-
-def get_update_version(update_version_file: os.PathLike) -> int:
-    """gets the schema update version from a specified JSON file
-
-    Args:
-        update_version_file: A path to the schema update verion file.
-
-    Returns:
-        integer: an integer with the version of the up to date schema
-    """
-    with open(file=update_version_file, mode='r') as version_temp:
-        schema_version = json.load(version_temp)
-
-    logger.info('Opened schema config file')
-    logger.debug(update_version_file)
-
-    return schema_version['version']
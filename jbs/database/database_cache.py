@@ -0,0 +1,201 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import logging
+import sqlite3
+import sys
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+
+class NameCache:
+    """A two way map between the names and IDs of artists or sources.
+
+    The whole table is read the first time the cache is used. Names
+    that aren't in the cache are looked up in the database once, in
+    case another program added them, and remembered if they exist.
+
+    Attributes:
+        table: The table the names are in.
+        id_column: The ID column of the table.
+        name_column: The name column of the table.
+        ids: Names mapped to IDs.
+        names: IDs mapped to names.
+        loaded: Whether the table has been read since the last
+            invalidate.
+        hits: Lookups answered from the cache.
+        misses: Lookups that had to query the database.
+    """
+    def __init__(self, table: str, id_column: str, name_column: str):
+        self.table = table
+        self.id_column = id_column
+        self.name_column = name_column
+        self.ids = {}
+        self.names = {}
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def load(self, connection: sqlite3.Connection) -> None:
+        """Reads every name and ID from the table.
+
+        Args:
+            connection: A sqlite database connection.
+        """
+        try:
+            cur = connection.cursor()
+            cur.execute(
+                f'SELECT {self.name_column}, {self.id_column} '
+                f'FROM {self.table};'
+                )
+            rows = cur.fetchall()
+        except sqlite3.Error as e:
+            logger.error(e)
+            sys.exit(1)
+
+        with self.lock:
+            self.ids = dict(rows)
+            self.names = {row_id: name for name, row_id in rows}
+            self.loaded = True
+        logger.debug(f"Cached {len(rows)} names from {self.table}")
+
+    def get_id(self, connection: sqlite3.Connection, name: str) -> Optional[int]:
+        """Gets the ID for a name.
+
+        Args:
+            connection: A sqlite database connection.
+            name: The artist or source name.
+
+        Returns:
+            The ID or None if there is no row with the name.
+        """
+        with self.lock:
+            if not self.loaded:
+                self.misses += 1
+                self.load(connection=connection)
+                return self.ids.get(name)
+            if name in self.ids:
+                self.hits += 1
+                return self.ids[name]
+            self.misses += 1
+
+            try:
+                cur = connection.cursor()
+                cur.execute(
+                    f'SELECT {self.id_column} FROM {self.table} '
+                    f'WHERE {self.name_column} = :name;', {'name': name}
+                    )
+                result = cur.fetchone()
+            except sqlite3.Error as e:
+                logger.error(e)
+                sys.exit(1)
+
+            if result is None:
+                return None
+            self.add(name=name, row_id=result[0])
+            return result[0]
+
+    def get_name(self, connection: sqlite3.Connection, row_id: int) -> Optional[str]:
+        """Gets the name for an ID.
+
+        Args:
+            connection: A sqlite database connection.
+            row_id: The artist or source ID.
+
+        Returns:
+            The name or None if there is no row with the ID.
+        """
+        with self.lock:
+            if not self.loaded:
+                self.misses += 1
+                self.load(connection=connection)
+                return self.names.get(row_id)
+            if row_id in self.names:
+                self.hits += 1
+                return self.names[row_id]
+            self.misses += 1
+
+            try:
+                cur = connection.cursor()
+                cur.execute(
+                    f'SELECT {self.name_column} FROM {self.table} '
+                    f'WHERE {self.id_column} = :id;', {'id': row_id}
+                    )
+                result = cur.fetchone()
+            except sqlite3.Error as e:
+                logger.error(e)
+                sys.exit(1)
+
+            if result is None:
+                return None
+            self.add(name=result[0], row_id=row_id)
+            return result[0]
+
+    def get_ids(self, connection: sqlite3.Connection) -> dict[str, int]:
+        """Returns a copy of the name to ID map.
+
+        Args:
+            connection: A sqlite database connection.
+        """
+        with self.lock:
+            if self.loaded:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.load(connection=connection)
+            return dict(self.ids)
+
+    def add(self, name: str, row_id: int) -> None:
+        """Remembers a name and ID, e.g. after inserting a row."""
+        with self.lock:
+            self.ids[name] = row_id
+            self.names[row_id] = name
+
+    def remove(self, row_id: int) -> None:
+        """Forgets an ID and its name, e.g. after deleting a row."""
+        with self.lock:
+            name = self.names.pop(row_id, None)
+            if name is not None and self.ids.get(name) == row_id:
+                del self.ids[name]
+
+    def invalidate(self) -> None:
+        """Empties the cache so the table is read again on next use."""
+        with self.lock:
+            self.ids = {}
+            self.names = {}
+            self.loaded = False
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit and miss counts and the number of names."""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.ids)}
+
+
+class LookupCache:
+    """The name caches for one database.
+
+    Attributes:
+        artists: The cache for tblArtist.
+        sources: The cache for tblSource.
+    """
+    def __init__(self):
+        self.artists = NameCache(
+            table='tblArtist',
+            id_column='Artist_ID',
+            name_column='Artist_Name'
+            )
+        self.sources = NameCache(
+            table='tblSource',
+            id_column='Source_ID',
+            name_column='Source_Name'
+            )
+
+    def invalidate(self) -> None:
+        """Empties both caches."""
+        self.artists.invalidate()
+        self.sources.invalidate()
@@ -0,0 +1,175 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import contextlib
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from typing import Iterator, Optional
+
+import jbs.database.database_cache as dbcache
+import jbs.database.database_snapshot as dbsnapshot
+import jbs.database.database_utils as db
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Number of read only connections kept open at most
+READ_POOL_SIZE = 4
+
+
+class ConnectionManager:
+    """Hands out connections to one database file.
+
+    There is a single writer connection, which is only ever used by one
+    thread at a time, and a pool of read only connections. In WAL mode
+    readers see the last committed data while a write is running, so a
+    background export and a search don't block each other.
+
+    An in-memory database can't be shared between connections, so for
+    those the readers use the writer connection instead.
+
+    The manager also holds the artist and source name cache and the
+    artist and source snapshots for the database, which are shared by
+    all of its connections.
+    """
+    def __init__(
+        self,
+        database: os.PathLike,
+        settings: Optional[dict] = None,
+        pool_size: int = READ_POOL_SIZE
+        ):
+        """Opens the writer connection.
+
+        Args:
+            database: A path to the sqlite database file.
+            settings: The "sqlite" section of the config file, if any.
+            pool_size: The number of read only connections kept open at
+                most.
+        """
+        self.database = database
+        self.settings = db.get_sqlite_settings(settings=settings)
+        self.pool_size = pool_size
+        self.in_memory = str(database) in ('', ':memory:')
+
+        self.write_lock = threading.RLock()
+        self.pool = queue.LifoQueue()
+        self.pool_lock = threading.Lock()
+        self.opened = 0
+        self.closed = False
+        self.lookups = dbcache.LookupCache()
+        self.snapshot = dbsnapshot.DataSnapshot(connections=self)
+
+        # The writer is opened first so that WAL mode is set before
+        # any reader connects.
+        self.write_connection = db.connect_database(
+            database=self.database,
+            settings=self.settings,
+            check_same_thread=False
+            )
+
+        # PRAGMA data_version only changes for commits made by other
+        # connections, so a connection that never writes is kept to
+        # notice the commits of the writer and of other programs.
+        self.version_lock = threading.Lock()
+        self.version_connection = None
+        if not self.in_memory:
+            self.version_connection = db.connect_database(
+                database=self.database,
+                settings=self.settings,
+                read_only=True,
+                check_same_thread=False
+                )
+
+    def data_version(self) -> tuple:
+        """Returns a value that changes whenever data is committed.
+
+        Two calls return the same value only if nothing was committed
+        to the database in between, by this program or any other.
+        """
+        if self.in_memory:
+            return ('memory', self.write_connection.total_changes)
+
+        with self.version_lock:
+            try:
+                cur = self.version_connection.cursor()
+                cur.execute('PRAGMA data_version;')
+                return ('file', cur.fetchone()[0])
+            except sqlite3.Error as e:
+                logger.error(e)
+                sys.exit(1)
+
+    @contextlib.contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Borrows the writer connection.
+
+        Other threads wait until the connection is given back, so
+        writes are always serialized.
+        """
+        with self.write_lock:
+            yield self.write_connection
+
+    @contextlib.contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a read only connection from the pool.
+
+        A new connection is opened while the pool is smaller than
+        pool_size, otherwise this waits for another thread to give one
+        back.
+        """
+        if self.in_memory:
+            with self.writer() as connection:
+                yield connection
+            return
+
+        connection = self.checkout()
+        try:
+            yield connection
+        finally:
+            if self.closed:
+                db.close_database(connection=connection)
+            else:
+                self.pool.put(connection)
+
+    def checkout(self) -> sqlite3.Connection:
+        """Takes a connection from the pool, opening one if allowed."""
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.pool_lock:
+            open_new = self.opened < self.pool_size
+            if open_new:
+                self.opened += 1
+        if open_new:
+            logger.debug("Opening read only connection")
+            return db.connect_database(
+                database=self.database,
+                settings=self.settings,
+                read_only=True,
+                check_same_thread=False
+                )
+
+        return self.pool.get()
+
+    def close(self) -> None:
+        """Closes the writer and the idle read only connections.
+
+        Connections that are borrowed at the time are closed when they
+        are given back.
+        """
+        self.closed = True
+        while True:
+            try:
+                db.close_database(connection=self.pool.get_nowait())
+            except queue.Empty:
+                break
+        with self.version_lock:
+            db.close_database(connection=self.version_connection)
+        with self.write_lock:
+            db.close_database(connection=self.write_connection)
@@ -0,0 +1,294 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import logging
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+import jbs.database.database_connections as dbconnections
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Number of threads running read only jobs
+READ_WORKERS = 2
+
+
+class Job:
+    """A database call waiting for or running on the executor.
+
+    Attributes:
+        func: The function to call. It receives a connection as the
+            connection keyword argument, unless it is a background job.
+        kwargs: The other keyword arguments for func.
+        callback: Called on the GUI thread with the result.
+        error_callback: Called on the GUI thread with the exception if
+            func raised one.
+        read_only: Whether the job runs on a read only connection.
+        connection: The connection the job is running on, if any.
+        cancelled: Whether the job was cancelled.
+        done: Whether the job's callbacks have been handled.
+        result: The value returned by func.
+        error: The exception raised by func, if any.
+    """
+    def __init__(
+        self,
+        func: Callable,
+        kwargs: dict,
+        callback: Optional[Callable[[Any], None]],
+        error_callback: Optional[Callable[[BaseException], None]],
+        read_only: bool = False
+        ):
+        self.func = func
+        self.kwargs = kwargs
+        self.callback = callback
+        self.error_callback = error_callback
+        self.read_only = read_only
+        self.connection = None
+        self.cancelled = False
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class DatabaseExecutor:
+    """Runs database calls on worker threads.
+
+    Jobs that write run one at a time, in the order they were
+    submitted, on the connection manager's writer connection. Read only
+    jobs run on a few more threads with pooled read only connections,
+    so a search doesn't have to wait for an import to finish. Long jobs
+    that don't use the database, like reading a network share, run on
+    a background thread of their own, so they never hold up the
+    database threads. Finished jobs are queued until the GUI thread
+    calls process_results, usually from a root.after loop, so that
+    callbacks are always run on the thread that owns the Tk widgets.
+    """
+    def __init__(
+        self,
+        connections: dbconnections.ConnectionManager,
+        read_workers: int = READ_WORKERS
+        ):
+        """Starts the worker threads.
+
+        Args:
+            connections: The connection manager for the database.
+            read_workers: The number of threads for read only jobs.
+        """
+        self.connections = connections
+        self.write_requests = queue.Queue()
+        self.read_requests = queue.Queue()
+        self.background_requests = queue.Queue()
+        self.results = queue.Queue()
+        self.lock = threading.Lock()
+        self.waiting = 0
+
+        self.threads = [threading.Thread(
+            target=self.run,
+            args=(self.write_requests, self.connections.writer),
+            name='database-writer',
+            daemon=True
+            )]
+        for number in range(read_workers):
+            self.threads.append(threading.Thread(
+                target=self.run,
+                args=(self.read_requests, self.connections.reader),
+                name=f'database-reader-{number}',
+                daemon=True
+                ))
+        self.threads.append(threading.Thread(
+            target=self.run,
+            args=(self.background_requests, None),
+            name='background',
+            daemon=True
+            ))
+        for thread in self.threads:
+            thread.start()
+
+    def run(self, requests: queue.Queue, borrow: Callable) -> None:
+        """Runs jobs from a queue until shutdown is called.
+
+        Args:
+            requests: The queue of jobs for this thread.
+            borrow: The connection manager method that lends the
+                connection for a job, None for jobs without one.
+        """
+        logger.info(f"{threading.current_thread().name} started")
+
+        while True:
+            job = requests.get()
+            if job is None:
+                break
+
+            if job.cancelled:
+                self.results.put(job)
+                continue
+
+            try:
+                if borrow is None:
+                    job.result = job.func(**job.kwargs)
+                else:
+                    with borrow() as connection:
+                        with self.lock:
+                            job.connection = connection
+                            # A job cancelled while it waited for its
+                            # connection had nothing to interrupt yet
+                            cancelled = job.cancelled
+                        if not cancelled:
+                            job.result = job.func(connection=connection, **job.kwargs)
+            # The query functions call sys.exit on database errors, so
+            # SystemExit is caught here and raised again on the GUI
+            # thread unless the job was cancelled.
+            except BaseException as e:
+                job.error = e
+            finally:
+                with self.lock:
+                    job.connection = None
+
+            self.results.put(job)
+
+        logger.info(f"{threading.current_thread().name} stopped")
+
+    def submit(
+        self,
+        func: Callable,
+        callback: Optional[Callable[[Any], None]] = None,
+        error_callback: Optional[Callable[[BaseException], None]] = None,
+        read_only: bool = False,
+        **kwargs
+        ) -> Job:
+        """Queues a database call.
+
+        Args:
+            func: The function to call with connection and kwargs.
+            callback: Called on the GUI thread with the result.
+            error_callback: Called on the GUI thread with the exception
+                if func raised one. Without it the exception is raised
+                from process_results.
+            read_only: Runs func on a read only connection, alongside
+                other read only jobs and the current write.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The job, which can be passed to cancel.
+        """
+        job = Job(
+            func=func,
+            kwargs=kwargs,
+            callback=callback,
+            error_callback=error_callback,
+            read_only=read_only
+            )
+        with self.lock:
+            self.waiting += 1
+        if read_only:
+            self.read_requests.put(job)
+        else:
+            self.write_requests.put(job)
+
+        return job
+
+    def submit_background(
+        self,
+        func: Callable,
+        callback: Optional[Callable[[Any], None]] = None,
+        error_callback: Optional[Callable[[BaseException], None]] = None,
+        **kwargs
+        ) -> Job:
+        """Queues a long call that doesn't use the database.
+
+        Background jobs run one at a time on their own thread, without
+        a connection, so a scan or hashing that takes minutes doesn't
+        keep the read only threads from running searches. Their
+        callbacks are run by process_results like those of database
+        jobs. Cancelling a running background job only stops its
+        callbacks, func has to be told to stop some other way.
+
+        Args:
+            func: The function to call with kwargs.
+            callback: Called on the GUI thread with the result.
+            error_callback: Called on the GUI thread with the exception
+                if func raised one. Without it the exception is raised
+                from process_results.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The job, which can be passed to cancel.
+        """
+        job = Job(
+            func=func,
+            kwargs=kwargs,
+            callback=callback,
+            error_callback=error_callback
+            )
+        with self.lock:
+            self.waiting += 1
+        self.background_requests.put(job)
+
+        return job
+
+    def cancel(self, job: Optional[Job]) -> None:
+        """Cancels a job.
+
+        A queued job is skipped. A running job is stopped with
+        sqlite3.Connection.interrupt. In both cases its callbacks are
+        never run.
+
+        Args:
+            job: The job returned by submit. None is ignored.
+        """
+        if job is None:
+            return
+        with self.lock:
+            job.cancelled = True
+            if job.connection is not None:
+                logger.debug("Interrupting running query")
+                job.connection.interrupt()
+
+    def pending(self) -> int:
+        """Returns the number of jobs that haven't been processed yet."""
+        with self.lock:
+            return self.waiting
+
+    def process_results(self) -> None:
+        """Runs the callbacks of the finished jobs.
+
+        Has to be called from the GUI thread.
+        """
+        while True:
+            try:
+                job = self.results.get_nowait()
+            except queue.Empty:
+                return
+
+            with self.lock:
+                self.waiting -= 1
+            job.done = True
+
+            if job.cancelled:
+                continue
+            if job.error is not None:
+                if job.error_callback:
+                    job.error_callback(job.error)
+                else:
+                    raise job.error
+            elif job.callback:
+                job.callback(job.result)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Stops the worker threads after the queued jobs have run.
+
+        The connection manager is left open.
+
+        Args:
+            timeout: Seconds to wait for each worker thread.
+        """
+        self.write_requests.put(None)
+        # The writer is the first thread and the background one the last
+        for _ in self.threads[1:-1]:
+            self.read_requests.put(None)
+        self.background_requests.put(None)
+        for thread in self.threads:
+            thread.join(timeout=timeout)
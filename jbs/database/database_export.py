@@ -0,0 +1,238 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import csv
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import sys
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'sql')
+
+# Number of rows pulled from the cursor at a time
+EXPORT_BATCH_SIZE = 1000
+
+# The column names match the attributes of the inventory objects so
+# that exported files can be imported again.
+EXPORT_COLUMNS = {
+    'model': (
+        'id', 'model', 'set', 'artist', 'source', 'source_note',
+        'supports', 'format', 'folder', 'printed'
+        ),
+    'artist': ('id', 'name', 'website', 'email', 'folder'),
+    'source': ('id', 'name', 'website'),
+    }
+
+EXPORT_QUERIES = {
+    'model': (
+        'SELECT Model_ID, Model_Name, Set_Name, Artist_Name, Source_Name, '
+            'Source_Note, Supports, Format, Artist_Folder, Printed '
+        'FROM tblModel AS m '
+        'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
+        'INNER JOIN tblSource AS s ON m.Source = s.Source_ID '
+        'ORDER BY Model_ID;'
+        ),
+    'artist': (
+        'SELECT Artist_ID, Artist_Name, Artist_Website, Artist_Email, '
+            'Artist_Folder '
+        'FROM tblArtist '
+        'ORDER BY Artist_ID;'
+        ),
+    'source': (
+        'SELECT Source_ID, Source_Name, Source_Website '
+        'FROM tblSource '
+        'ORDER BY Source_ID;'
+        ),
+    }
+
+EXPORT_TABLES = {'model': 'tblModel', 'artist': 'tblArtist', 'source': 'tblSource'}
+
+# Columns stored as 0/1 that are exported as booleans
+BOOLEAN_COLUMNS = {'model': ('supports', 'printed')}
+
+
+def fetch_batches(
+    cursor: sqlite3.Cursor,
+    batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[list]:
+    """Yields the rows of an executed cursor batch_size rows at a time."""
+    while rows := cursor.fetchmany(batch_size):
+        yield rows
+
+
+def export_records(
+    connection: sqlite3.Connection,
+    record_type: str,
+    batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[tuple]:
+    """Streams models, artists or sources straight from the database.
+
+    Boolean columns are converted from 0/1 so the rows keep the same
+    types as the inventory objects.
+
+    Args:
+        connection: A sqlite database connection.
+        record_type: One of model, artist, or source.
+        batch_size: The number of rows fetched from the cursor at once.
+
+    Yields:
+        One tuple per row in the order of EXPORT_COLUMNS.
+    """
+    columns = EXPORT_COLUMNS[record_type]
+    flags = [columns.index(name) for name in BOOLEAN_COLUMNS.get(record_type, ())]
+
+    cur = connection.cursor()
+    cur.execute(EXPORT_QUERIES[record_type])
+    for rows in fetch_batches(cursor=cur, batch_size=batch_size):
+        for row in rows:
+            if flags:
+                row = list(row)
+                for index in flags:
+                    row[index] = bool(row[index])
+                row = tuple(row)
+            yield row
+
+
+def export_sql(
+    connection: sqlite3.Connection,
+    record_type: str,
+    batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[str]:
+    """Streams a table as SQL statements that recreate it.
+
+    Unlike the other formats this dumps the table as it is stored, with
+    artist and source IDs instead of names, so it can be loaded back
+    into a SQLite database.
+
+    Args:
+        connection: A sqlite database connection.
+        record_type: One of model, artist, or source.
+        batch_size: The number of rows fetched from the cursor at once.
+
+    Yields:
+        One SQL statement per line.
+    """
+    table = EXPORT_TABLES[record_type]
+    cur = connection.cursor()
+    cur.execute(
+        'SELECT sql FROM sqlite_master '
+        'WHERE type = "table" AND name = :table;', {'table': table}
+        )
+    create_statement = cur.fetchone()[0]
+    cur.execute(f'SELECT name FROM pragma_table_info("{table}");')
+    columns = [row[0] for row in cur.fetchall()]
+
+    yield 'BEGIN TRANSACTION;'
+    yield f'{create_statement};'
+    # quote() formats every value as a SQL literal of its own type
+    cur.execute(
+        f'SELECT \'INSERT INTO "{table}" VALUES(\' || '
+        + " || ',' || ".join(f'quote("{column}")' for column in columns)
+        + f' || \');\' FROM "{table}";'
+        )
+    for rows in fetch_batches(cursor=cur, batch_size=batch_size):
+        for row in rows:
+            yield row[0]
+    yield 'COMMIT;'
+
+
+def export_table(
+    connection: sqlite3.Connection,
+    record_type: str,
+    export_file: os.PathLike,
+    export_format: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+    """Writes models, artists or sources from the database to a file.
+
+    Rows are streamed from the cursor with fetchmany and written as
+    they arrive, so memory use does not depend on the size of the
+    table.
+
+    Args:
+        connection: A sqlite database connection.
+        record_type: One of model, artist, or source.
+        export_file: The file to write.
+        export_format: csv, jsonl or sql, taken from the file suffix if
+            None.
+        batch_size: The number of rows fetched from the cursor at once.
+        progress: Called with the number of rows written after every
+            batch.
+
+    Returns:
+        The number of rows written.
+    """
+    if export_format is None:
+        export_format = pathlib.Path(export_file).suffix.lstrip('.').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {export_format}")
+    if record_type not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown record type {record_type}")
+
+    columns = EXPORT_COLUMNS[record_type]
+    written = 0
+
+    logger.info(f"Exporting {record_type}s to {export_file}")
+    try:
+        with open(file=export_file, mode='w', newline='', encoding='utf-8') as export:
+            match export_format:
+                case 'csv':
+                    writer = csv.writer(
+                        export,
+                        delimiter=',',
+                        quotechar='"',
+                        quoting=csv.QUOTE_MINIMAL
+                        )
+                    writer.writerow(columns)
+                    rows = export_records(
+                        connection=connection,
+                        record_type=record_type,
+                        batch_size=batch_size
+                        )
+                    for row in rows:
+                        writer.writerow(row)
+                        written += 1
+                        if progress and not written % batch_size:
+                            progress(written)
+                case 'jsonl':
+                    rows = export_records(
+                        connection=connection,
+                        record_type=record_type,
+                        batch_size=batch_size
+                        )
+                    for row in rows:
+                        export.write(json.dumps(dict(zip(columns, row))))
+                        export.write('\n')
+                        written += 1
+                        if progress and not written % batch_size:
+                            progress(written)
+                case 'sql':
+                    statements = export_sql(
+                        connection=connection,
+                        record_type=record_type,
+                        batch_size=batch_size
+                        )
+                    for statement in statements:
+                        export.write(statement)
+                        export.write('\n')
+                        if statement.startswith('INSERT'):
+                            written += 1
+                            if progress and not written % batch_size:
+                                progress(written)
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+    if progress:
+        progress(written)
+    logger.info(f"Exported {written} {record_type}s")
+
+    return written
@@ -0,0 +1,539 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import dataclasses
+import json
+import logging
+import sqlite3
+import sys
+from typing import Iterable, Optional
+
+import jbs.database.database_queries as dbqueries
+import jbs.inventory as inv
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Number of scanned directories written per transaction
+DIRECTORY_BATCH_SIZE = 500
+
+# The directories below the ones matching a condition, and those
+# directories themselves. Used as a subquery, so the rowcount of the
+# DELETE it is in is still set.
+SUBTREE_QUERY = (
+    '(WITH RECURSIVE subtree(id) AS ('
+        'SELECT Directory_ID FROM tblDirectory WHERE {where} '
+        'UNION ALL '
+        'SELECT d.Directory_ID FROM tblDirectory AS d '
+        'INNER JOIN subtree ON d.Parent = subtree.id) '
+    'SELECT id FROM subtree)'
+    )
+
+FILE_QUERY = (
+    'SELECT File_ID, File_Path, Artist, Model, File_Size, File_Modified, '
+        'File_Extension '
+    'FROM tblFile'
+    )
+
+
+@dataclasses.dataclass(slots=True)
+class ScannedDirectory:
+    """A directory that was read by a scan.
+
+    Attributes:
+        path: The full path of the directory.
+        artist: The id of the artist whose folder it is in.
+        parent: The path of the directory it is in, None for an artist
+            folder.
+        modified: When the directory was last modified, in nanoseconds.
+        inode: The inode or file index of the directory.
+        files: The model files in the directory.
+        subdirectories: The paths of the directories in it.
+    """
+    path: str
+    artist: int
+    parent: Optional[str]
+    modified: int
+    inode: int
+    files: list[inv.ModelFile]
+    subdirectories: list[str]
+
+
+@dataclasses.dataclass(slots=True)
+class FileHash:
+    """The content hashes of a model file.
+
+    Attributes:
+        file: The id of the file.
+        path: The full path of the file.
+        size: The size of the file in bytes when it was hashed, or when
+            it was scanned if it hasn't been hashed.
+        modified: When the file was last modified, in nanoseconds, as
+            of the same time as size.
+        partial: The hash of the start and end of the file, None if it
+            hasn't been hashed.
+        full: The hash of the whole file, None if it hasn't been hashed.
+    """
+    file: int
+    path: str
+    size: int
+    modified: int
+    partial: Optional[str] = None
+    full: Optional[str] = None
+
+
+def file_row(cursor: sqlite3.Cursor, row: tuple) -> inv.ModelFile:
+    """Row factory that builds a model file object from a file query row."""
+    return inv.ModelFile(*row)
+
+
+def get_artist_folders(connection: sqlite3.Connection) -> list[tuple[int, str]]:
+    """Gets the folder of every artist that has one.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        (artist ID, folder) pairs.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT Artist_ID, Artist_Folder '
+            'FROM tblArtist '
+            "WHERE TRIM(IFNULL(Artist_Folder, '')) != '';"
+            )
+        folders = cur.fetchall()
+
+        logger.debug(f"Query returned {len(folders)} artist folders")
+
+        return folders
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_model_names(connection: sqlite3.Connection) -> dict[int, list[tuple[int, str]]]:
+    """Gets the names of every artist's models.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        (model ID, name) pairs by artist ID.
+    """
+    names = {}
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT Artist, Model_ID, Model_Name '
+            'FROM tblModel '
+            'WHERE Model_Name IS NOT NULL '
+            'ORDER BY Model_ID;'
+            )
+        for artist_id, model_id, name in dbqueries.fetch_objects(cursor=cur):
+            names.setdefault(artist_id, []).append((model_id, name))
+
+        return names
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_files(connection: sqlite3.Connection) -> list[inv.ModelFile]:
+    """Returns every model file in the database, in path order.
+
+    Args:
+        connection: A sqlite database connection.
+    """
+    try:
+        cur = connection.cursor()
+        cur.row_factory = file_row
+        cur.execute(FILE_QUERY + ' ORDER BY File_Path;')
+        files = cur.fetchall()
+
+        logger.debug(f"Query returned {len(files)} files")
+
+        return files
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_model_files(
+    connection: sqlite3.Connection,
+    model_id: int
+    ) -> list[inv.ModelFile]:
+    """Returns the files linked to a model, in path order.
+
+    Args:
+        connection: A sqlite database connection.
+        model_id: The ID of the model.
+    """
+    try:
+        cur = connection.cursor()
+        cur.row_factory = file_row
+        cur.execute(FILE_QUERY + ' WHERE Model = :model ORDER BY File_Path;',
+            {'model': model_id}
+            )
+        return cur.fetchall()
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_directories(
+    connection: sqlite3.Connection
+    ) -> dict[str, tuple[int, Optional[str], int, int]]:
+    """Gets every directory as it was when it was last scanned.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        (artist ID, parent path, modified, inode) by directory path.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT d.Directory_Path, d.Artist, p.Directory_Path, '
+                'd.Directory_Modified, d.Directory_Inode '
+            'FROM tblDirectory AS d '
+            'LEFT JOIN tblDirectory AS p ON d.Parent = p.Directory_ID;'
+            )
+        return {
+            path: (artist_id, parent, modified, inode)
+            for path, artist_id, parent, modified, inode
+            in dbqueries.fetch_objects(cursor=cur)
+            }
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_directory_files(
+    connection: sqlite3.Connection
+    ) -> dict[str, dict[str, tuple[int, int]]]:
+    """Gets the files of every directory as they were when last scanned.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        (size, modified) by file path, by directory path. Directories
+        without model files are left out.
+    """
+    files = {}
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT d.Directory_Path, f.File_Path, f.File_Size, f.File_Modified '
+            'FROM tblFile AS f '
+            'INNER JOIN tblDirectory AS d ON d.Directory_ID = f.Directory;'
+            )
+        for directory, path, size, modified in dbqueries.fetch_objects(cursor=cur):
+            files.setdefault(directory, {})[path] = (size, modified)
+
+        return files
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def _remove_subtrees(cur: sqlite3.Cursor, where: str, params: dict) -> int:
+    """Removes the matching directories with everything below them.
+
+    Args:
+        cur: A cursor in the transaction to remove them in.
+        where: The condition on tblDirectory of the top directories.
+        params: The parameters of the condition.
+
+    Returns:
+        The number of files removed.
+    """
+    subtree = SUBTREE_QUERY.format(where=where)
+    cur.execute(f'DELETE FROM tblFile WHERE Directory IN {subtree};', params)
+    removed = cur.rowcount
+    cur.execute(f'DELETE FROM tblDirectory WHERE Directory_ID IN {subtree};', params)
+    return removed
+
+
+def _save_directory(cur: sqlite3.Cursor, directory: ScannedDirectory) -> tuple[int, int, int]:
+    """Writes one scanned directory and its files.
+
+    Returns:
+        The number of files added, updated and removed.
+    """
+    cur.execute('INSERT INTO tblDirectory ('
+            'Directory_Path, '
+            'Artist, '
+            'Parent, '
+            'Directory_Modified, '
+            'Directory_Inode) '
+        'VALUES (:path, :artist, '
+            '(SELECT Directory_ID FROM tblDirectory WHERE Directory_Path = :parent), '
+            ':modified, :inode) '
+        'ON CONFLICT (Directory_Path) DO UPDATE SET '
+            'Artist = excluded.Artist, '
+            'Parent = excluded.Parent, '
+            'Directory_Modified = excluded.Directory_Modified, '
+            'Directory_Inode = excluded.Directory_Inode '
+        'RETURNING Directory_ID;',
+        {
+            'path': directory.path,
+            'artist': directory.artist,
+            'parent': directory.parent,
+            'modified': directory.modified,
+            'inode': directory.inode
+            }
+        )
+    directory_id = cur.fetchone()[0]
+
+    # Directories that are gone, with everything that was in them
+    removed = _remove_subtrees(
+        cur=cur,
+        where='Parent = :parent '
+            'AND Directory_Path NOT IN (SELECT value FROM json_each(:paths))',
+        params={
+            'parent': directory_id,
+            'paths': json.dumps(directory.subdirectories)
+            }
+        )
+
+    cur.execute('SELECT File_Path FROM tblFile WHERE Directory = :directory;',
+        {'directory': directory_id}
+        )
+    known = {row[0] for row in cur.fetchall()}
+    paths = [model_file.path for model_file in directory.files]
+    added = len(set(paths) - known)
+    cur.executemany(
+        'INSERT INTO tblFile ('
+            'File_Path, '
+            'Artist, '
+            'Model, '
+            'File_Size, '
+            'File_Modified, '
+            'File_Extension, '
+            'Directory) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (File_Path) DO UPDATE SET '
+            'Artist = excluded.Artist, '
+            'Model = excluded.Model, '
+            'File_Size = excluded.File_Size, '
+            'File_Modified = excluded.File_Modified, '
+            'File_Extension = excluded.File_Extension, '
+            'Directory = excluded.Directory '
+        'WHERE (Artist, Model, File_Size, File_Modified, File_Extension, Directory) '
+            'IS NOT (excluded.Artist, excluded.Model, excluded.File_Size, '
+            'excluded.File_Modified, excluded.File_Extension, excluded.Directory);',
+        (
+            model_file.astuple(exclude='id') + (directory_id,)
+            for model_file in directory.files
+            )
+        )
+    updated = cur.rowcount - added
+
+    # The hashes of files that changed since they were hashed
+    cur.execute('DELETE FROM tblHash '
+        'WHERE File IN (SELECT File_ID FROM tblFile AS f '
+            'WHERE f.Directory = :directory '
+            'AND (f.File_Size, f.File_Modified) '
+                'IS NOT (tblHash.Hash_Size, tblHash.Hash_Modified));',
+        {'directory': directory_id}
+        )
+
+    cur.execute('DELETE FROM tblFile '
+        'WHERE Directory = :directory '
+        'AND File_Path NOT IN (SELECT value FROM json_each(:paths));',
+        {'directory': directory_id, 'paths': json.dumps(paths)}
+        )
+    removed += cur.rowcount
+
+    return added, updated, removed
+
+
+def save_directories(
+    connection: sqlite3.Connection,
+    directories: Iterable[ScannedDirectory],
+    deleted: Iterable[str] = (),
+    roots: Optional[dict[int, str]] = None,
+    batch_size: int = DIRECTORY_BATCH_SIZE
+    ) -> tuple[int, int, int]:
+    """Writes the changes found by a scan.
+
+    Only the directories that were read are written. Each one replaces
+    what was recorded for it: new files are added, changed ones updated
+    and files and subdirectories that are gone are removed. Directories
+    are written batch_size at a time, each batch in its own transaction,
+    parents before the directories in them.
+
+    Args:
+        connection: A sqlite database connection.
+        directories: The directories the scan read, in the order they
+            were found.
+        deleted: The paths of directories that no longer exist.
+        roots: The folder of every scanned artist by artist ID. Other
+            folders recorded for these artists are removed.
+        batch_size: The number of directories written per transaction.
+
+    Returns:
+        The number of files added, updated and removed.
+    """
+    added = updated = removed = 0
+    directories = list(directories)
+    try:
+        cur = connection.cursor()
+        for start in range(0, len(directories), batch_size):
+            for directory in directories[start:start + batch_size]:
+                counts = _save_directory(cur=cur, directory=directory)
+                added += counts[0]
+                updated += counts[1]
+                removed += counts[2]
+            connection.commit()
+
+        for path in deleted:
+            removed += _remove_subtrees(
+                cur=cur,
+                where='Directory_Path = :path',
+                params={'path': path}
+                )
+        # Done last, so a directory that is now an artist folder itself
+        # has already been moved out of the old folder
+        for artist_id, root in (roots or {}).items():
+            removed += _remove_subtrees(
+                cur=cur,
+                where='Parent IS NULL AND Artist = :artist AND Directory_Path != :root',
+                params={'artist': artist_id, 'root': root}
+                )
+        connection.commit()
+
+        logger.debug(f"Added {added}, updated {updated} and removed {removed} files")
+
+        return added, updated, removed
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_hash_candidates(connection: sqlite3.Connection) -> list[FileHash]:
+    """Gets the files that could have a copy, with their cached hashes.
+
+    Only a file with the same size as another file can be the same as
+    it, so every other file is left out. A file with a cached hash has
+    the size and modification time it had when it was hashed, which
+    the caller has to compare with the file on disk, as the file could
+    have changed since it was last scanned.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        The files that share their size with another file, by size.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT f.File_ID, f.File_Path, '
+                'IFNULL(h.Hash_Size, f.File_Size), '
+                'IFNULL(h.Hash_Modified, f.File_Modified), '
+                'h.Hash_Partial, h.Hash_Full '
+            'FROM tblFile AS f '
+            'LEFT JOIN tblHash AS h ON h.File = f.File_ID '
+            'WHERE f.File_Size IN ('
+                'SELECT File_Size FROM tblFile '
+                'WHERE File_Size > 0 '
+                'GROUP BY File_Size '
+                'HAVING COUNT(*) > 1) '
+            'ORDER BY f.File_Size, f.File_ID;'
+            )
+        candidates = [
+            FileHash(*row) for row in dbqueries.fetch_objects(cursor=cur)
+            ]
+
+        logger.debug(f"Query returned {len(candidates)} files that could have copies")
+
+        return candidates
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def save_hashes(connection: sqlite3.Connection, hashes: Iterable[FileHash]) -> int:
+    """Records the hashes of files.
+
+    Args:
+        connection: A sqlite database connection.
+        hashes: The files that were hashed. Files without a partial
+            hash are skipped.
+
+    Returns:
+        The number of files recorded.
+    """
+    try:
+        cur = connection.cursor()
+        cur.executemany('INSERT INTO tblHash ('
+                'File, '
+                'Hash_Size, '
+                'Hash_Modified, '
+                'Hash_Partial, '
+                'Hash_Full) '
+            'VALUES (:file, :size, :modified, :partial, :full) '
+            'ON CONFLICT (File) DO UPDATE SET '
+                'Hash_Size = excluded.Hash_Size, '
+                'Hash_Modified = excluded.Hash_Modified, '
+                'Hash_Partial = excluded.Hash_Partial, '
+                'Hash_Full = excluded.Hash_Full;',
+            (
+                dataclasses.asdict(file_hash) for file_hash in hashes
+                if file_hash.partial is not None
+                )
+            )
+        saved = cur.rowcount
+        connection.commit()
+
+        logger.debug(f"Saved the hashes of {saved} files")
+
+        return saved
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_duplicates(connection: sqlite3.Connection) -> list[inv.DuplicateFile]:
+    """Gets the files that have the same contents as another file.
+
+    Hashes of files that a scan found had changed since they were
+    hashed are removed by the scan, so the rest are compared.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        The files with copies, largest first, with the copies of a file
+        next to each other and sharing a group number.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT File_ID, '
+                'DENSE_RANK() OVER (ORDER BY File_Size DESC, Hash_Full), '
+                'File_Size, Artist_Name, Model_Name, File_Path '
+            'FROM ('
+                'SELECT f.File_ID, f.File_Size, f.File_Path, h.Hash_Full, '
+                    'a.Artist_Name, m.Model_Name, '
+                    'COUNT(*) OVER (PARTITION BY h.Hash_Full) AS Copies '
+                'FROM tblHash AS h '
+                'INNER JOIN tblFile AS f ON f.File_ID = h.File '
+                'INNER JOIN tblArtist AS a ON a.Artist_ID = f.Artist '
+                'LEFT JOIN tblModel AS m ON m.Model_ID = f.Model '
+                'WHERE h.Hash_Full IS NOT NULL) '
+            'WHERE Copies > 1 '
+            'ORDER BY File_Size DESC, Hash_Full, File_Path;'
+            )
+        duplicates = [
+            inv.DuplicateFile(*row) for row in dbqueries.fetch_objects(cursor=cur)
+            ]
+
+        logger.debug(f"Query returned {len(duplicates)} duplicate files")
+
+        return duplicates
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
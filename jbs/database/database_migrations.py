@@ -0,0 +1,596 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import dataclasses
+import logging
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Migration files are named <version>_<description>.sql, e.g.
+# 0003_full_text_search.sql, and are applied in version order.
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# A migration file whose first line is "-- rebuild: <table>" replaces a
+# table in chunks while the database stays usable, see apply_rebuild.
+REBUILD_HEADER = re.compile(r'^--\s*rebuild:\s*"?(\w+)"?\s*$')
+
+# Rows copied per transaction by a table rebuild
+REBUILD_CHUNK_SIZE = 5000
+
+# Holds how far each unfinished table rebuild has got
+REBUILD_STATE_TABLE = 'tblMigrationState'
+
+
+@dataclasses.dataclass(slots=True)
+class Migration:
+    """One numbered step of the database schema.
+
+    Attributes:
+        version: The schema version the database has after the step.
+        name: The description from the file name.
+        path: The sql file with the statements of the step.
+    """
+    version: int
+    name: str
+    path: pathlib.Path
+
+    def statements(self) -> Iterator[str]:
+        """Yields the statements of the migration file one at a time.
+
+        Lines are collected until they form a complete statement, so
+        triggers with several statements between BEGIN and END stay
+        together. Each statement has to end on its own line.
+
+        Raises:
+            ValueError: If the file ends with an incomplete statement.
+        """
+        statement = ''
+        with open(file=self.path, mode='r') as sql:
+            for line in sql:
+                statement += line
+                if sqlite3.complete_statement(statement):
+                    yield statement.strip()
+                    statement = ''
+
+        # Whatever is left has to be comments or blank lines
+        leftover = '\n'.join(
+            line for line in statement.splitlines()
+            if line.strip() and not line.strip().startswith('--')
+            )
+        if leftover:
+            raise ValueError(f"{self.path.name} ends with an incomplete statement")
+
+    def rebuild_table(self) -> Optional[str]:
+        """Gets the table the migration rebuilds, None for a plain migration."""
+        with open(file=self.path, mode='r') as sql:
+            match = REBUILD_HEADER.match(sql.readline().strip())
+        if match is None:
+            return None
+        return match.group(1)
+
+
+def find_migrations(directory: os.PathLike) -> list[Migration]:
+    """Lists the migration files of a directory.
+
+    Args:
+        directory: The directory with the migration files.
+
+    Returns:
+        The migrations in version order. Other files are ignored.
+
+    Raises:
+        ValueError: If two files have the same version.
+    """
+    migrations = {}
+    for path in pathlib.Path(directory).iterdir():
+        match = MIGRATION_FILE.match(path.name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(
+                f"{path.name} and {migrations[version].path.name} "
+                f"are both version {version}"
+                )
+        migrations[version] = Migration(
+            version=version,
+            name=match.group(2),
+            path=path
+            )
+
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def latest_version(directory: os.PathLike) -> int:
+    """Gets the schema version the migration files lead to.
+
+    Only the file names are read.
+
+    Args:
+        directory: The directory with the migration files.
+    """
+    migrations = find_migrations(directory=directory)
+    if not migrations:
+        return 0
+    return migrations[-1].version
+
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """Gets the schema version of a database.
+
+    Databases made before tblSchema existed are version 1 and an empty
+    database is version 0.
+
+    Args:
+        connection: A sqlite3 database connection
+
+    Returns:
+        The current schema version.
+    """
+    try:
+        cur = sqlite3.Cursor(connection)
+        cur.execute("SELECT name FROM sqlite_master "
+            "WHERE type = 'table' AND name IN ('tblSchema', 'tblModel');"
+            )
+        tables = {row[0] for row in cur.fetchall()}
+        if 'tblSchema' in tables:
+            cur.execute('SELECT version '
+                'FROM tblSchema '
+                'WHERE label = "current";'
+                )
+            result = cur.fetchone()
+            if result is not None:
+                return result[0]
+        if tables:
+            return 1
+        return 0
+
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def pending_migrations(
+    connection: sqlite3.Connection,
+    directory: os.PathLike,
+    target: Optional[int] = None
+    ) -> list[Migration]:
+    """Lists the migrations a database still needs.
+
+    Args:
+        connection: A sqlite3 database connection
+        directory: The directory with the migration files.
+        target: The version to stop at, the latest if None.
+    """
+    version = get_schema_version(connection=connection)
+    return [
+        migration for migration in find_migrations(directory=directory)
+        if migration.version > version
+            and (target is None or migration.version <= target)
+        ]
+
+
+def is_current(connection: sqlite3.Connection, directory: os.PathLike) -> bool:
+    """Checks if a database has every migration applied.
+
+    Only compares the version in tblSchema with the migration file
+    names, so it is cheap enough to run on every start.
+
+    Args:
+        connection: A sqlite3 database connection
+        directory: The directory with the migration files.
+    """
+    return get_schema_version(connection=connection) >= latest_version(
+        directory=directory
+        )
+
+
+def _set_schema_version(cur: sqlite3.Cursor, version: int) -> None:
+    """Records the schema version as part of the current transaction."""
+    # Before version 2 there is no tblSchema and the version comes from
+    # the tables that exist.
+    cur.execute("SELECT 1 FROM sqlite_master "
+        "WHERE type = 'table' AND name = 'tblSchema';"
+        )
+    if cur.fetchone() is None:
+        return
+    cur.execute('UPDATE tblSchema '
+        'SET version = :version '
+        'WHERE label = "current";',
+        {'version': version}
+        )
+    if cur.rowcount == 0:
+        cur.execute('INSERT INTO tblSchema (label, version) '
+            'VALUES ("current", :version);',
+            {'version': version}
+            )
+
+
+def _orphaned_rows(cur: sqlite3.Cursor) -> dict[tuple[str, str], list[int]]:
+    """Finds the rows that reference a row that doesn't exist.
+
+    Returns:
+        The rowids of the orphaned rows by table and referenced table.
+    """
+    cur.execute('PRAGMA foreign_key_check;')
+    orphans = {}
+    for table, rowid, parent, _ in cur.fetchall():
+        orphans.setdefault((table, parent), []).append(rowid)
+    return orphans
+
+
+def _describe_orphans(orphans: dict[tuple[str, str], list[int]]) -> str:
+    return '; '.join(
+        f"{table} rows {', '.join(str(rowid) for rowid in rowids)} "
+        f"reference a missing {parent} row"
+        for (table, parent), rowids in orphans.items()
+        )
+
+
+def _check_foreign_keys(cur: sqlite3.Cursor, migration: Migration) -> None:
+    """Fails the migration if a row references one that doesn't exist."""
+    orphans = _orphaned_rows(cur=cur)
+    if orphans:
+        raise sqlite3.IntegrityError(
+            f"Migration {migration.version} breaks a foreign key: "
+            f"{_describe_orphans(orphans=orphans)}"
+            )
+
+
+def apply_migration(connection: sqlite3.Connection, migration: Migration) -> None:
+    """Applies one migration in its own transaction.
+
+    The statements of the migration and the new version in tblSchema
+    are committed together, so a migration is either applied completely
+    or not at all. Foreign keys are turned off while it runs, as tables
+    may have to be rebuilt, and checked before the commit.
+
+    Args:
+        connection: A sqlite3 database connection
+        migration: The migration to apply.
+    """
+    statements = list(migration.statements())
+    cur = sqlite3.Cursor(connection)
+    cur.execute('PRAGMA foreign_keys;')
+    foreign_keys = cur.fetchone()[0]
+
+    try:
+        # PRAGMA foreign_keys does nothing inside a transaction
+        cur.execute('PRAGMA foreign_keys = OFF;')
+        cur.execute('BEGIN;')
+        for statement in statements:
+            cur.execute(statement)
+        _set_schema_version(cur=cur, version=migration.version)
+        _check_foreign_keys(cur=cur, migration=migration)
+        connection.commit()
+        logger.info(f"Applied migration {migration.version} {migration.name}")
+
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(f"Migration {migration.version} {migration.name} failed")
+        logger.error(e)
+        sys.exit(1)
+
+    finally:
+        cur.execute(f'PRAGMA foreign_keys = {"ON" if foreign_keys else "OFF"};')
+
+
+def _table_columns(cur: sqlite3.Cursor, table: str) -> list[str]:
+    cur.execute('SELECT name FROM pragma_table_info(:table);', {'table': table})
+    return [row[0] for row in cur.fetchall()]
+
+
+def _rebuild_state(cur: sqlite3.Cursor, version: int) -> Optional[tuple[int, int]]:
+    """Gets the last copied rowid and row count of an unfinished rebuild."""
+    cur.execute("SELECT 1 FROM sqlite_master "
+        "WHERE type = 'table' AND name = :name;",
+        {'name': REBUILD_STATE_TABLE}
+        )
+    if cur.fetchone() is None:
+        return None
+    cur.execute(f'SELECT last_rowid, copied FROM "{REBUILD_STATE_TABLE}" '
+        'WHERE version = :version;',
+        {'version': version}
+        )
+    return cur.fetchone()
+
+
+def _start_rebuild(
+    cur: sqlite3.Cursor,
+    migration: Migration,
+    table: str,
+    create: str
+    ) -> tuple[int, int]:
+    """Creates the new table and the triggers that keep it in step.
+
+    Until the tables are swapped, the triggers copy every insert,
+    update and delete on the old table to the new one, so the program
+    can keep using the old table while its rows are copied.
+    """
+    new_table = f'{table}_new'
+    cur.execute(f'CREATE TABLE IF NOT EXISTS "{REBUILD_STATE_TABLE}" ('
+        '"version" INTEGER PRIMARY KEY, '
+        '"last_rowid" INTEGER NOT NULL, '
+        '"copied" INTEGER NOT NULL);'
+        )
+    cur.execute(create)
+
+    old_columns = _table_columns(cur=cur, table=table)
+    columns = [
+        column for column in _table_columns(cur=cur, table=new_table)
+        if column in old_columns
+        ]
+    names = ', '.join(f'"{column}"' for column in columns)
+    values = ', '.join(f'NEW."{column}"' for column in columns)
+    copy = (f'INSERT OR REPLACE INTO "{new_table}" (rowid, {names}) '
+        f'VALUES (NEW.rowid, {values});')
+    cur.execute(f'CREATE TRIGGER "trgMigrate{table}Insert" '
+        f'AFTER INSERT ON "{table}" BEGIN {copy} END;'
+        )
+    cur.execute(f'CREATE TRIGGER "trgMigrate{table}Update" '
+        f'AFTER UPDATE ON "{table}" BEGIN '
+        f'DELETE FROM "{new_table}" WHERE rowid = OLD.rowid; {copy} END;'
+        )
+    cur.execute(f'CREATE TRIGGER "trgMigrate{table}Delete" '
+        f'AFTER DELETE ON "{table}" BEGIN '
+        f'DELETE FROM "{new_table}" WHERE rowid = OLD.rowid; END;'
+        )
+
+    cur.execute(f'SELECT IFNULL(MIN(rowid) - 1, 0) FROM "{table}";')
+    last_rowid = cur.fetchone()[0]
+    cur.execute(f'INSERT INTO "{REBUILD_STATE_TABLE}" (version, last_rowid, copied) '
+        'VALUES (:version, :last_rowid, 0);',
+        {'version': migration.version, 'last_rowid': last_rowid}
+        )
+    return last_rowid, 0
+
+
+def _copy_rows(
+    cur: sqlite3.Cursor,
+    table: str,
+    last_rowid: int,
+    upto: Optional[int] = None
+    ) -> int:
+    """Copies the rows after last_rowid, up to and including upto.
+
+    Returns:
+        The number of rows copied.
+    """
+    new_table = f'{table}_new'
+    old_columns = _table_columns(cur=cur, table=table)
+    names = ', '.join(
+        f'"{column}"' for column in _table_columns(cur=cur, table=new_table)
+        if column in old_columns
+        )
+    sql = (f'INSERT OR REPLACE INTO "{new_table}" (rowid, {names}) '
+        f'SELECT rowid, {names} FROM "{table}" WHERE rowid > :last')
+    if upto is not None:
+        sql += ' AND rowid <= :upto'
+    cur.execute(sql + ' ORDER BY rowid;', {'last': last_rowid, 'upto': upto})
+    return cur.rowcount
+
+
+def apply_rebuild(
+    connection: sqlite3.Connection,
+    migration: Migration,
+    chunk_size: int = REBUILD_CHUNK_SIZE,
+    progress: Optional[Callable[[Migration, int, int], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> bool:
+    """Applies a migration that replaces a table, a chunk at a time.
+
+    The first statement of the migration creates the new shape of the
+    table as <table>_new. The rows of the table are copied into it in
+    transactions of chunk_size rows, so other connections can read and
+    write between chunks, and how far the copy has got is saved with
+    each chunk. If the copy is stopped, or the program is, the next run
+    carries on from the last chunk. Once every row is copied, a single
+    transaction replaces the old table with the new one, runs the rest
+    of the statements of the migration and records the new version.
+
+    Rows keep their rowid and the columns both tables have are copied.
+    Rows that break a foreign key of the new table are logged before
+    the rest of the statements run, which have to repair them, as the
+    migration fails if any are left.
+
+    Args:
+        connection: A sqlite3 database connection
+        migration: The migration to apply.
+        chunk_size: The number of rows copied per transaction.
+        progress: Called after every chunk with the migration, the
+            rows copied so far and the rows in the table.
+        stop: Called before every chunk, the copy pauses if it returns
+            True.
+
+    Returns:
+        True if the migration was applied, False if it was paused.
+    """
+    table = migration.rebuild_table()
+    new_table = f'{table}_new'
+    statements = list(migration.statements())
+    if not statements or not re.search(
+        rf'^\s*CREATE TABLE\s+"?{new_table}"?\s*\(',
+        statements[0],
+        flags=re.IGNORECASE | re.MULTILINE
+        ):
+        raise ValueError(
+            f"{migration.path.name} has to start by creating {new_table}"
+            )
+
+    cur = sqlite3.Cursor(connection)
+    cur.execute('PRAGMA foreign_keys;')
+    foreign_keys = cur.fetchone()[0]
+
+    try:
+        # Foreign keys are checked once, before the tables are swapped
+        cur.execute('PRAGMA foreign_keys = OFF;')
+        cur.execute('BEGIN IMMEDIATE;')
+        state = _rebuild_state(cur=cur, version=migration.version)
+        if state is None:
+            state = _start_rebuild(
+                cur=cur,
+                migration=migration,
+                table=table,
+                create=statements[0]
+                )
+            logger.info(f"Started rebuilding {table} for migration {migration.version}")
+        else:
+            logger.info(f"Resuming the rebuild of {table} after {state[1]} rows")
+        connection.commit()
+        last_rowid, copied = state
+
+        cur.execute(f'SELECT COUNT(*) FROM "{table}";')
+        total = cur.fetchone()[0]
+        while True:
+            if stop is not None and stop():
+                logger.info(f"Paused rebuilding {table} after {copied} rows")
+                return False
+
+            cur.execute('BEGIN IMMEDIATE;')
+            cur.execute(f'SELECT MAX(rowid) FROM (SELECT rowid FROM "{table}" '
+                'WHERE rowid > :last ORDER BY rowid LIMIT :limit);',
+                {'last': last_rowid, 'limit': chunk_size}
+                )
+            upto = cur.fetchone()[0]
+            if upto is None:
+                connection.rollback()
+                break
+            copied += _copy_rows(
+                cur=cur,
+                table=table,
+                last_rowid=last_rowid,
+                upto=upto
+                )
+            last_rowid = upto
+            cur.execute(f'UPDATE "{REBUILD_STATE_TABLE}" '
+                'SET last_rowid = :last_rowid, copied = :copied '
+                'WHERE version = :version;',
+                {
+                    'last_rowid': last_rowid,
+                    'copied': copied,
+                    'version': migration.version
+                    }
+                )
+            connection.commit()
+            if progress is not None:
+                progress(migration, copied, max(total, copied))
+
+        # The rename has to leave the triggers of other tables that
+        # refer to the old table alone
+        cur.execute('PRAGMA legacy_alter_table = ON;')
+        cur.execute('BEGIN IMMEDIATE;')
+        # Rows added since the last chunk
+        _copy_rows(cur=cur, table=table, last_rowid=last_rowid)
+        # Keep AUTOINCREMENT from reusing the IDs of deleted rows
+        cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence';")
+        if cur.fetchone() is not None:
+            cur.execute('UPDATE sqlite_sequence '
+                'SET seq = (SELECT MAX(seq) FROM sqlite_sequence '
+                    'WHERE name IN (:table, :new_table)) '
+                'WHERE name = :new_table;',
+                {'table': table, 'new_table': new_table}
+                )
+        cur.execute(f'DROP TABLE "{table}";')
+        cur.execute(f'ALTER TABLE "{new_table}" RENAME TO "{table}";')
+        # Rows the new foreign keys don't allow are reported here and
+        # have to be repaired by the rest of the migration
+        orphans = _orphaned_rows(cur=cur)
+        if orphans:
+            logger.warning(f"Migration {migration.version} repairs orphaned rows: "
+                f"{_describe_orphans(orphans=orphans)}"
+                )
+        for statement in statements[1:]:
+            cur.execute(statement)
+
+        cur.execute(f'DELETE FROM "{REBUILD_STATE_TABLE}" WHERE version = :version;',
+            {'version': migration.version}
+            )
+        cur.execute(f'SELECT COUNT(*) FROM "{REBUILD_STATE_TABLE}";')
+        if cur.fetchone()[0] == 0:
+            cur.execute(f'DROP TABLE "{REBUILD_STATE_TABLE}";')
+        _set_schema_version(cur=cur, version=migration.version)
+        _check_foreign_keys(cur=cur, migration=migration)
+        connection.commit()
+        logger.info(f"Applied migration {migration.version} {migration.name}")
+        return True
+
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(f"Migration {migration.version} {migration.name} failed")
+        logger.error(e)
+        sys.exit(1)
+
+    finally:
+        cur.execute('PRAGMA legacy_alter_table = OFF;')
+        cur.execute(f'PRAGMA foreign_keys = {"ON" if foreign_keys else "OFF"};')
+
+
+def migrate(
+    connection: sqlite3.Connection,
+    directory: os.PathLike,
+    dry_run: bool = False,
+    target: Optional[int] = None,
+    chunk_size: int = REBUILD_CHUNK_SIZE,
+    progress: Optional[Callable[[Migration, int, int], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> list[Migration]:
+    """Brings a database up to date with the migration files.
+
+    Each migration is committed on its own, so if one fails, or the
+    program stops, the next run continues after the last one that was
+    applied. Migrations that rebuild a table copy it in chunks, see
+    apply_rebuild.
+
+    Args:
+        connection: A sqlite3 database connection
+        directory: The directory with the migration files.
+        dry_run: Only logs the migrations that would be applied.
+        target: The version to stop at, the latest if None.
+        chunk_size: The number of rows copied per transaction by
+            table rebuilds.
+        progress: Called after every chunk of a table rebuild with the
+            migration, the rows copied so far and the rows in the table.
+        stop: Called between migrations and chunks, the update pauses
+            if it returns True.
+
+    Returns:
+        The migrations that were applied, or would be for a dry run.
+    """
+    pending = pending_migrations(
+        connection=connection,
+        directory=directory,
+        target=target
+        )
+    if not pending:
+        logger.info("Database schema is up to date")
+        return pending
+    if dry_run:
+        for migration in pending:
+            logger.info(f"Would apply migration {migration.version} {migration.name}")
+        return pending
+
+    applied = []
+    for migration in pending:
+        if stop is not None and stop():
+            break
+        if migration.rebuild_table() is None:
+            apply_migration(connection=connection, migration=migration)
+        elif not apply_rebuild(
+            connection=connection,
+            migration=migration,
+            chunk_size=chunk_size,
+            progress=progress,
+            stop=stop
+            ):
+            break
+        applied.append(migration)
+
+    return applied
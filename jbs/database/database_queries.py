@@ -2,15 +2,100 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import itertools
+import json
 import logging
+import re
 import sqlite3
 import sys
+from typing import Any, Iterable, Iterator, Optional
 
+import jbs.database.database_cache as dbcache
 import jbs.inventory as inv
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.NOTSET)
 
+# Number of rows sent to executemany at once by the bulk insert functions
+BULK_CHUNK_SIZE = 1000
+
+# Number of rows pulled from the cursor at a time by the iter functions
+FETCH_BATCH_SIZE = 500
+
+# Number of models returned by get_models_page by default
+MODEL_PAGE_SIZE = 200
+
+# What get_models_page can order by, keyed by the model attribute. NULLs
+# are compared as empty strings so that every row has a key to page
+# from. The model, set and format expressions match the indexes in the
+# schema, sorting by the other columns needs a sort of the whole table
+# for every page.
+MODEL_SORT_KEYS = {
+    'id': 'm.Model_ID',
+    'model': "IFNULL(m.Model_Name, '') COLLATE NOCASE",
+    'set': "IFNULL(m.Set_Name, '') COLLATE NOCASE",
+    'artist': "IFNULL(a.Artist_Name, '') COLLATE NOCASE",
+    'source': "IFNULL(s.Source_Name, '') COLLATE NOCASE",
+    'source_note': "IFNULL(m.Source_Note, '') COLLATE NOCASE",
+    'supports': 'IFNULL(m.Supports, 0)',
+    'format': "IFNULL(m.Format, '') COLLATE NOCASE",
+    'folder': "IFNULL(a.Artist_Folder, '') COLLATE NOCASE",
+    'printed': 'IFNULL(m.Printed, 0)',
+    }
+
+# Outcomes of the bulk delete functions for each ID
+DELETED = 'deleted'
+IN_USE = 'in_use'
+NOT_FOUND = 'not_found'
+
+# Columns that search_model and search_associated_models accept, since
+# the column name is part of the statement
+MODEL_SEARCH_COLUMNS = ('Model_Name', 'Set_Name', 'Source_Note', 'Format')
+MODEL_ASSOCIATED_COLUMNS = ('Artist', 'Source')
+
+MODEL_QUERY = (
+    'SELECT Model_ID, Model_Name, Set_Name, Artist_Name, Source_Name, '
+        'Source_Note, Supports, Format, Artist_Folder, Printed '
+    'FROM tblModel AS m '
+    'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
+    'INNER JOIN tblSource AS s ON m.Source = s.Source_ID'
+    )
+
+
+def model_row(cursor: sqlite3.Cursor, row: tuple) -> inv.Model:
+    """Row factory that builds a model object from a model query row."""
+    return inv.Model(
+        row[0], row[1], row[2], row[3], row[4], row[5], bool(row[6]),
+        row[7], row[8], bool(row[9])
+        )
+
+
+def artist_row(cursor: sqlite3.Cursor, row: tuple) -> inv.Artist:
+    """Row factory that builds an artist object from an artist query row."""
+    return inv.Artist(*row)
+
+
+def source_row(cursor: sqlite3.Cursor, row: tuple) -> inv.Source:
+    """Row factory that builds a source object from a source query row."""
+    return inv.Source(*row)
+
+
+def fetch_objects(
+    cursor: sqlite3.Cursor,
+    batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[Any]:
+    """Yields the rows of an executed cursor batch_size rows at a time.
+
+    Only one batch is held in memory at once. Database errors end the
+    program the same way they do in the other query functions.
+    """
+    try:
+        while rows := cursor.fetchmany(batch_size):
+            yield from rows
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
 
 def get_all_models(connection: sqlite3.Connection) -> list[inv.Model] | inv.Model:
     """Returns a list of all model objects from the database.
@@ -24,32 +109,125 @@ def get_all_models(connection: sqlite3.Connection) -> list[inv.Model] | inv.Mode
     Returns:
         A list of all model objects in the database.
     """
-    factory = inv.ObjectFactory()
+    try:
+        cur = connection.cursor()
+        cur.row_factory = model_row
+        cur.execute(MODEL_QUERY + ';')
+        models = cur.fetchall()
+
+        logger.debug(f"Query returned {len(models)} models")
+
+        return models
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def iter_models(
+    connection: sqlite3.Connection,
+    batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[inv.Model]:
+    """Yields every model in the database.
+
+    Like get_all_models, but the models are built while iterating so
+    only batch_size rows are in memory at once.
+
+    Args:
+        connection: A sqlite database connection.
+        batch_size: The number of rows fetched from the cursor at once.
+
+    Yields:
+        Model objects.
+    """
+    try:
+        cur = connection.cursor()
+        cur.row_factory = model_row
+        cur.execute(MODEL_QUERY + ';')
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+    yield from fetch_objects(cursor=cur, batch_size=batch_size)
+
+
+def get_models_page(
+    connection: sqlite3.Connection,
+    after: Optional[tuple] = None,
+    limit: int = MODEL_PAGE_SIZE,
+    order_by: str = 'id',
+    descending: bool = False
+    ) -> tuple[list[inv.Model], Optional[tuple]]:
+    """Returns one page of models using keyset pagination.
+
+    Instead of an OFFSET, which has to step over every earlier row, the
+    page starts right after the last row of the previous page. Ties in
+    the sort column are broken by the model ID, so every model appears
+    on exactly one page even if models are added or deleted between
+    pages.
+
+    Args:
+        connection: A sqlite database connection.
+        after: The cursor token returned with the previous page, None
+            for the first page.
+        limit: The maximum number of models on the page.
+        order_by: A key of MODEL_SORT_KEYS.
+        descending: Whether to sort descending or not.
+
+    Returns:
+        A list of model objects and the cursor token for the next page,
+        which is None after the last page. The token is only meaningful
+        with the same order_by and descending values.
+
+    Raises:
+        ValueError: order_by is not a sortable column.
+    """
+    sort_key = MODEL_SORT_KEYS.get(order_by)
+    if sort_key is None:
+        raise ValueError(f"Can't sort models by {order_by}")
+
+    direction = 'DESC' if descending else 'ASC'
+    compare = '<' if descending else '>'
+    parameters = {'limit': limit + 1}
+    where = ''
+    if after is not None:
+        parameters['value'], parameters['id'] = after
+        if order_by == 'id':
+            where = f' WHERE m.Model_ID {compare} :id'
+        else:
+            # Written out instead of as a row value so that SQLite can
+            # start the index search at the value.
+            where = (
+                f' WHERE {sort_key} {compare}= :value '
+                f'AND ({sort_key} {compare} :value OR m.Model_ID {compare} :id)'
+                )
+
     try:
         cur = connection.cursor()
         cur.execute(
             'SELECT Model_ID, Model_Name, Set_Name, Artist_Name, Source_Name, '
-                'Source_Note, Supports, Format, Artist_Folder, Printed '
+                'Source_Note, Supports, Format, Artist_Folder, Printed, '
+                f'{sort_key} '
             'FROM tblModel AS m '
             'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
-            'INNER JOIN tblSource AS s ON m.Source = s.Source_ID;'
+            'INNER JOIN tblSource AS s ON m.Source = s.Source_ID'
+            + where
+            + f' ORDER BY {sort_key} {direction}, m.Model_ID {direction} '
+            'LIMIT :limit;', parameters
             )
-        results = cur.fetchall()
-
-        logger.debug(f"Query returned {len(results)} models")
-
-        if results:
-            models = []
-            for model in results:
-                models.append(factory.createModel(model))
-        else:
-            models = results
-
-        return models
+        rows = cur.fetchall()
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
+    token = None
+    if len(rows) > limit:
+        rows.pop()
+        token = (rows[-1][10], rows[-1][0])
+
+    logger.debug(f"Page returned {len(rows)} models")
+
+    return [model_row(cur, row) for row in rows], token
+
 
 def get_all_artists(connection: sqlite3.Connection) -> list[inv.Artist] | inv.Artist:
     """Returns a list of all artist objects from the database.
@@ -63,9 +241,9 @@ def get_all_artists(connection: sqlite3.Connection) -> list[inv.Artist] | inv.Ar
     Returns:
         A list of all artist objects in the database.
     """
-    factory = inv.ObjectFactory()
     try:
         cur = connection.cursor()
+        cur.row_factory = artist_row
         cur.execute(
             'SELECT Artist_ID, '
                 'Artist_Name, '
@@ -74,16 +252,9 @@ def get_all_artists(connection: sqlite3.Connection) -> list[inv.Artist] | inv.Ar
                 'Artist_Folder '
             'FROM tblArtist;'
             )
-        results = cur.fetchall()
-
-        logger.debug(f"Query returned {len(results)} artists")
+        artists = cur.fetchall()
 
-        if results:
-            artists = []
-            for artist in results:
-                artists.append(factory.createArtist(artist))
-        else:
-            artists = results
+        logger.debug(f"Query returned {len(artists)} artists")
 
         return artists
     except sqlite3.Error as e:
@@ -103,23 +274,16 @@ def get_all_sources(connection: sqlite3.Connection) -> list[inv.Source] | inv.So
     Returns:
         A list of all source objects in the database.
     """
-    factory = inv.ObjectFactory()
     try:
         cur = connection.cursor()
+        cur.row_factory = source_row
         cur.execute(
             'SELECT Source_ID, Source_Name, Source_Website '
             'FROM tblSource;'
             )
-        results = cur.fetchall()
+        sources = cur.fetchall()
 
-        logger.debug(f"Query returned {len(results)} sources")
-
-        if results:
-            sources = []
-            for source in results:
-                sources.append(factory.createSource(source))
-        else:
-            sources = results
+        logger.debug(f"Query returned {len(sources)} sources")
 
         return sources
     except sqlite3.Error as e:
@@ -127,6 +291,84 @@ def get_all_sources(connection: sqlite3.Connection) -> list[inv.Source] | inv.So
         sys.exit(1)
 
 
+def get_model(connection: sqlite3.Connection, model_id: int) -> inv.Model | None:
+    """Returns a single model object from the database.
+
+    Args:
+        connection: A sqlite database connection.
+        model_id: The ID of the model to retrieve.
+
+    Returns:
+        The model object with the supplied ID or None if it does not
+        exist.
+    """
+    try:
+        cur = connection.cursor()
+        cur.row_factory = model_row
+        cur.execute(MODEL_QUERY + ' WHERE m.Model_ID = :id;', {'id': model_id})
+
+        return cur.fetchone()
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_artist(connection: sqlite3.Connection, artist_id: int) -> inv.Artist | None:
+    """Returns a single artist object from the database.
+
+    Args:
+        connection: A sqlite database connection.
+        artist_id: The ID of the artist to retrieve.
+
+    Returns:
+        The artist object with the supplied ID or None if it does not
+        exist.
+    """
+    try:
+        cur = connection.cursor()
+        cur.row_factory = artist_row
+        cur.execute(
+            'SELECT Artist_ID, '
+                'Artist_Name, '
+                'Artist_Website, '
+                'Artist_Email, '
+                'Artist_Folder '
+            'FROM tblArtist '
+            'WHERE Artist_ID = :id;', {'id': artist_id}
+            )
+
+        return cur.fetchone()
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_source(connection: sqlite3.Connection, source_id: int) -> inv.Source | None:
+    """Returns a single source object from the database.
+
+    Args:
+        connection: A sqlite database connection.
+        source_id: The ID of the source to retrieve.
+
+    Returns:
+        The source object with the supplied ID or None if it does not
+        exist.
+    """
+    try:
+        cur = connection.cursor()
+        cur.row_factory = source_row
+        cur.execute(
+            'SELECT Source_ID, Source_Name, Source_Website '
+            'FROM tblSource '
+            'WHERE Source_ID = :id;', {'id': source_id}
+            )
+
+        return cur.fetchone()
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
 def search_model(
     connection: sqlite3.Connection,
     field: str,
@@ -146,35 +388,51 @@ def search_model(
     Returns:
         A list of model objects matching the user's query.
     """
-    factory = inv.ObjectFactory()
+    return list(iter_search_model(
+        connection=connection,
+        field=field,
+        search_text=search_text
+        ))
+
+
+def iter_search_model(
+    connection: sqlite3.Connection,
+    field: str,
+    search_text: str,
+    batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[inv.Model]:
+    """Yields the models matching a user query.
+
+    The generator version of search_model.
+
+    Args:
+        connection: A sqlite database connection.
+        field: The field in the model table to search.
+        search_text: the text to search for.
+        batch_size: The number of rows fetched from the cursor at once.
+
+    Yields:
+        Model objects matching the user's query.
+
+    Raises:
+        ValueError: If field isn't in MODEL_SEARCH_COLUMNS.
+    """
+    if field not in MODEL_SEARCH_COLUMNS:
+        raise ValueError(f"Can't search models by {field}")
     search_term = {'keyword': '%' + search_text + '%'}
 
     try:
         cur = connection.cursor()
+        cur.row_factory = model_row
         cur.execute(
-            'SELECT Model_ID, Model_Name, Set_Name, Artist_Name, Source_Name, '
-                'Source_Note, Supports, Format, Artist_Folder, Printed '
-            'FROM tblModel AS m '
-            'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
-            'INNER JOIN tblSource AS s ON m.Source = s.Source_ID '
-            f'WHERE m.{field} LIKE :keyword;', search_term
+            MODEL_QUERY + f' WHERE m.{field} LIKE :keyword;', search_term
             )
-        results = cur.fetchall()
-
-        logger.debug(f"Query returned {len(results)} models")
-
-        if results:
-            models = []
-            for model in results:
-                models.append(factory.createModel(model))
-        else:
-            models = results
-
-        return models
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
+    yield from fetch_objects(cursor=cur, batch_size=batch_size)
+
 def search_associated_models(
     connection: sqlite3.Connection,
     field: str,
@@ -194,35 +452,49 @@ def search_associated_models(
     Returns:
         A list of model objects matching the user's query.
     """
-    factory = inv.ObjectFactory()
-    search_term = {'id': search_id}
+    return list(iter_associated_models(
+        connection=connection,
+        field=field,
+        search_id=search_id
+        ))
 
-    try:
-        cur = connection.cursor()
-        cur.execute(
-            'SELECT Model_ID, Model_Name, Set_Name, Artist_Name, Source_Name, '
-                'Source_Note, Supports, Format, Artist_Folder, Printed '
-            'FROM tblModel AS m '
-            'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
-            'INNER JOIN tblSource AS s ON m.Source = s.Source_ID '
-            f'WHERE m.{field} = :id;', search_term
-            )
-        results = cur.fetchall()
 
-        logger.debug(f"Query returned {len(results)} models")
+def iter_associated_models(
+    connection: sqlite3.Connection,
+    field: str,
+    search_id: int,
+    batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[inv.Model]:
+    """Yields the models belonging to an artist or source.
 
-        if results:
-            models = []
-            for model in results:
-                models.append(factory.createModel(model))
-        else:
-            models = results
+    The generator version of search_associated_models.
 
-        return models
+    Args:
+        connection: A sqlite database connection.
+        field: Artist or Source.
+        search_id: The ID of the artist or source.
+        batch_size: The number of rows fetched from the cursor at once.
+
+    Yields:
+        Model objects with the artist or source.
+
+    Raises:
+        ValueError: If field isn't Artist or Source.
+    """
+    if field not in MODEL_ASSOCIATED_COLUMNS:
+        raise ValueError(f"Can't search models by {field}")
+    search_term = {'id': search_id}
+
+    try:
+        cur = connection.cursor()
+        cur.row_factory = model_row
+        cur.execute(MODEL_QUERY + f' WHERE m.{field} = :id;', search_term)
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
+    yield from fetch_objects(cursor=cur, batch_size=batch_size)
+
 def search_artist(
     connection: sqlite3.Connection,
     search_text: str
@@ -239,11 +511,11 @@ def search_artist(
     Returns:
         A list of artist objects matching the user's query.
     """
-    factory = inv.ObjectFactory()
     search_term = {'keyword': '%' + search_text + '%'}
 
     try:
         cur = connection.cursor()
+        cur.row_factory = artist_row
         cur.execute(
             'SELECT Artist_ID, '
                 'Artist_Name, '
@@ -255,16 +527,9 @@ def search_artist(
             'OR Artist_Website LIKE :keyword '
             'OR Artist_Email LIKE :keyword;', search_term
             )
-        results = cur.fetchall()
+        artists = cur.fetchall()
 
-        logger.debug(f"Query returned {len(results)} artists")
-
-        if results:
-            artists = []
-            for artist in results:
-                artists.append(factory.createArtist(artist))
-        else:
-            artists = results
+        logger.debug(f"Query returned {len(artists)} artists")
 
         return artists
     except sqlite3.Error as e:
@@ -289,27 +554,174 @@ def search_source(
     Returns:
         A list of source objects matching the user's query.
     """
-    factory = inv.ObjectFactory()
     search_term = {'keyword': '%' + search_text + '%'}
 
     try:
         cur = connection.cursor()
+        cur.row_factory = source_row
         cur.execute(
             'SELECT Source_ID, Source_Name, Source_Website '
             'FROM tblSource '
             'WHERE Source_Name LIKE :keyword OR Source_Website LIKE :keyword;',
             search_term
             )
-        results = cur.fetchall()
+        sources = cur.fetchall()
 
-        logger.debug(f"Query returned {len(results)} sources")
+        logger.debug(f"Query returned {len(sources)} sources")
+
+        return sources
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def build_match_query(search_text: str) -> str:
+    """Converts user search text into an FTS5 query.
+
+    Every word is quoted so that it can't be read as FTS5 syntax and
+    is turned into a prefix search. Words are implicitly joined with
+    AND, so every word has to match somewhere in the row.
+
+    Args:
+        search_text: The text the user searched for.
+
+    Returns:
+        A string to use with MATCH, empty if there are no words.
+    """
+    terms = re.findall(r'\w+', search_text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def full_text_search_models(
+    connection: sqlite3.Connection,
+    search_text: str,
+    limit: int = -1
+    ) -> list[inv.Model]:
+    """Retrieves model objects matching a full-text search.
+
+    Searches the name, set, source note, format, artist and source of
+    every model through the ftsModel index. Results are ranked with the
+    model and set names weighted above the other columns.
+
+    Args:
+        connection: A sqlite database connection.
+        search_text: The text to search for.
+        limit: The maximum number of models to return, -1 for all.
+
+    Returns:
+        A list of model objects, best matches first.
+    """
+    match_query = build_match_query(search_text)
+    if not match_query:
+        return get_all_models(connection=connection)
+
+    try:
+        cur = connection.cursor()
+        cur.row_factory = model_row
+        cur.execute(
+            'SELECT m.Model_ID, m.Model_Name, m.Set_Name, a.Artist_Name, '
+                's.Source_Name, m.Source_Note, m.Supports, m.Format, '
+                'a.Artist_Folder, m.Printed '
+            'FROM ftsModel AS f '
+            'INNER JOIN tblModel AS m ON m.Model_ID = f.rowid '
+            'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
+            'INNER JOIN tblSource AS s ON m.Source = s.Source_ID '
+            'WHERE ftsModel MATCH :query '
+            'ORDER BY bm25(ftsModel, 10.0, 5.0, 1.0, 2.0, 3.0, 3.0) '
+            'LIMIT :limit;', {'query': match_query, 'limit': limit}
+            )
+        models = cur.fetchall()
+
+        logger.debug(f"Query returned {len(models)} models")
+
+        return models
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
 
-        if results:
-            sources = []
-            for source in results:
-                sources.append(factory.createSource(source))
-        else:
-            sources = results
+
+def full_text_search_artists(
+    connection: sqlite3.Connection,
+    search_text: str,
+    limit: int = -1
+    ) -> list[inv.Artist]:
+    """Retrieves artist objects matching a full-text search.
+
+    Searches the artist name, website and email through the ftsArtist
+    index.
+
+    Args:
+        connection: A sqlite database connection.
+        search_text: The text to search for.
+        limit: The maximum number of artists to return, -1 for all.
+
+    Returns:
+        A list of artist objects, best matches first.
+    """
+    match_query = build_match_query(search_text)
+    if not match_query:
+        return get_all_artists(connection=connection)
+
+    try:
+        cur = connection.cursor()
+        cur.row_factory = artist_row
+        cur.execute(
+            'SELECT a.Artist_ID, '
+                'a.Artist_Name, '
+                'a.Artist_Website, '
+                'a.Artist_Email, '
+                'a.Artist_Folder '
+            'FROM ftsArtist AS f '
+            'INNER JOIN tblArtist AS a ON a.Artist_ID = f.rowid '
+            'WHERE ftsArtist MATCH :query '
+            'ORDER BY bm25(ftsArtist, 10.0, 1.0, 1.0) '
+            'LIMIT :limit;', {'query': match_query, 'limit': limit}
+            )
+        artists = cur.fetchall()
+
+        logger.debug(f"Query returned {len(artists)} artists")
+
+        return artists
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def full_text_search_sources(
+    connection: sqlite3.Connection,
+    search_text: str,
+    limit: int = -1
+    ) -> list[inv.Source]:
+    """Retrieves source objects matching a full-text search.
+
+    Searches the source name and website through the ftsSource index.
+
+    Args:
+        connection: A sqlite database connection.
+        search_text: The text to search for.
+        limit: The maximum number of sources to return, -1 for all.
+
+    Returns:
+        A list of source objects, best matches first.
+    """
+    match_query = build_match_query(search_text)
+    if not match_query:
+        return get_all_sources(connection=connection)
+
+    try:
+        cur = connection.cursor()
+        cur.row_factory = source_row
+        cur.execute(
+            'SELECT s.Source_ID, s.Source_Name, s.Source_Website '
+            'FROM ftsSource AS f '
+            'INNER JOIN tblSource AS s ON s.Source_ID = f.rowid '
+            'WHERE ftsSource MATCH :query '
+            'ORDER BY bm25(ftsSource, 10.0, 1.0) '
+            'LIMIT :limit;', {'query': match_query, 'limit': limit}
+            )
+        sources = cur.fetchall()
+
+        logger.debug(f"Query returned {len(sources)} sources")
 
         return sources
     except sqlite3.Error as e:
@@ -317,7 +729,11 @@ def search_source(
         sys.exit(1)
 
 
-def add_model(connection: sqlite3.Connection, model: inv.Model) -> None:
+def add_model(
+    connection: sqlite3.Connection,
+    model: inv.Model,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Adds a supplied model object to the database
 
     Takes a model object and extracts the attributes to insert them
@@ -326,6 +742,11 @@ def add_model(connection: sqlite3.Connection, model: inv.Model) -> None:
     Args:
         connection: A sqlite database connection.
         model: A model object to add to the database.
+        cache: Resolves the artist and source names without a query.
+
+    Returns:
+        The ID of the newly added model or None if the artist or source
+        does not exist.
     """
     supports = model.supports
     match supports:
@@ -346,9 +767,17 @@ def add_model(connection: sqlite3.Connection, model: inv.Model) -> None:
             model.printed = 0
 
     logger.info("Resolving artist name to artist ID")
-    artist_id = get_artist_id(connection=connection, artist_name=model.artist)
+    artist_id = get_artist_id(
+        connection=connection,
+        artist_name=model.artist,
+        cache=cache
+        )
     logger.info("Resolving source name to source ID")
-    source_id = get_source_id(connection=connection, source_name=model.source)
+    source_id = get_source_id(
+        connection=connection,
+        source_name=model.source,
+        cache=cache
+        )
 
     model.artist = artist_id
     model.source = source_id
@@ -375,15 +804,25 @@ def add_model(connection: sqlite3.Connection, model: inv.Model) -> None:
                 ':supports, '
                 ':format, '
                 ':printed);', 
-            vars(model)
+            model.asdict()
             )
         connection.commit()
+
+        return cur.lastrowid
+    except sqlite3.IntegrityError as e:
+        connection.rollback()
+        logger.warning(f"Unknown artist or source: {e}")
+        return None
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
 
-def add_artist(connection: sqlite3.Connection, artist: inv.Artist) -> None:
+def add_artist(
+    connection: sqlite3.Connection,
+    artist: inv.Artist,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Adds a supplied artist object to the database
 
     Takes a artist object and extracts the attributes to insert them
@@ -392,6 +831,10 @@ def add_artist(connection: sqlite3.Connection, artist: inv.Artist) -> None:
     Args:
         connection: A sqlite database connection.
         artist: A artist object to add to the database.
+        cache: Updated with the new artist.
+
+    Returns:
+        The ID of the newly added artist.
     """
     try:
         cur = connection.cursor()
@@ -407,15 +850,23 @@ def add_artist(connection: sqlite3.Connection, artist: inv.Artist) -> None:
                 ':website, '
                 ':email, '
                 ':folder);', 
-            vars(artist)
+            artist.asdict()
             )
         connection.commit()
+        if cache:
+            cache.artists.add(name=artist.name, row_id=cur.lastrowid)
+
+        return cur.lastrowid
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
 
-def add_source(connection: sqlite3.Connection, source: inv.Source) -> None:
+def add_source(
+    connection: sqlite3.Connection,
+    source: inv.Source,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Adds a supplied source object to the database
 
     Takes a source object and extracts the attributes to insert them
@@ -424,32 +875,307 @@ def add_source(connection: sqlite3.Connection, source: inv.Source) -> None:
     Args:
         connection: A sqlite database connection.
         source: A source object to add to the database.
+        cache: Updated with the new source.
+
+    Returns:
+        The ID of the newly added source.
     """
     try:
         cur = connection.cursor()
         logger.info("Adding source to the database")
         cur.execute(
             'INSERT INTO tblSource (Source_Name, Source_Website) '
-            'VALUES (:name, :website);', vars(source)
+            'VALUES (:name, :website);', source.asdict()
+            )
+        connection.commit()
+        if cache:
+            cache.sources.add(name=source.name, row_id=cur.lastrowid)
+
+        return cur.lastrowid
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def _chunks(items: Iterable, chunk_size: int) -> Iterator[list]:
+    """Splits an iterable into lists of at most chunk_size items."""
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
+
+
+def _as_flag(value: Any) -> int:
+    """Converts a supports or printed value to the 0/1 stored in the database."""
+    return 1 if value is True or value == 1 else 0
+
+
+def add_models_bulk(
+    connection: sqlite3.Connection,
+    models: Iterable[inv.Model],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    cache: Optional[dbcache.LookupCache] = None,
+    artist_ids: Optional[dict[str, int]] = None,
+    source_ids: Optional[dict[str, int]] = None,
+    create_names: bool = False
+    ) -> int:
+    """Adds many model objects to the database in one transaction.
+
+    The artist and source names of every model are resolved against a
+    single lookup of each table and the rows are inserted with
+    executemany, chunk_size rows at a time. Models whose artist or
+    source does not exist are skipped, unless create_names is set.
+
+    Args:
+        connection: A sqlite database connection.
+        models: An iterable of model objects to add to the database.
+        chunk_size: The number of rows to insert per executemany call.
+        cache: Used for the artist and source names instead of reading
+            both tables, and told about the ones created.
+        artist_ids: Artist IDs by name, used instead of looking them
+            up. Artists created here are added to it, so a caller
+            adding models in batches can pass the same dictionary to
+            every call.
+        source_ids: Source IDs by name, used like artist_ids.
+        create_names: Creates the artists and sources that don't exist
+            yet in the same transaction as the models.
+
+    Returns:
+        The number of models that were added.
+    """
+    if artist_ids is None and cache:
+        artist_ids = cache.artists.get_ids(connection=connection)
+    elif artist_ids is None:
+        artist_ids = get_artist_ids(connection=connection)
+    if source_ids is None and cache:
+        source_ids = cache.sources.get_ids(connection=connection)
+    elif source_ids is None:
+        source_ids = get_source_ids(connection=connection)
+    created_artists = {}
+    created_sources = {}
+    added = 0
+
+    try:
+        cur = connection.cursor()
+        logger.info("Adding models to the database")
+        for chunk in _chunks(models, chunk_size):
+            if create_names:
+                for name in sorted({model.artist for model in chunk} - artist_ids.keys()):
+                    cur.execute('INSERT INTO tblArtist ('
+                            'Artist_Name, '
+                            'Artist_Website, '
+                            'Artist_Email, '
+                            'Artist_Folder) '
+                        "VALUES (?, '', '', '') "
+                        'RETURNING Artist_ID;', (name,)
+                        )
+                    created_artists[name] = artist_ids[name] = cur.fetchone()[0]
+                for name in sorted({model.source for model in chunk} - source_ids.keys()):
+                    cur.execute('INSERT INTO tblSource (Source_Name, Source_Website) '
+                        "VALUES (?, '') "
+                        'RETURNING Source_ID;', (name,)
+                        )
+                    created_sources[name] = source_ids[name] = cur.fetchone()[0]
+            rows = []
+            for model in chunk:
+                artist_id = artist_ids.get(model.artist)
+                source_id = source_ids.get(model.source)
+                if artist_id is None or source_id is None:
+                    logger.warning(
+                        f"Skipping {model.model}, unknown artist or source"
+                        )
+                    continue
+                rows.append((
+                    model.model,
+                    artist_id,
+                    model.set,
+                    source_id,
+                    model.source_note,
+                    _as_flag(model.supports),
+                    model.format,
+                    _as_flag(model.printed)
+                    ))
+            cur.executemany(
+                'INSERT INTO tblModel ('
+                    'Model_Name, '
+                    'Artist, '
+                    'Set_Name, '
+                    'Source, '
+                    'Source_Note, '
+                    'Supports, '
+                    'Format, '
+                    'Printed) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?);', rows
+                )
+            added += len(rows)
+        connection.commit()
+        if cache:
+            for name, artist_id in created_artists.items():
+                cache.artists.add(name=name, row_id=artist_id)
+            for name, source_id in created_sources.items():
+                cache.sources.add(name=name, row_id=source_id)
+        logger.debug(
+            f"Added {added} models, {len(created_artists)} artists "
+            f"and {len(created_sources)} sources"
             )
+
+        return added
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(e)
+        sys.exit(1)
+
+
+def add_artists_bulk(
+    connection: sqlite3.Connection,
+    artists: Iterable[inv.Artist],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
+    """Adds many artist objects to the database in one transaction.
+
+    Args:
+        connection: A sqlite database connection.
+        artists: An iterable of artist objects to add to the database.
+        chunk_size: The number of rows to insert per executemany call.
+        cache: Invalidated after the insert since executemany doesn't
+            return the new IDs.
+
+    Returns:
+        The number of artists that were added.
+    """
+    added = 0
+
+    try:
+        cur = connection.cursor()
+        logger.info("Adding artists to the database")
+        for chunk in _chunks(artists, chunk_size):
+            cur.executemany(
+                'INSERT INTO tblArtist ('
+                    'Artist_Name, '
+                    'Artist_Website, '
+                    'Artist_Email, '
+                    'Artist_Folder) '
+                'VALUES (?, ?, ?, ?);',
+                [(artist.name, artist.website, artist.email, artist.folder)
+                    for artist in chunk]
+                )
+            added += len(chunk)
+        connection.commit()
+        if cache:
+            cache.artists.invalidate()
+        logger.debug(f"Added {added} artists")
+
+        return added
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(e)
+        sys.exit(1)
+
+
+def add_sources_bulk(
+    connection: sqlite3.Connection,
+    sources: Iterable[inv.Source],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
+    """Adds many source objects to the database in one transaction.
+
+    Args:
+        connection: A sqlite database connection.
+        sources: An iterable of source objects to add to the database.
+        chunk_size: The number of rows to insert per executemany call.
+        cache: Invalidated after the insert since executemany doesn't
+            return the new IDs.
+
+    Returns:
+        The number of sources that were added.
+    """
+    added = 0
+
+    try:
+        cur = connection.cursor()
+        logger.info("Adding sources to the database")
+        for chunk in _chunks(sources, chunk_size):
+            cur.executemany(
+                'INSERT INTO tblSource (Source_Name, Source_Website) '
+                'VALUES (?, ?);',
+                [(source.name, source.website) for source in chunk]
+                )
+            added += len(chunk)
         connection.commit()
+        if cache:
+            cache.sources.invalidate()
+        logger.debug(f"Added {added} sources")
+
+        return added
+    except sqlite3.Error as e:
+        connection.rollback()
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_artist_ids(connection: sqlite3.Connection) -> dict[str, int]:
+    """Gets the IDs of every artist keyed by the artist's name.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        A dictionary mapping artist names to artist IDs.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT Artist_Name, Artist_ID FROM tblArtist;')
+
+        return dict(cur.fetchall())
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def get_source_ids(connection: sqlite3.Connection) -> dict[str, int]:
+    """Gets the IDs of every source keyed by the source's name.
+
+    Args:
+        connection: A sqlite database connection.
+
+    Returns:
+        A dictionary mapping source names to source IDs.
+    """
+    try:
+        cur = connection.cursor()
+        cur.execute('SELECT Source_Name, Source_ID FROM tblSource;')
+
+        return dict(cur.fetchall())
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
 
-def get_artist_id(connection: sqlite3.Connection, artist_name: str) -> int:
+def get_artist_id(
+    connection: sqlite3.Connection,
+    artist_name: str,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Gets the ID for a supplied artist name.
 
-    Takes a artist name and gets its ID from the database.
+    Takes a artist name and gets its ID from the cache if one is given
+    or else from the database.
 
     Args:
         connection: A sqlite database connection.
         artist_name: The artist's name to look up.
+        cache: A LookupCache to use instead of a query.
 
     Returns:
         An integer containing the artist ID for the supplied artist.
     """
+    if cache:
+        return cache.artists.get_id(
+            connection=connection,
+            name=artist_name
+            ) or 0
+
     try:
         cur = connection.cursor()
         cur.execute(
@@ -469,18 +1195,30 @@ def get_artist_id(connection: sqlite3.Connection, artist_name: str) -> int:
         sys.exit(1)
 
 
-def get_source_id(connection: sqlite3.Connection, source_name: str) -> int:
+def get_source_id(
+    connection: sqlite3.Connection,
+    source_name: str,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Gets the ID for a supplied source name.
 
-    Takes a source name and gets its ID from the database.
+    Takes a source name and gets its ID from the cache if one is given
+    or else from the database.
 
     Args:
         connection: A sqlite database connection.
         source_name: The artist's name to look up.
+        cache: A LookupCache to use instead of a query.
 
     Returns:
         An integer containing the source ID for the supplied source.
     """
+    if cache:
+        return cache.sources.get_id(
+            connection=connection,
+            name=source_name
+            ) or 0
+
     try:
         cur = connection.cursor()
         cur.execute(
@@ -499,7 +1237,7 @@ def get_source_id(connection: sqlite3.Connection, source_name: str) -> int:
         logger.error(e)
         sys.exit(1)
 
-def delete_model(connection: sqlite3.Connection, model_id: int) -> None:
+def delete_model(connection: sqlite3.Connection, model_id: int) -> int:
     """Deletes a model from the database
 
     Takes a model ID and deletes the model from the database.
@@ -507,6 +1245,9 @@ def delete_model(connection: sqlite3.Connection, model_id: int) -> None:
     Args:
         connection: A sqlite database connection.
         model_id: The ID of the model to delete.
+
+    Returns:
+        The ID of the deleted model.
     """
     try:
         cur = connection.cursor()
@@ -516,11 +1257,17 @@ def delete_model(connection: sqlite3.Connection, model_id: int) -> None:
             'WHERE Model_ID = :model_id;', {'model_id': model_id}
             )
         connection.commit()
+
+        return model_id
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
-def delete_artist(connection: sqlite3.Connection, artist_id: int) -> None:
+def delete_artist(
+    connection: sqlite3.Connection,
+    artist_id: int,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Deletes an artist from the database
 
     Takes an artist ID and deletes the artist from the database.
@@ -528,6 +1275,11 @@ def delete_artist(connection: sqlite3.Connection, artist_id: int) -> None:
     Args:
         connection: A sqlite database connection.
         artist_id: The ID of the artist to delete.
+        cache: Updated when the artist is deleted.
+
+    Returns:
+        The ID of the deleted artist or None if the artist still has
+        associated models.
     """
     try:
         cur = connection.cursor()
@@ -537,11 +1289,23 @@ def delete_artist(connection: sqlite3.Connection, artist_id: int) -> None:
             'WHERE Artist_ID = :artist_id;', {'artist_id': artist_id}
             )
         connection.commit()
+        if cache:
+            cache.artists.remove(row_id=artist_id)
+
+        return artist_id
+    except sqlite3.IntegrityError as e:
+        connection.rollback()
+        logger.warning(f"Artist {artist_id} has associated models: {e}")
+        return None
     except sqlite3.Error as e:
         logger.error(e)
         sys.exit(1)
 
-def delete_source(connection: sqlite3.Connection, source_id: int) -> None:
+def delete_source(
+    connection: sqlite3.Connection,
+    source_id: int,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> int:
     """Deletes a source from the database
 
     Takes a source ID and deletes the source from the database.
@@ -549,6 +1313,11 @@ def delete_source(connection: sqlite3.Connection, source_id: int) -> None:
     Args:
         connection: A sqlite database connection.
         source_id: The ID of the source to delete.
+        cache: Updated when the source is deleted.
+
+    Returns:
+        The ID of the deleted source or None if the source still has
+        associated models.
     """
     try:
         cur = connection.cursor()
@@ -558,6 +1327,177 @@ def delete_source(connection: sqlite3.Connection, source_id: int) -> None:
             'WHERE Source_ID = :source_id;', {'source_id': source_id}
             )
         connection.commit()
+        if cache:
+            cache.sources.remove(row_id=source_id)
+
+        return source_id
+    except sqlite3.IntegrityError as e:
+        connection.rollback()
+        logger.warning(f"Source {source_id} has associated models: {e}")
+        return None
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def _delete_bulk(
+    connection: sqlite3.Connection,
+    table: str,
+    id_column: str,
+    ids: Iterable[int],
+    dependent_column: Optional[str] = None
+    ) -> dict[int, str]:
+    """Deletes rows by ID with one DELETE in one transaction.
+
+    The IDs are passed as a single JSON array parameter and expanded
+    with json_each, so the number of statements doesn't depend on the
+    number of IDs. Rows still referenced by a model are skipped by the
+    DELETE itself, and one grouped COUNT over the IDs that are left
+    tells rows in use apart from rows that didn't exist.
+
+    Args:
+        connection: A sqlite database connection.
+        table: The table to delete from.
+        id_column: The ID column of the table.
+        ids: The IDs of the rows to delete.
+        dependent_column: The column of tblModel that references the
+            table, None for tblModel itself.
+
+    Returns:
+        The outcome for every ID, DELETED, IN_USE or NOT_FOUND.
+    """
+    ids = [int(row_id) for row_id in ids]
+    if not ids:
+        return {}
+    params = {'ids': json.dumps(ids)}
+    selected = f'{id_column} IN (SELECT value FROM json_each(:ids))'
+
+    try:
+        cur = connection.cursor()
+        if dependent_column is None:
+            cur.execute(
+                f'DELETE FROM {table} WHERE {selected} '
+                f'RETURNING {id_column};', params
+                )
+        else:
+            cur.execute(
+                f'DELETE FROM {table} WHERE {selected} '
+                f'AND NOT EXISTS (SELECT 1 FROM tblModel '
+                    f'WHERE tblModel.{dependent_column} = {table}.{id_column}) '
+                f'RETURNING {id_column};', params
+                )
+        deleted = {row[0] for row in cur.fetchall()}
+
+        in_use = {}
+        if dependent_column is not None and len(deleted) < len(set(ids)):
+            cur.execute(
+                f'SELECT {dependent_column}, COUNT(*) FROM tblModel '
+                f'WHERE {dependent_column} IN (SELECT value FROM json_each(:ids)) '
+                f'GROUP BY {dependent_column};', params
+                )
+            in_use = dict(cur.fetchall())
+        connection.commit()
     except sqlite3.Error as e:
+        connection.rollback()
         logger.error(e)
         sys.exit(1)
+
+    outcome = {}
+    for row_id in ids:
+        if row_id in deleted:
+            outcome[row_id] = DELETED
+        elif row_id in in_use:
+            logger.debug(f"{table} row {row_id} has {in_use[row_id]} associated models")
+            outcome[row_id] = IN_USE
+        else:
+            outcome[row_id] = NOT_FOUND
+    logger.info(f"Deleted {len(deleted)} rows from {table}")
+    if in_use:
+        logger.warning(f"{len(in_use)} rows of {table} still have associated models")
+
+    return outcome
+
+
+def delete_models_bulk(
+    connection: sqlite3.Connection,
+    model_ids: Iterable[int]
+    ) -> dict[int, str]:
+    """Deletes many models in one statement and one transaction.
+
+    Args:
+        connection: A sqlite database connection.
+        model_ids: The IDs of the models to delete.
+
+    Returns:
+        DELETED or NOT_FOUND for every ID.
+    """
+    return _delete_bulk(
+        connection=connection,
+        table='tblModel',
+        id_column='Model_ID',
+        ids=model_ids
+        )
+
+
+def delete_artists_bulk(
+    connection: sqlite3.Connection,
+    artist_ids: Iterable[int],
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> dict[int, str]:
+    """Deletes many artists in one statement and one transaction.
+
+    Artists that still have models are left in place.
+
+    Args:
+        connection: A sqlite database connection.
+        artist_ids: The IDs of the artists to delete.
+        cache: Updated for the artists that were deleted.
+
+    Returns:
+        DELETED, IN_USE or NOT_FOUND for every ID.
+    """
+    outcome = _delete_bulk(
+        connection=connection,
+        table='tblArtist',
+        id_column='Artist_ID',
+        ids=artist_ids,
+        dependent_column='Artist'
+        )
+    if cache:
+        for artist_id, result in outcome.items():
+            if result == DELETED:
+                cache.artists.remove(row_id=artist_id)
+
+    return outcome
+
+
+def delete_sources_bulk(
+    connection: sqlite3.Connection,
+    source_ids: Iterable[int],
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> dict[int, str]:
+    """Deletes many sources in one statement and one transaction.
+
+    Sources that still have models are left in place.
+
+    Args:
+        connection: A sqlite database connection.
+        source_ids: The IDs of the sources to delete.
+        cache: Updated for the sources that were deleted.
+
+    Returns:
+        DELETED, IN_USE or NOT_FOUND for every ID.
+    """
+    outcome = _delete_bulk(
+        connection=connection,
+        table='tblSource',
+        id_column='Source_ID',
+        ids=source_ids,
+        dependent_column='Source'
+        )
+    if cache:
+        for source_id, result in outcome.items():
+            if result == DELETED:
+                cache.sources.remove(row_id=source_id)
+
+    return outcome
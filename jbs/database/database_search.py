@@ -0,0 +1,242 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import dataclasses
+import logging
+import re
+import sqlite3
+import sys
+from typing import Optional
+
+import jbs.database.database_queries as dbqueries
+import jbs.inventory as inv
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# The fields that can be searched, keyed by model attribute, with the
+# SQL expression that is compared and how values are compared. Field
+# names are only ever taken from this table, never from the query.
+#   text: contains the value, or starts with it if it ends with *
+#   name: is the artist or source with this name, or starts with it if
+#       it ends with *
+#   flag: yes or no
+QUERY_FIELDS = {
+    'model': ("IFNULL(m.Model_Name, '') COLLATE NOCASE", 'text'),
+    'set': ("IFNULL(m.Set_Name, '') COLLATE NOCASE", 'text'),
+    'source_note': ("IFNULL(m.Source_Note, '') COLLATE NOCASE", 'text'),
+    'format': ("IFNULL(m.Format, '') COLLATE NOCASE", 'text'),
+    'folder': ("IFNULL(a.Artist_Folder, '') COLLATE NOCASE", 'text'),
+    'artist': ('a.Artist_Name COLLATE NOCASE', 'name'),
+    'source': ('s.Source_Name COLLATE NOCASE', 'name'),
+    'supports': ('IFNULL(m.Supports, 0)', 'flag'),
+    'printed': ('IFNULL(m.Printed, 0)', 'flag'),
+    }
+
+# Other names accepted for the fields
+FIELD_ALIASES = {'name': 'model', 'note': 'source_note'}
+
+FLAG_VALUES = {
+    'yes': 1, 'y': 1, 'true': 1, '1': 1,
+    'no': 0, 'n': 0, 'false': 0, '0': 0,
+    }
+
+# Sorts after every other character, used as the upper bound of prefix
+# ranges
+HIGHEST_CHARACTER = '\U0010ffff'
+
+# An optional -, an optional field name and a quoted or unquoted value.
+# A quote that isn't closed runs to the end of the text, so a query can
+# be searched while it is still being typed.
+TERM = re.compile(r'(-?)(?:(\w+):)?(?:"([^"]*)"?|(\S*))')
+
+
+@dataclasses.dataclass(slots=True)
+class Term:
+    """One condition of a structured query.
+
+    Attributes:
+        field: The model attribute, None for words searched in every
+            field.
+        value: The text to compare with.
+        negated: Whether matching models are excluded instead.
+        prefix: Whether the value ended with * and is a prefix.
+    """
+    field: Optional[str]
+    value: str
+    negated: bool = False
+    prefix: bool = False
+
+
+def parse_query(query: str) -> list[Term]:
+    """Splits a query into terms.
+
+    A query is a list of terms separated by spaces, e.g.
+    artist:"Dragon Forge" set:"red dragons" printed:no format:stl*. Terms
+    without a field are searched for in every field like the All_Fields
+    search. A - in front of a term excludes the models it matches.
+
+    Args:
+        query: The text the user searched for.
+
+    Returns:
+        The terms in the order they appear. Terms with an empty value
+        are skipped.
+
+    Raises:
+        ValueError: If a field is unknown or a flag value isn't yes or
+            no.
+    """
+    terms = []
+    for match in TERM.finditer(query):
+        negated, field, quoted, value = match.groups()
+        value = quoted if quoted is not None else value
+        prefix = quoted is None and value.endswith('*')
+        if prefix:
+            value = value.rstrip('*')
+        if not value:
+            continue
+
+        if field is not None:
+            field = field.lower()
+            field = FIELD_ALIASES.get(field, field)
+            if field not in QUERY_FIELDS:
+                raise ValueError(f"Unknown search field {field}")
+            if QUERY_FIELDS[field][1] == 'flag':
+                if value.lower() not in FLAG_VALUES:
+                    raise ValueError(f"{field} has to be yes or no, not {value}")
+                prefix = False
+
+        terms.append(Term(
+            field=field,
+            value=value,
+            negated=bool(negated),
+            prefix=prefix
+            ))
+
+    return terms
+
+
+def escape_like(value: str) -> str:
+    """Escapes the LIKE wildcards in a value, using \\ as the escape."""
+    return re.sub(r'([\\%_])', r'\\\1', value)
+
+
+def compile_query(query: str, limit: int = -1) -> tuple[str, dict]:
+    """Compiles a structured query into one parameterized SELECT.
+
+    Every condition becomes part of a single WHERE clause. Only the
+    expressions in QUERY_FIELDS end up in the SQL, all values are
+    parameters. Exact artist and source names and prefixes of the
+    model, set and format use the indexes of the schema. Words without
+    a field are matched with the ftsModel index and the models are
+    ranked like full_text_search_models, otherwise they are in ID order.
+
+    Args:
+        query: The text the user searched for.
+        limit: The maximum number of models to return, -1 for all.
+
+    Returns:
+        The statement and its parameters.
+
+    Raises:
+        ValueError: If the query has an unknown field or flag value.
+    """
+    conditions = []
+    params = {'limit': limit}
+    words = []
+
+    for number, term in enumerate(parse_query(query)):
+        name = f'p{number}'
+        if term.field is None:
+            if term.negated:
+                params[name] = dbqueries.build_match_query(term.value)
+                if params[name]:
+                    conditions.append(
+                        f'm.Model_ID NOT IN (SELECT rowid FROM ftsModel '
+                        f'WHERE ftsModel MATCH :{name})'
+                        )
+            else:
+                words.append(term.value)
+            continue
+
+        expression, kind = QUERY_FIELDS[term.field]
+        if kind == 'flag':
+            params[name] = FLAG_VALUES[term.value.lower()]
+            condition = f'{expression} = :{name}'
+        elif term.prefix:
+            # A range instead of LIKE, so the index can be used
+            params[name] = term.value
+            params[f'{name}_end'] = term.value + HIGHEST_CHARACTER
+            condition = (
+                f'{expression} >= :{name} AND {expression} < :{name}_end'
+                )
+        elif kind == 'name':
+            params[name] = term.value
+            condition = f'{expression} = :{name}'
+        else:
+            params[name] = '%' + escape_like(term.value) + '%'
+            condition = f"{expression} LIKE :{name} ESCAPE '\\'"
+
+        if term.negated:
+            condition = f'NOT ({condition})'
+        conditions.append(condition)
+
+    match_query = dbqueries.build_match_query(' '.join(words))
+    if match_query:
+        params['match'] = match_query
+        sql = (
+            'SELECT m.Model_ID, m.Model_Name, m.Set_Name, a.Artist_Name, '
+                's.Source_Name, m.Source_Note, m.Supports, m.Format, '
+                'a.Artist_Folder, m.Printed '
+            'FROM ftsModel AS f '
+            'INNER JOIN tblModel AS m ON m.Model_ID = f.rowid '
+            'INNER JOIN tblArtist AS a ON m.Artist = a.Artist_ID '
+            'INNER JOIN tblSource AS s ON m.Source = s.Source_ID '
+            'WHERE ftsModel MATCH :match'
+            )
+        sql += ''.join(f' AND {condition}' for condition in conditions)
+        sql += ' ORDER BY bm25(ftsModel, 10.0, 5.0, 1.0, 2.0, 3.0, 3.0)'
+    else:
+        sql = dbqueries.MODEL_QUERY
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY m.Model_ID'
+
+    return sql + ' LIMIT :limit;', params
+
+
+def search_models(
+    connection: sqlite3.Connection,
+    query: str,
+    limit: int = -1
+    ) -> list[inv.Model]:
+    """Retrieves the models matching a structured query.
+
+    Args:
+        connection: A sqlite database connection.
+        query: The text the user searched for, see parse_query.
+        limit: The maximum number of models to return, -1 for all.
+
+    Returns:
+        A list of model objects.
+
+    Raises:
+        ValueError: If the query has an unknown field or flag value.
+    """
+    sql, params = compile_query(query=query, limit=limit)
+    logger.debug(f"Compiled {query!r} to {sql}")
+
+    try:
+        cur = connection.cursor()
+        cur.row_factory = dbqueries.model_row
+        cur.execute(sql, params)
+        models = cur.fetchall()
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+    logger.debug(f"Query returned {len(models)} models")
+
+    return models
@@ -0,0 +1,143 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable
+
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_search as dbsearch
+import jbs.inventory as inv
+import jbs.model_store as model_store
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+
+class Snapshot:
+    """A list of rows that is shared until the database changes.
+
+    The list is handed to every caller as is, so it must not be
+    modified.
+
+    Attributes:
+        load: The query function that reads the rows.
+        objects: The rows from the last query, None before the first.
+        version: The data version the rows were read at.
+        hits: Requests answered without a query.
+        misses: Requests that ran the query.
+    """
+    def __init__(self, load: Callable[..., list]):
+        self.load = load
+        self.objects = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, connection: sqlite3.Connection, version: Any) -> list:
+        """Returns the rows, only running the query if needed.
+
+        Args:
+            connection: A sqlite database connection.
+            version: The current data version of the database.
+
+        Returns:
+            The list of objects read at version.
+        """
+        with self.lock:
+            if self.objects is not None and self.version == version:
+                self.hits += 1
+                return self.objects
+
+            self.misses += 1
+            self.objects = self.load(connection=connection)
+            self.version = version
+            logger.debug(f"Snapshot reloaded at version {version}")
+            return self.objects
+
+    def invalidate(self) -> None:
+        """Forgets the rows so that the next request runs the query."""
+        with self.lock:
+            self.objects = None
+            self.version = None
+
+
+class DataSnapshot:
+    """The artist and source lists shared by the tables, dropdowns and
+    searches, and the in-memory model store used for structured queries.
+
+    Each is read at most once per data version of the database, as
+    reported by the connection manager. The model store is only built
+    when it is first asked for.
+
+    Attributes:
+        connections: The ConnectionManager of the database.
+        artists: The snapshot of every artist.
+        sources: The snapshot of every source.
+        models: The snapshot of the model store.
+    """
+    def __init__(self, connections):
+        self.connections = connections
+        self.artists = Snapshot(load=dbqueries.get_all_artists)
+        self.sources = Snapshot(load=dbqueries.get_all_sources)
+        self.models = Snapshot(load=model_store.ModelStore.load)
+
+    def get_artists(self, connection: sqlite3.Connection) -> list:
+        """Returns every artist, from the snapshot when nothing changed.
+
+        Args:
+            connection: A sqlite database connection.
+        """
+        return self.artists.get(
+            connection=connection,
+            version=self.connections.data_version()
+            )
+
+    def get_sources(self, connection: sqlite3.Connection) -> list:
+        """Returns every source, from the snapshot when nothing changed.
+
+        Args:
+            connection: A sqlite database connection.
+        """
+        return self.sources.get(
+            connection=connection,
+            version=self.connections.data_version()
+            )
+
+    def get_model_store(self, connection: sqlite3.Connection) -> model_store.ModelStore:
+        """Returns a column store of every model, rebuilt when data changed.
+
+        Args:
+            connection: A sqlite database connection.
+        """
+        return self.models.get(
+            connection=connection,
+            version=self.connections.data_version()
+            )
+
+    def search_models(
+        self,
+        connection: sqlite3.Connection,
+        query: str
+        ) -> list[inv.Model]:
+        """Retrieves the models matching a structured query.
+
+        Queries where every term has a field are answered by the model
+        store, so refining one only costs a few bitmap operations and
+        doesn't query the database until the data changes. Queries
+        with words searched in every field use dbsearch.search_models.
+
+        Args:
+            connection: A sqlite database connection.
+            query: The text the user searched for, see dbsearch.parse_query.
+
+        Raises:
+            ValueError: If the query has an unknown field or flag value.
+        """
+        where = model_store.compile_query(query)
+        if where is None:
+            return dbsearch.search_models(connection=connection, query=query)
+        return self.get_model_store(connection=connection).select(where=where)
@@ -4,12 +4,39 @@
 
 import logging
 import os
+import pathlib
 import sqlite3
 import sys
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.NOTSET)
 
+# Connection settings used when the config file doesn't have a
+# "sqlite" section. WAL lets readers and the writer work at the same
+# time, and NORMAL is durable enough with WAL while syncing far less.
+DEFAULT_SQLITE_SETTINGS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Negative values are in KiB, so this is a 64 MiB page cache
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+    }
+
+# PRAGMA values can't be bound as parameters, so only these are
+# accepted from the config file.
+SQLITE_SETTING_VALUES = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+    'cache_size': int,
+    'mmap_size': int,
+    'busy_timeout': int,
+    }
+
+
 def check_database_schema(connection: sqlite3.Connection) -> int:
     """Gets the database schema of the current database
 
@@ -60,18 +87,103 @@ def modify_database_schema(
         sys.exit(1)
 
 
-def connect_database(database: os.PathLike) -> sqlite3.Connection: 
+def get_sqlite_settings(settings: Optional[dict] = None) -> dict:
+    """Combines connection settings with the defaults.
+
+    Args:
+        settings: The "sqlite" section of the config file, if any.
+
+    Returns:
+        A dictionary with every setting in DEFAULT_SQLITE_SETTINGS.
+
+    Raises:
+        ValueError: A setting is unknown or has an invalid value.
+    """
+    combined = dict(DEFAULT_SQLITE_SETTINGS)
+    for name, value in (settings or {}).items():
+        allowed = SQLITE_SETTING_VALUES.get(name)
+        if allowed is None:
+            raise ValueError(f"Unknown sqlite setting {name}")
+        if allowed is int:
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError(f"sqlite setting {name} must be a number")
+        else:
+            value = str(value).upper()
+            if value not in allowed:
+                raise ValueError(
+                    f"sqlite setting {name} must be one of {', '.join(allowed)}"
+                    )
+        combined[name] = value
+
+    return combined
+
+
+def apply_sqlite_settings(
+    connection: sqlite3.Connection,
+    settings: Optional[dict] = None,
+    read_only: bool = False
+    ) -> None:
+    """Sets the PRAGMAs for a new connection.
+
+    Args:
+        connection: A sqlite3 database connection
+        settings: The "sqlite" section of the config file, if any.
+        read_only: Skips journal_mode, which a read only connection
+            can't change, and stops the connection from writing.
+    """
+    settings = get_sqlite_settings(settings=settings)
+    # Foreign keys are off by default in SQLite and have to be
+    # enabled for every connection.
+    connection.execute('PRAGMA foreign_keys = ON;')
+    if read_only:
+        connection.execute('PRAGMA query_only = ON;')
+    else:
+        # The journal mode is stored in the database file so this only
+        # changes something the first time.
+        connection.execute(f'PRAGMA journal_mode = {settings["journal_mode"]};')
+    connection.execute(f'PRAGMA synchronous = {settings["synchronous"]};')
+    connection.execute(f'PRAGMA cache_size = {settings["cache_size"]};')
+    connection.execute(f'PRAGMA mmap_size = {settings["mmap_size"]};')
+    connection.execute(f'PRAGMA temp_store = {settings["temp_store"]};')
+    connection.execute(f'PRAGMA busy_timeout = {settings["busy_timeout"]};')
+
+
+def connect_database(
+    database: os.PathLike,
+    settings: Optional[dict] = None,
+    read_only: bool = False,
+    check_same_thread: bool = True
+    ) -> sqlite3.Connection: 
     """Connects to a specified sqlite database.
 
     Args:
         db: A path to a sqlite database file. String
+        settings: The "sqlite" section of the config file, if any.
+        read_only: Opens the database file in read only mode.
+        check_same_thread: Set to False for connections that are
+            handed between threads, e.g. by a ConnectionManager.
     Returns:
         A sqlite3 database connection object.
     """
     con = None
 
     try:
-        con = sqlite3.connect(database)
+        if read_only:
+            con = sqlite3.connect(
+                pathlib.Path(database).resolve().as_uri() + '?mode=ro',
+                uri=True,
+                check_same_thread=check_same_thread
+                )
+        else:
+            con = sqlite3.connect(
+                database,
+                check_same_thread=check_same_thread
+                )
+        apply_sqlite_settings(
+            connection=con,
+            settings=settings,
+            read_only=read_only
+            )
         logger.info("Successfully connected to the database")
         return con
 
@@ -80,6 +192,27 @@ def connect_database(database: os.PathLike) -> sqlite3.Connection:
         sys.exit(1)
 
 
+def get_database_path(connection: sqlite3.Connection) -> str:
+    """Gets the file a database connection is using.
+
+    Args:
+        connection: A sqlite3 database connection
+
+    Returns:
+        The path to the main database file, empty for an in-memory
+        database.
+    """
+    try:
+        cur = sqlite3.Cursor(connection)
+        cur.execute('SELECT file FROM pragma_database_list WHERE name = "main";')
+
+        return cur.fetchone()[0]
+
+    except sqlite3.Error as e:
+        logger.error(e)
+        sys.exit(1)
+
+
 def close_database(connection: sqlite3.Connection) -> None:
     """Closes the database connection.
 
@@ -0,0 +1,398 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import concurrent.futures
+import dataclasses
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Callable, Optional
+
+import jbs.database.database_files as dbfiles
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Number of files hashed at the same time. Each one is read by its own
+# process, so a few keep a disk busy while the hashing uses several
+# processors, and more would only make a hard drive seek back and forth.
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Bytes hashed from the start and the end of a file for its partial
+# hash. Files no bigger than twice this are hashed whole.
+PARTIAL_SIZE = 64 * 1024
+
+# Bytes read at a time when hashing a whole file, so a large ZIP is
+# never in memory at once
+READ_SIZE = 1024 * 1024
+
+# Number of files sent to a process at once for partial hashes, which
+# are quick enough that sending them one at a time would cost more
+# than hashing them
+PARTIAL_BATCH_SIZE = 64
+
+# Only this many errors are kept in a report, the rest are still counted
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclasses.dataclass
+class HashReport:
+    """The outcome of hashing the model files.
+
+    Attributes:
+        candidates: The number of files with the same size as another.
+        cached: The number of those that hadn't changed on disk since
+            they were last hashed.
+        partial: The number of files that had a partial hash made.
+        full: The number of files that were read whole.
+        saved: The number of files whose hashes were saved.
+        duplicates: The number of files with the same contents as
+            another file.
+        wasted: The bytes used by every copy after the first.
+        error_count: The number of files that could not be read.
+        errors: Messages for the first files that could not be read.
+    """
+    candidates: int = 0
+    cached: int = 0
+    partial: int = 0
+    full: int = 0
+    saved: int = 0
+    duplicates: int = 0
+    wasted: int = 0
+    error_count: int = 0
+    errors: list[str] = dataclasses.field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+        logger.warning(message)
+
+
+@dataclasses.dataclass
+class Hashing:
+    """The hashes made by hash_files, ready to be saved.
+
+    Attributes:
+        hashes: The files that were hashed.
+        report: The counts of the hashing so far.
+    """
+    hashes: list[dbfiles.FileHash]
+    report: HashReport
+
+
+def hash_file(path: str, partial: bool = False) -> str:
+    """Hashes the contents of a file.
+
+    The file is read READ_SIZE bytes at a time, so its size doesn't
+    matter.
+
+    Args:
+        path: The file to hash.
+        partial: Only hashes the first and last PARTIAL_SIZE bytes.
+            A file no bigger than twice that is hashed whole, so its
+            partial hash is also its full hash.
+
+    Returns:
+        The hash as hexadecimal text.
+
+    Raises:
+        OSError: If the file can't be read.
+    """
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as model_file:
+        if partial and os.fstat(model_file.fileno()).st_size > 2 * PARTIAL_SIZE:
+            digest.update(model_file.read(PARTIAL_SIZE))
+            model_file.seek(-PARTIAL_SIZE, os.SEEK_END)
+            digest.update(model_file.read(PARTIAL_SIZE))
+            return digest.hexdigest()
+
+        buffer = bytearray(READ_SIZE)
+        view = memoryview(buffer)
+        while count := model_file.readinto(buffer):
+            digest.update(view[:count])
+
+    return digest.hexdigest()
+
+
+def stat_batch(paths: list[str]) -> list[tuple[Optional[tuple[int, int]], Optional[str]]]:
+    """Looks at several files in a worker process.
+
+    Args:
+        paths: The files to look at.
+
+    Returns:
+        The size and modification time, or None and an error message,
+        for each file.
+    """
+    results = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            results.append(((stat.st_size, stat.st_mtime_ns), None))
+        except OSError as e:
+            results.append((None, f"Could not read {path}: {e.strerror}"))
+    return results
+
+
+def hash_batch(
+    paths: list[str],
+    partial: bool
+    ) -> list[tuple[Optional[tuple[str, int, int]], Optional[str]]]:
+    """Hashes several files in a worker process.
+
+    Each file is looked at before it is read, so if it changes while it
+    is read, the modification time saved with its hash is already out
+    of date and it is hashed again next time.
+
+    Args:
+        paths: The files to hash.
+        partial: Makes partial hashes, see hash_file.
+
+    Returns:
+        The hash, size and modification time, or None and an error
+        message, for each file.
+    """
+    results = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            results.append((
+                (hash_file(path=path, partial=partial), stat.st_size, stat.st_mtime_ns),
+                None
+                ))
+        except OSError as e:
+            results.append((None, f"Could not read {path}: {e.strerror}"))
+    return results
+
+
+def _check_stage(
+    pool: concurrent.futures.Executor,
+    files: list[dbfiles.FileHash],
+    report: HashReport,
+    progress: Optional[Callable[[HashReport], None]],
+    stop: Optional[Callable[[], bool]]
+    ) -> tuple[set[int], bool]:
+    """Compares files that have hashes with the files on disk.
+
+    The hashes of a file whose size or modification time changed since
+    it was hashed are dropped, so it is hashed again.
+
+    Returns:
+        The IDs of the files that can't be read any more, and whether
+        the hashing was stopped.
+    """
+    running = {}
+    for start in range(0, len(files), PARTIAL_BATCH_SIZE):
+        batch = files[start:start + PARTIAL_BATCH_SIZE]
+        future = pool.submit(stat_batch, [file.path for file in batch])
+        running[future] = batch
+
+    missing = set()
+    for future in concurrent.futures.as_completed(running):
+        for file_hash, (stat, error) in zip(running[future], future.result()):
+            if error is not None:
+                report.add_error(error)
+                missing.add(file_hash.file)
+            elif stat == (file_hash.size, file_hash.modified):
+                report.cached += 1
+            else:
+                file_hash.size, file_hash.modified = stat
+                file_hash.partial = file_hash.full = None
+
+        if progress is not None:
+            progress(report)
+        if stop is not None and stop():
+            logger.info("Hashing stopped")
+            for future in running:
+                future.cancel()
+            return missing, True
+
+    return missing, False
+
+
+def _hash_stage(
+    pool: concurrent.futures.Executor,
+    files: list[dbfiles.FileHash],
+    partial: bool,
+    report: HashReport,
+    progress: Optional[Callable[[HashReport], None]],
+    stop: Optional[Callable[[], bool]]
+    ) -> tuple[list[dbfiles.FileHash], bool]:
+    """Hashes files in the process pool and records the hashes on them.
+
+    Returns:
+        The files that were hashed, and whether the hashing was stopped.
+    """
+    batch_size = PARTIAL_BATCH_SIZE if partial else 1
+    running = {}
+    for start in range(0, len(files), batch_size):
+        batch = files[start:start + batch_size]
+        future = pool.submit(hash_batch, [file.path for file in batch], partial)
+        running[future] = batch
+
+    hashed = []
+    for future in concurrent.futures.as_completed(running):
+        for file_hash, (result, error) in zip(running[future], future.result()):
+            if error is not None:
+                report.add_error(error)
+                continue
+            digest, size, modified = result
+            if partial:
+                file_hash.size, file_hash.modified = size, modified
+                file_hash.partial = digest
+                if size <= 2 * PARTIAL_SIZE:
+                    file_hash.full = digest
+                report.partial += 1
+                hashed.append(file_hash)
+            elif (size, modified) != (file_hash.size, file_hash.modified):
+                # Its partial hash is out of date too, so nothing is saved
+                report.add_error(f"{file_hash.path} changed while it was hashed")
+                file_hash.partial = None
+            else:
+                file_hash.full = digest
+                report.full += 1
+                hashed.append(file_hash)
+
+        if progress is not None:
+            progress(report)
+        if stop is not None and stop():
+            logger.info("Hashing stopped")
+            for future in running:
+                future.cancel()
+            return hashed, True
+
+    return hashed, False
+
+
+def hash_files(
+    candidates: list[dbfiles.FileHash],
+    workers: int = HASH_WORKERS,
+    progress: Optional[Callable[[HashReport], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> Hashing:
+    """Hashes the model files that could have a copy.
+
+    Files are compared in stages, so most are never read whole: only
+    files with the same size as another are hashed, first the start and
+    end of each, and only files whose partial hashes also match are
+    read whole. A cached hash is reused if the size and modification
+    time of the file on disk are the ones it was hashed with, so
+    running it again only reads new and changed files, even ones that
+    changed since the last scan. Hashing is done by a pool of
+    processes, so several files are read and hashed at the same time.
+
+    Doesn't use the database, so it can run on its own thread without
+    holding a connection. The hashes are saved with save_hashing.
+
+    Args:
+        candidates: The files that could have a copy, as returned by
+            dbfiles.get_hash_candidates.
+        workers: The number of files hashed at the same time.
+        progress: Called after every batch of files.
+        stop: Called after every batch of files, the hashing ends early
+            if it returns True. The files hashed so far can still be
+            saved.
+
+    Returns:
+        The files that were hashed.
+    """
+    report = HashReport()
+    report.candidates = len(candidates)
+    hashed = {}
+    pool = None
+    stopped = False
+
+    try:
+        if candidates:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        files = [file_hash for file_hash in candidates if file_hash.partial is not None]
+        if files:
+            missing, stopped = _check_stage(pool, files, report, progress, stop)
+            candidates = [
+                file_hash for file_hash in candidates if file_hash.file not in missing
+                ]
+
+        files = [file_hash for file_hash in candidates if file_hash.partial is None]
+        logger.info(
+            f"Hashing {len(files)} of {len(candidates)} files with the same size"
+            )
+        if files and not stopped:
+            done, stopped = _hash_stage(pool, files, True, report, progress, stop)
+            hashed.update((file_hash.file, file_hash) for file_hash in done)
+
+        groups = {}
+        for file_hash in candidates:
+            if file_hash.partial is not None:
+                groups.setdefault((file_hash.size, file_hash.partial), []).append(file_hash)
+        files = [
+            file_hash for group in groups.values() if len(group) > 1
+            for file_hash in group if file_hash.full is None
+            ]
+        if files and not stopped:
+            logger.info(f"Hashing {len(files)} files with the same partial hash")
+            done, stopped = _hash_stage(pool, files, False, report, progress, stop)
+            hashed.update((file_hash.file, file_hash) for file_hash in done)
+    finally:
+        if pool is not None:
+            # A stopped pool isn't waited for, the files being hashed
+            # are finished in the background
+            pool.shutdown(wait=not stopped, cancel_futures=True)
+
+    copies = {}
+    for file_hash in candidates:
+        if file_hash.full is not None:
+            copies.setdefault(file_hash.full, []).append(file_hash.size)
+    for sizes in copies.values():
+        if len(sizes) > 1:
+            report.duplicates += len(sizes)
+            report.wasted += sum(sizes[1:])
+
+    return Hashing(hashes=list(hashed.values()), report=report)
+
+
+def hash_model_files(
+    connection: sqlite3.Connection,
+    workers: int = HASH_WORKERS,
+    progress: Optional[Callable[[HashReport], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> Hashing:
+    """Hashes the model files that could have a copy.
+
+    Reads the candidates from the database and runs hash_files on the
+    same thread, for callers that don't mind the connection being held
+    while the files are hashed.
+
+    Args:
+        connection: A sqlite database connection.
+        workers: The number of files hashed at the same time.
+        progress: Called after every batch of files.
+        stop: Called after every batch of files, the hashing ends early
+            if it returns True.
+    """
+    return hash_files(
+        candidates=dbfiles.get_hash_candidates(connection=connection),
+        workers=workers,
+        progress=progress,
+        stop=stop
+        )
+
+
+def save_hashing(connection: sqlite3.Connection, hashing: Hashing) -> HashReport:
+    """Writes the hashes made by hash_files to the database.
+
+    Args:
+        connection: A sqlite database connection.
+        hashing: The result of hash_files.
+
+    Returns:
+        The report of the hashing with the number of files saved added.
+    """
+    hashing.report.saved = dbfiles.save_hashes(
+        connection=connection,
+        hashes=hashing.hashes
+        )
+
+    return hashing.report
@@ -2,39 +2,124 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import csv
+import dataclasses
 import logging
 import pathlib
+import threading
 import tkinter as tk
 import tkinter.filedialog as tkf
 import tkinter.messagebox as tkm
 import tkinter.ttk as ttk
 
+import jbs.database.database_connections as dbconnections
+import jbs.database.database_executor as dbexecutor
+import jbs.database.database_export as dbexport
+import jbs.database.database_files as dbfiles
 import jbs.database.database_queries as dbqueries
+import jbs.database.database_search as dbsearch
+import jbs.duplicates as duplicates
+import jbs.importer as importer
 import jbs.inventory as inv
+import jbs.live_search as live_search
+import jbs.name_index as name_index
+import jbs.scanner as scanner
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.NOTSET)
 
+# How often, in milliseconds, finished database calls are checked for
+POLL_INTERVAL = 16
+
+# Number of suggestions shown by the artist and source pickers
+SUGGESTION_LIMIT = 20
+
+# Model attributes of the fields searched with LIKE
+MODEL_SEARCH_ATTRIBUTES = {
+    'Model_Name': 'model',
+    'Set_Name': 'set',
+    'Source_Note': 'source_note',
+    }
+
+# Filters that repeat the full-text searches on loaded results
+MODEL_TEXT_FILTER = live_search.full_text_filter(
+    'model', 'set', 'source_note', 'format', 'artist', 'source'
+    )
+ARTIST_TEXT_FILTER = live_search.full_text_filter('name', 'website', 'email')
+SOURCE_TEXT_FILTER = live_search.full_text_filter('name', 'website')
+
 
 class Window:
     """Creates and populates the main program window.
 
     An instance of this class creates the main program window along 
-    with it's tabs, frames, and form widgets. This class receives a
-    SQLite3 database connection.
+    with it's tabs, frames, and form widgets. This class receives the
+    path of the SQLite3 database and the optional connection, search
+    and scan settings from the config file.
     """
-    def __init__(self, connection):
+    def __init__(
+        self,
+        database,
+        settings=None,
+        search_settings=None,
+        scan_settings=None
+        ):
         """Initializes the Window class.
 
         Creates three tabs: Models, Artists, and Sources, each with
-        a search, add, and display section. The database connection
-        is used to populate various UI elements.
+        a search, add, and display section. The database is queried on
+        background threads to populate the various UI elements.
         """
         self.factory = inv.ObjectFactory()
-        self.connection = connection
+        self.connections = dbconnections.ConnectionManager(
+            database=database,
+            settings=settings
+            )
+        self.executor = dbexecutor.DatabaseExecutor(
+            connections=self.connections
+            )
+        self.lookups = self.connections.lookups
+        self.snapshot = self.connections.snapshot
+        self.search_settings = live_search.get_search_settings(
+            settings=search_settings
+            )
+        self.live = self.search_settings['live']
+        self.scan_settings = scanner.get_scan_settings(settings=scan_settings)
+        # Set when the window closes so a running scan stops
+        self.scan_stop = threading.Event()
+        self.busy = False
         self.root = tk.Tk()
         self.root.title("3D Models")
+        self.root.protocol('WM_DELETE_WINDOW', self.close)
+
+        # Each search box cancels its own superseded searches
+        self.searches = {
+            name: live_search.LiveSearch(
+                widget=self.root,
+                executor=self.executor,
+                version=self.connections.data_version,
+                delay=self.search_settings['delay']
+                )
+            for name in ('model', 'artist', 'source')
+            }
+
+        # Status bar showing when database calls are running
+        self.status_frame = ttk.Frame(master=self.root)
+        self.status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_label = ttk.Label(master=self.status_frame, text="Ready")
+        self.status_label.pack(side=tk.LEFT, padx=5, pady=2)
+        self.status_progress = ttk.Progressbar(
+            master=self.status_frame,
+            mode='indeterminate',
+            length=120
+            )
+        self.status_progress.pack(side=tk.LEFT, padx=5, pady=2)
+        self.cancel_search_button = ttk.Button(
+            master=self.status_frame,
+            text="Cancel Search",
+            state=tk.DISABLED,
+            command=lambda: self.cancel_searches()
+            )
+        self.cancel_search_button.pack(side=tk.RIGHT, padx=5, pady=2)
 
         self.tabs = ttk.Notebook(master=self.root)
         self.tabs.pack(fill=tk.BOTH, expand=tk.YES)
@@ -60,11 +145,12 @@ class Window:
             sticky=tk.NSEW
             )
 
-        logger.info("Populating model table")
-        self.models = dbqueries.get_all_models(connection=self.connection)
-        self.model_table = Table(
+        self.models = []
+        self.model_table = VirtualTable(
             frame=self.model_display_frame,
-            input_obj=self.models
+            input_obj=self.models,
+            record_type=inv.Model,
+            pager=self.request_model_page
             )
 
         # Fill Model search section
@@ -91,6 +177,8 @@ class Window:
             )
 
         self.model_search_options = [
+            "All_Fields",
+            "Query",
             "Model_Name",
             "Set_Name",
             "Source_Note",
@@ -131,6 +219,19 @@ class Window:
         for self.widget in list(self.model_search_frame.children.values()):
             self.widget.bind(sequence='<Return>', func=search_model_return)
 
+        def search_model_typed(event):
+            self.searches['model'].schedule(
+                key=self.model_search_selected.get(),
+                term=self.model_search_textbox.get_text(),
+                run=self.search_models
+                )
+
+        if self.live:
+            self.model_search_textbox.text_box.bind(
+                sequence='<KeyRelease>',
+                func=search_model_typed
+                )
+
         # Fill add model section
         self.model_newitem_frame = ttk.LabelFrame(
             master=self.model_frame,
@@ -190,13 +291,9 @@ class Window:
             text="Artist"
             )
         self.model_artist_label.grid(row=0, column=2, sticky=tk.SE)
-        logger.info("Populating artist dropdown for adding model")
-
-        self.artist_selection_obj = dbqueries.get_all_artists(
-            connection=self.connection
-            )
+        self.artist_selection_obj = []
 
-        self.model_artist_dropdown = DropdownBox(
+        self.model_artist_dropdown = SearchBox(
             frame=self.model_newitem_frame,
             input_obj=self.artist_selection_obj,
             row=0,
@@ -209,13 +306,9 @@ class Window:
             text="Source"
             )
         self.model_source_label.grid(row=1, column=2, sticky=tk.NE)
-        logger.info("Populating source dropdown for adding model")
+        self.source_selection_obj = []
 
-        self.source_selection_obj = dbqueries.get_all_sources(
-            connection=self.connection
-            )
-
-        self.model_source_dropdown = DropdownBox(
+        self.model_source_dropdown = SearchBox(
             frame=self.model_newitem_frame,
             input_obj=self.source_selection_obj,
             row=1,
@@ -304,6 +397,11 @@ class Window:
             weight=1,
             uniform="model_tablecommand"
             )
+        self.model_tablecommand_frame.columnconfigure(
+            index=2,
+            weight=1,
+            uniform="model_tablecommand"
+            )
         
         self.delete_model_button = ttk.Button(
             master=self.model_tablecommand_frame,
@@ -321,7 +419,7 @@ class Window:
         self.export_models_button = ttk.Button(
             master=self.model_tablecommand_frame,
             text="Export",
-            command=lambda: self.export_table(table=self.model_table)
+            command=lambda: self.export_table(record_type='model')
             )
         self.export_models_button.grid(
             column=1,
@@ -331,6 +429,19 @@ class Window:
             pady=5
             )
 
+        self.import_models_button = ttk.Button(
+            master=self.model_tablecommand_frame,
+            text="Import",
+            command=lambda: self.import_file(record_type='model')
+            )
+        self.import_models_button.grid(
+            column=2,
+            row=0,
+            sticky=tk.NW,
+            padx=5,
+            pady=5
+            )
+
         self.tabs.add(child=self.model_frame, text="Models")
 
         # Create and populate Artist tab
@@ -354,11 +465,11 @@ class Window:
             sticky=tk.NSEW
             )
 
-        logger.info("Populating artist table")
-        self.artists = dbqueries.get_all_artists(connection=self.connection)
-        self.artist_table = Table(
+        self.artists = []
+        self.artist_table = VirtualTable(
             frame=self.artist_display_frame,
-            input_obj=self.artists
+            input_obj=self.artists,
+            record_type=inv.Artist
             )
 
         # Fill Artist search section
@@ -403,6 +514,19 @@ class Window:
         for self.widget in list(self.artist_search_frame.children.values()):
             self.widget.bind(sequence='<Return>', func=search_artist_return)
 
+        def search_artist_typed(event):
+            self.searches['artist'].schedule(
+                key='artist',
+                term=self.artist_search_textbox.get_text(),
+                run=self.search_artist
+                )
+
+        if self.live:
+            self.artist_search_textbox.text_box.bind(
+                sequence='<KeyRelease>',
+                func=search_artist_typed
+                )
+
         # Fill Add Artist section
         self.artist_newitem_frame = ttk.LabelFrame(
             master=self.artist_frame,
@@ -518,6 +642,21 @@ class Window:
             weight=1,
             uniform="artist_tablecommand"
             )
+        self.artist_tablecommand_frame.columnconfigure(
+            index=2,
+            weight=1,
+            uniform="artist_tablecommand"
+            )
+        self.artist_tablecommand_frame.columnconfigure(
+            index=3,
+            weight=1,
+            uniform="artist_tablecommand"
+            )
+        self.artist_tablecommand_frame.columnconfigure(
+            index=4,
+            weight=1,
+            uniform="artist_tablecommand"
+            )
 
         self.artist_delete_button = ttk.Button(
             master=self.artist_tablecommand_frame,
@@ -536,7 +675,7 @@ class Window:
         self.artist_export_button = ttk.Button(
             master=self.artist_tablecommand_frame,
             text="Export",
-            command=lambda: self.export_table(table=self.artist_table)
+            command=lambda: self.export_table(record_type='artist')
             )
 
         self.artist_export_button.grid(
@@ -547,6 +686,45 @@ class Window:
             pady=5
             )
 
+        self.artist_import_button = ttk.Button(
+            master=self.artist_tablecommand_frame,
+            text="Import",
+            command=lambda: self.import_file(record_type='artist')
+            )
+        self.artist_import_button.grid(
+            column=2,
+            row=0,
+            sticky=tk.NW,
+            padx=5,
+            pady=5
+            )
+
+        self.artist_scan_button = ttk.Button(
+            master=self.artist_tablecommand_frame,
+            text="Scan Folders",
+            command=lambda: self.scan_folders()
+            )
+        self.artist_scan_button.grid(
+            column=3,
+            row=0,
+            sticky=tk.NW,
+            padx=5,
+            pady=5
+            )
+
+        self.artist_full_scan_button = ttk.Button(
+            master=self.artist_tablecommand_frame,
+            text="Full Scan",
+            command=lambda: self.scan_folders(full=True)
+            )
+        self.artist_full_scan_button.grid(
+            column=4,
+            row=0,
+            sticky=tk.NW,
+            padx=5,
+            pady=5
+            )
+
         self.tabs.add(child=self.artist_frame, text="Artists")
 
         # Create and populate Source tab
@@ -570,11 +748,11 @@ class Window:
             sticky=tk.NSEW
             )
 
-        logger.info("Populating source table")
-        self.sources = dbqueries.get_all_sources(connection=self.connection)
-        self.sources_table = Table(
+        self.sources = []
+        self.sources_table = VirtualTable(
             frame=self.source_display_frame,
-            input_obj=self.sources
+            input_obj=self.sources,
+            record_type=inv.Source
             )
 
         # Fill Source Search section
@@ -613,6 +791,19 @@ class Window:
         for self.widget in list(self.source_search_frame.children.values()):
             self.widget.bind(sequence='<Return>', func=search_source_return)
 
+        def search_source_typed(event):
+            self.searches['source'].schedule(
+                key='source',
+                term=self.source_search_textbox.get_text(),
+                run=self.search_source
+                )
+
+        if self.live:
+            self.source_search_textbox.text_box.bind(
+                sequence='<KeyRelease>',
+                func=search_source_typed
+                )
+
         self.source_search_button.grid(
             padx=2,
             pady=2,
@@ -706,6 +897,11 @@ class Window:
             weight=1,
             uniform="source_tablecommand"
             )
+        self.source_tablecommand_frame.columnconfigure(
+            index=2,
+            weight=1,
+            uniform="source_tablecommand"
+            )
 
         self.source_tablecommand_delete_button = ttk.Button(
             master=self.source_tablecommand_frame,
@@ -723,7 +919,7 @@ class Window:
         self.source_export_button = ttk.Button(
             master=self.source_tablecommand_frame,
             text="Export",
-            command=lambda: self.export_table(self.sources_table)
+            command=lambda: self.export_table(record_type='source')
             )
         self.source_export_button.grid(
             column=1,
@@ -733,53 +929,206 @@ class Window:
             pady=5
             )
 
+        self.source_import_button = ttk.Button(
+            master=self.source_tablecommand_frame,
+            text="Import",
+            command=lambda: self.import_file(record_type='source')
+            )
+        self.source_import_button.grid(
+            column=2,
+            row=0,
+            sticky=tk.NW,
+            padx=5,
+            pady=5
+            )
+
         self.tabs.add(child=self.source_frame, text="Sources")
 
+        # Create and populate Duplicates tab
+        self.duplicate_frame = tk.Frame(master=self.tabs)
+        self.duplicate_frame.pack(padx=2, pady=2, fill=tk.BOTH, expand=tk.YES)
+        self.duplicate_frame.columnconfigure(index=0, weight=1)
+        self.duplicate_frame.rowconfigure(index=0, weight=1)
+
+        self.duplicate_display_frame = ttk.LabelFrame(
+            master=self.duplicate_frame,
+            text="Duplicate Files"
+            )
+        self.duplicate_display_frame.grid(row=0, column=0, sticky=tk.NSEW)
+
+        self.duplicates = []
+        self.duplicate_table = VirtualTable(
+            frame=self.duplicate_display_frame,
+            input_obj=self.duplicates,
+            record_type=inv.DuplicateFile
+            )
+
+        self.duplicate_tablecommand_frame = ttk.LabelFrame(
+            master=self.duplicate_frame,
+            text="Table Commands"
+            )
+        self.duplicate_tablecommand_frame.grid(row=1, column=0, sticky=tk.NSEW)
+        self.duplicate_tablecommand_frame.columnconfigure(index=1, weight=1)
+
+        self.duplicate_find_button = ttk.Button(
+            master=self.duplicate_tablecommand_frame,
+            text="Find Duplicates",
+            command=lambda: self.find_duplicates()
+            )
+        self.duplicate_find_button.grid(
+            column=0,
+            row=0,
+            sticky=tk.NW,
+            padx=5,
+            pady=5
+            )
+
+        self.duplicate_summary_label = ttk.Label(
+            master=self.duplicate_tablecommand_frame,
+            text=""
+            )
+        self.duplicate_summary_label.grid(
+            column=1,
+            row=0,
+            sticky=tk.W,
+            padx=5,
+            pady=5
+            )
+
+        self.tabs.add(child=self.duplicate_frame, text="Duplicates")
+
+        logger.info("Populating tables and dropdowns")
+        self.refresh_tables()
+        self.root.after(POLL_INTERVAL, self.poll_database)
+
+    def poll_database(self):
+        """Handles finished database calls and updates the status bar.
+
+        Runs every POLL_INTERVAL milliseconds for as long as the
+        window is open.
+        """
+        self.executor.process_results()
+
+        if self.executor.pending():
+            if not self.busy:
+                self.busy = True
+                self.status_label.config(text="Working...")
+                self.status_progress.start()
+        elif self.busy:
+            self.busy = False
+            self.status_label.config(text="Ready")
+            self.status_progress.stop()
+
+        if any(
+            search.job is not None or search.timer is not None
+            for search in self.searches.values()
+            ):
+            self.cancel_search_button.state(['!disabled'])
+        else:
+            self.cancel_search_button.state(['disabled'])
+
+        self.root.after(POLL_INTERVAL, self.poll_database)
+
+    def cancel_searches(self):
+        """Cancels every search that hasn't finished yet."""
+        for search in self.searches.values():
+            search.cancel()
+        logger.info("Searches cancelled")
+
+    def close(self):
+        """Stops the database threads and closes the window."""
+        self.scan_stop.set()
+        self.executor.shutdown(timeout=5)
+        self.connections.close()
+        self.root.destroy()
+
     def refresh_tables(self):
         """Replaces the tables and dropdowns with new data from the database.
 
         Pulls the latest data from the database and repopulates the three
-        tables and the two model dropdowns.
+        tables and the two model dropdowns. The artist and source lists
+        come from the shared snapshot, so they are only queried again if
+        the database changed, and each list is used for both its table
+        and its dropdown.
         """
         logger.debug("Updating model list")
-        self.updated_model_table = dbqueries.get_all_models(
-            connection=self.connection
-            )
+        self.model_table.load_pages()
 
         logger.debug("Updating artist list")
-        self.updated_artist_table = dbqueries.get_all_artists(
-            connection=self.connection
+        self.executor.submit(
+            func=self.snapshot.get_artists,
+            read_only=True,
+            callback=self.update_artists
             )
 
         logger.debug("Updating source list")
-        self.updated_source_table = dbqueries.get_all_sources(
-            connection=self.connection
+        self.executor.submit(
+            func=self.snapshot.get_sources,
+            read_only=True,
+            callback=self.update_sources
             )
 
-        self.model_table.refresh_table(input_obj=self.updated_model_table)
-        self.artist_table.refresh_table(input_obj=self.updated_artist_table)
-        self.sources_table.refresh_table(input_obj=self.updated_source_table)
-
-        logger.debug("Updating artist dropdown")
-        self.refreshed_artists = dbqueries.get_all_artists(
-            connection=self.connection
+        logger.debug("Updating duplicate list")
+        self.executor.submit(
+            func=dbfiles.get_duplicates,
+            read_only=True,
+            callback=self.show_duplicates
             )
 
-        self.model_artist_dropdown.refresh_options(input=self.refreshed_artists)
-        logger.debug("Updating source dropdown")
-        self.refreshed_sources = dbqueries.get_all_sources(
-            connection=self.connection
+    def request_model_page(self, after, order_by, descending, callback):
+        """Queues the query for a page of the model table.
+
+        Args:
+            after: The cursor token of the previous page or None.
+            order_by: The model attribute to sort by.
+            descending: Whether to sort descending or not.
+            callback: Called with the models and the next cursor token.
+        """
+        self.executor.submit(
+            func=dbqueries.get_models_page,
+            read_only=True,
+            callback=callback,
+            after=after,
+            order_by=order_by,
+            descending=descending
             )
 
-        self.model_source_dropdown.refresh_options(input=self.refreshed_sources)
+    def update_artists(self, artists):
+        """Replaces the artist table and dropdown.
+
+        Args:
+            artists: A list of artist objects.
+        """
+        self.artist_table.refresh_table(input_obj=artists)
+        self.model_artist_dropdown.refresh_options(input=artists)
+
+    def update_sources(self, sources):
+        """Replaces the sources table and dropdown.
+
+        Args:
+            sources: A list of source objects.
+        """
+        self.sources_table.refresh_table(input_obj=sources)
+        self.model_source_dropdown.refresh_options(input=sources)
+
+    def show_results(self, table, results):
+        """Replaces the contents of a table with query results.
+
+        Args:
+            table: The table to refresh.
+            results: A list of model, artist, or source objects.
+        """
+        if not results:
+            logger.warning("No results found")
+        table.refresh_table(input_obj=results)
 
     def add_model(self):
         """Adds a new model to the database.
 
         Gathers the data that the user entered into the add model form
         and creates a model object to be inserted into the database. 
-        After inserting the model, it refreshes the tables and
-        dropdowns so that they reflect the new data.
+        After inserting the model, only the new row is added to the
+        model table.
         """
         self.new_model_entry = []
         # Adds a placeholder for the ID since it will be generated by
@@ -822,17 +1171,45 @@ class Window:
 
         self.new_model = self.factory.createModel(self.new_model_entry)
 
+        def add_and_get_model(connection, model):
+            model_id = dbqueries.add_model(
+                connection=connection,
+                model=model,
+                cache=self.lookups
+                )
+            if model_id is None:
+                return None
+            return dbqueries.get_model(connection=connection, model_id=model_id)
+
         logger.info("Adding model to the database")
-        dbqueries.add_model(connection=self.connection, model=self.new_model)
-        self.refresh_tables()
+        self.executor.submit(
+            func=add_and_get_model,
+            callback=self.model_added,
+            model=self.new_model
+            )
+
+    def model_added(self, model):
+        """Adds a newly inserted model to the model table.
+
+        Args:
+            model: The model object or None if it couldn't be added.
+        """
+        if model is None:
+            tkm.showwarning(
+                title="Unknown Artist or Source",
+                message="The selected artist or source no longer exists. "
+                    "Please select another one and try again."
+                )
+            return
+        self.model_table.insert_row(model)
 
     def add_artist(self):
         """Adds a new artist to the database.
 
         Gathers the data that the user entered into the add artist form
         and creates an artist object to be inserted into the database. 
-        After inserting the artist, it refreshes the tables and 
-        dropdowns so that they reflect the new data.
+        After inserting the artist, the new row is added to the artist
+        table and the artist dropdown.
         """
         self.new_artist_entry = []
         self.new_artist_entry.append(0)
@@ -846,17 +1223,38 @@ class Window:
         self.artist_folder_textbox.clear_text()
 
         self.new_artist = self.factory.createArtist(self.new_artist_entry)
+
+        def add_artist(connection, artist):
+            artist.id = dbqueries.add_artist(
+                connection=connection,
+                artist=artist,
+                cache=self.lookups
+                )
+            return artist
+
         logger.info("Adding artist to the database")
-        dbqueries.add_artist(connection=self.connection, artist=self.new_artist)
-        self.refresh_tables()
+        self.executor.submit(
+            func=add_artist,
+            callback=self.artist_added,
+            artist=self.new_artist
+            )
+
+    def artist_added(self, artist):
+        """Adds a newly inserted artist to the table and dropdown.
+
+        Args:
+            artist: The artist object with its new ID.
+        """
+        self.artist_table.insert_row(artist)
+        self.model_artist_dropdown.add_option(artist.name)
 
     def add_source(self):
         """Adds a new source to the database.
 
         Gathers the data that the user entered into the add source
         form and creates a source object to be inserted into the
-        database. After inserting the source, it refreshes the tables
-        and dropdown so that they reflect the new data.
+        database. After inserting the source, the new row is added to
+        the sources table and the source dropdown.
         """
         self.new_source_entry = []
         self.new_source_entry.append(0)
@@ -866,68 +1264,46 @@ class Window:
         self.source_website_textbox.clear_text()
 
         self.new_source = self.factory.createSource(self.new_source_entry)
+
+        def add_source(connection, source):
+            source.id = dbqueries.add_source(
+                connection=connection,
+                source=source,
+                cache=self.lookups
+                )
+            return source
+
         logger.info("Adding source to the database")
-        dbqueries.add_source(connection=self.connection, source=self.new_source)
-        self.refresh_tables()
+        self.executor.submit(
+            func=add_source,
+            callback=self.source_added,
+            source=self.new_source
+            )
+
+    def source_added(self, source):
+        """Adds a newly inserted source to the table and dropdown.
+
+        Args:
+            source: The source object with its new ID.
+        """
+        self.sources_table.insert_row(source)
+        self.model_source_dropdown.add_option(source.name)
 
     def search_models(self):
         """Searches the database for models matching a search term.
 
         Gathers the user's search term and selected field to search
-        and returns the matching rows as a model object then refreshes
-        the model table so that it will reflect the newly entered data.
-
-        Returns:
-            A list of model objects matching the query
+        and queues the search. A search that is still running is
+        cancelled first. The model table is refreshed with the
+        matching models when the search finishes. With live search
+        the term is left in the textbox so the user can keep typing.
         """
         self.model_search_term = self.model_search_textbox.get_text()
-        self.model_search_textbox.clear_text()
+        if not self.live:
+            self.model_search_textbox.clear_text()
         self.model_search_field = self.model_search_selected.get()
 
-        if self.model_search_field:
-            logger.info("Searching models")
-            logger.debug(
-                f"{self.model_search_term} in {self.model_search_field}"
-                )
-            if self.model_search_field == "Artist":
-                self.search_artist_id = dbqueries.get_artist_id(
-                    connection=self.connection,
-                    artist_name=self.model_search_term
-                    )
-                self.model_results = dbqueries.search_associated_models(
-                    connection=self.connection,
-                    field="Artist",
-                    search_id=self.search_artist_id
-                    )
-                try:
-                    self.model_table.refresh_table(input_obj=self.model_results)
-                except TypeError:
-                    logger.warning("No Models Found")
-            elif self.model_search_field == "Source":
-                self.search_source_id = dbqueries.get_source_id(
-                    connection=self.connection,
-                    source_name=self.model_search_term
-                    )
-                self.model_results = dbqueries.search_associated_models(
-                    connection=self.connection,
-                    field="Source",
-                    search_id=self.search_source_id
-                    )
-                try:
-                    self.model_table.refresh_table(input_obj=self.model_results)
-                except TypeError:
-                    logger.warning("No Models Found")
-            else:
-                self.model_results = dbqueries.search_model(
-                    connection=self.connection,
-                    field=self.model_search_field,
-                    search_text=self.model_search_term
-                    )
-                try:
-                    self.model_table.refresh_table(input_obj=self.model_results)
-                except TypeError:
-                    logger.warning("No Models Found")
-        else:
+        if not self.model_search_field:
             logger.warning("Missing search field")
             tkm.showwarning(
                 title="Missing Field",
@@ -935,52 +1311,168 @@ class Window:
                     "Please select a search field from the dropdown box and "
                     "try again."
                 )
+            return
+
+        def search_by_artist(connection, search_text):
+            artist_id = dbqueries.get_artist_id(
+                connection=connection,
+                artist_name=search_text,
+                cache=self.lookups
+                )
+            return dbqueries.search_associated_models(
+                connection=connection,
+                field="Artist",
+                search_id=artist_id
+                )
+
+        def search_by_source(connection, search_text):
+            source_id = dbqueries.get_source_id(
+                connection=connection,
+                source_name=search_text,
+                cache=self.lookups
+                )
+            return dbqueries.search_associated_models(
+                connection=connection,
+                field="Source",
+                search_id=source_id
+                )
+
+        logger.info("Searching models")
+        logger.debug(f"{self.model_search_term} in {self.model_search_field}")
+        search = self.searches['model']
+        if self.model_search_field == "All_Fields":
+            # An empty search lists every model, which the paged table
+            # does without loading them all
+            if not dbqueries.build_match_query(self.model_search_term):
+                search.clear()
+                self.model_table.load_pages()
+                return
+            search.search(
+                key=self.model_search_field,
+                term=self.model_search_term,
+                func=dbqueries.full_text_search_models,
+                callback=self.show_model_results,
+                matches=MODEL_TEXT_FILTER,
+                narrows=live_search.full_text_narrows,
+                search_text=self.model_search_term
+                )
+        elif self.model_search_field == "Query":
+            # Mistakes are checked here so that a query that is still
+            # being typed doesn't reach the database
+            try:
+                dbsearch.parse_query(self.model_search_term)
+            except ValueError as e:
+                logger.warning(e)
+                search.cancel()
+                if self.live:
+                    self.status_label.config(text=str(e))
+                else:
+                    tkm.showwarning(title="Invalid Query", message=str(e))
+                return
+            search.search(
+                key=self.model_search_field,
+                term=self.model_search_term,
+                func=self.snapshot.search_models,
+                callback=self.show_model_results,
+                query=self.model_search_term
+                )
+        elif self.model_search_field == "Artist":
+            search.search(
+                key=self.model_search_field,
+                term=self.model_search_term,
+                func=search_by_artist,
+                callback=self.show_model_results,
+                search_text=self.model_search_term
+                )
+        elif self.model_search_field == "Source":
+            search.search(
+                key=self.model_search_field,
+                term=self.model_search_term,
+                func=search_by_source,
+                callback=self.show_model_results,
+                search_text=self.model_search_term
+                )
+        else:
+            search.search(
+                key=self.model_search_field,
+                term=self.model_search_term,
+                func=dbqueries.search_model,
+                callback=self.show_model_results,
+                matches=live_search.like_filter(
+                    MODEL_SEARCH_ATTRIBUTES[self.model_search_field]
+                    ),
+                narrows=live_search.like_narrows,
+                field=self.model_search_field,
+                search_text=self.model_search_term
+                )
+
+    def show_model_results(self, models):
+        """Shows the results of a model search."""
+        self.show_results(table=self.model_table, results=models)
 
     def search_artist(self):
         """Searches the database for artists matching a search term.
 
-        Gathers the user's search term and returns the matching rows
-        as an artist object then refreshes the artist table so that 
-        it will reflect the newly entered data.
-
-        Returns:
-            A list of artist objects matching the query
+        Gathers the user's search term and queues the search. The
+        artist table is refreshed with the matching artists when the
+        search finishes.
         """
         self.artist_search_term = self.artist_search_textbox.get_text()
-        self.artist_search_textbox.clear_text()
+        if not self.live:
+            self.artist_search_textbox.clear_text()
 
         logger.info("Searching artists")
-        self.artist_results = dbqueries.search_artist(
-            connection=self.connection,
-            search_text=self.artist_search_term
+        # An empty search lists every artist, which the snapshot has
+        if dbqueries.build_match_query(self.artist_search_term):
+            func = dbqueries.full_text_search_artists
+            kwargs = {'search_text': self.artist_search_term}
+        else:
+            func = self.snapshot.get_artists
+            kwargs = {}
+        self.searches['artist'].search(
+            key='artist',
+            term=self.artist_search_term,
+            func=func,
+            callback=lambda artists: self.show_results(
+                table=self.artist_table,
+                results=artists
+                ),
+            matches=ARTIST_TEXT_FILTER,
+            narrows=live_search.full_text_narrows,
+            **kwargs
             )
-        try:
-            self.artist_table.refresh_table(input_obj=self.artist_results)
-        except TypeError:
-            logger.warning("No Artists Found")
 
     def search_source(self):
         """Searches the database for sources matching a search term.
 
-        Gathers the user's search term and returns the matching rows
-        as a source object then refreshes the sources table so that 
-        it will reflect the newly entered data.
-
-        Returns:
-            A list of source objects matching the query
+        Gathers the user's search term and queues the search. The
+        sources table is refreshed with the matching sources when the
+        search finishes.
         """
         self.source_search_term = self.source_search_textbox.get_text()
-        self.source_search_textbox.clear_text()
+        if not self.live:
+            self.source_search_textbox.clear_text()
 
         logger.info("Searching sources")
-        self.search_results = dbqueries.search_source(
-            connection=self.connection,
-            search_text=self.source_search_term
+        # An empty search lists every source, which the snapshot has
+        if dbqueries.build_match_query(self.source_search_term):
+            func = dbqueries.full_text_search_sources
+            kwargs = {'search_text': self.source_search_term}
+        else:
+            func = self.snapshot.get_sources
+            kwargs = {}
+        self.searches['source'].search(
+            key='source',
+            term=self.source_search_term,
+            func=func,
+            callback=lambda sources: self.show_results(
+                table=self.sources_table,
+                results=sources
+                ),
+            matches=SOURCE_TEXT_FILTER,
+            narrows=live_search.full_text_narrows,
+            **kwargs
             )
-        try:
-            self.sources_table.refresh_table(input_obj=self.search_results)
-        except TypeError:
-            logger.warning("No Sources Found")
 
     def delete_model(self) -> None:
         """Deletes a model from the database."""
@@ -989,14 +1481,25 @@ class Window:
             title="Delete Model", 
             message=f"Do you want to delete {len(self.selected)} model(s)?"
             )
-        if self.delete_choice:
-            for self.selected_model in self.selected:
-                logger.info(f"Deleting Model_ID: {self.selected_model[0]}")
-                dbqueries.delete_model(
-                    connection=self.connection,
-                    model_id=self.selected_model[0]
-                    )
-            self.refresh_tables()
+        if not self.delete_choice:
+            return
+
+        self.executor.submit(
+            func=dbqueries.delete_models_bulk,
+            callback=self.models_deleted,
+            model_ids=[model[0] for model in self.selected]
+            )
+
+    def models_deleted(self, outcome):
+        """Removes the deleted models from the table.
+
+        Models that were not found had already been deleted, so they
+        are removed as well.
+
+        Args:
+            outcome: The outcome of the delete for every model ID.
+        """
+        self.model_table.delete_rows(outcome.keys())
 
     def delete_artist(self) -> None:
         """Deletes an artist from the database."""
@@ -1005,30 +1508,41 @@ class Window:
             title="Delete Artist",
             message=f"Do you want to delete {len(self.selected)} artist(s)?"
             )
-        if self.delete_choice:
-            for self.selected_artist in self.selected:
-                self.associated_models = dbqueries.search_associated_models(
-                    connection=self.connection,
-                    field='Artist',
-                    search_id=self.selected_artist[0]
-                    )
-                if not len(self.associated_models):  # type: ignore
-                    logger.info(f"Deleting Artist_ID: {self.selected_artist[0]}")
-                    dbqueries.delete_artist(
-                        connection=self.connection,
-                        artist_id=self.selected_artist[0]
-                        )
-                else:
-                    self.associated_model_warning = tkm.showwarning(
-                        title="Associated Models", 
-                        message="This artist is associated with models. "
-                            "Please delete the associated models before "
-                            "deleting the artist."
-                    )
-                    logger.warning(
-                        f"Artist {self.selected_artist[0]} has associated models"
-                        )
-            self.refresh_tables()
+        if not self.delete_choice:
+            return
+
+        # The artists that still have models are left in place and
+        # reported back.
+        artists = self.selected
+        self.executor.submit(
+            func=dbqueries.delete_artists_bulk,
+            callback=lambda outcome: self.artists_deleted(
+                outcome=split_outcome(rows=artists, outcome=outcome)
+                ),
+            artist_ids=[artist[0] for artist in artists],
+            cache=self.lookups
+            )
+
+    def artists_deleted(self, outcome):
+        """Removes deleted artists and warns about the ones that weren't.
+
+        Args:
+            outcome: A tuple of the deleted and the rejected artist rows.
+        """
+        deleted, rejected = outcome
+        self.artist_table.delete_rows(artist[0] for artist in deleted)
+        for artist in deleted:
+            self.model_artist_dropdown.remove_option(artist[1])
+
+        if rejected:
+            for artist in rejected:
+                logger.warning(f"Artist {artist[0]} has associated models")
+            tkm.showwarning(
+                title="Associated Models", 
+                message=f"{len(rejected)} artist(s) are associated with "
+                    "models. Please delete the associated models before "
+                    "deleting the artist."
+                )
 
     def delete_source(self) -> None:
         """Deletes a source from the database."""
@@ -1037,53 +1551,455 @@ class Window:
             title="Delete Source",
             message=f"Do you want to delete {len(self.selected)} source(s)?"
             )
-        if self.delete_choice:
-            for self.selected_source in self.selected:
-                self.associated_models = dbqueries.search_associated_models(
-                    connection=self.connection,
-                    field='Source',
-                    search_id=self.selected_source[0]
-                    )
-                if not len(self.associated_models):  # type: ignore
-                    logger.info(f"Deleting Source_ID: {self.selected_source[0]}")
-                    dbqueries.delete_source(
-                        connection=self.connection,
-                        source_id=self.selected_source[0]
-                        )
-                else:
-                    self.associated_model_warning = tkm.showwarning(
-                        title="Associated Models", 
-                        message="This source is associated with models. "
-                            "Please delete the associated models before "
-                            "deleting the source."
-                    )
-                    logger.warning(
-                        f"Source {self.selected_source[0]} has associated models"
-                        )
-            self.refresh_tables()
-
-    def export_table(self, table) -> None:
-        self.selected_table = table
-        self.exported_rows = self.selected_table.get_all_rows()
+        if not self.delete_choice:
+            return
+
+        # The sources that still have models are left in place and
+        # reported back.
+        sources = self.selected
+        self.executor.submit(
+            func=dbqueries.delete_sources_bulk,
+            callback=lambda outcome: self.sources_deleted(
+                outcome=split_outcome(rows=sources, outcome=outcome)
+                ),
+            source_ids=[source[0] for source in sources],
+            cache=self.lookups
+            )
+
+    def sources_deleted(self, outcome):
+        """Removes deleted sources and warns about the ones that weren't.
+
+        Args:
+            outcome: A tuple of the deleted and the rejected source rows.
+        """
+        deleted, rejected = outcome
+        self.sources_table.delete_rows(source[0] for source in deleted)
+        for source in deleted:
+            self.model_source_dropdown.remove_option(source[1])
+
+        if rejected:
+            for source in rejected:
+                logger.warning(f"Source {source[0]} has associated models")
+            tkm.showwarning(
+                title="Associated Models", 
+                message=f"{len(rejected)} source(s) are associated with "
+                    "models. Please delete the associated models before "
+                    "deleting the source."
+                )
+
+    def export_table(self, record_type: str) -> None:
+        """Exports models, artists, or sources to a file.
+
+        The rows are streamed straight from the database to CSV, JSON
+        Lines or SQL on a read only database thread, so the window stays
+        responsive during large exports and other queries can run at
+        the same time.
+
+        Args:
+            record_type: One of model, artist, or source.
+        """
         self.default_export = pathlib.Path.home().joinpath('export.csv')
         self.export_location = tkf.asksaveasfilename(
             title="Save File",
             initialdir=self.default_export,
             initialfile='export.csv',
-            filetypes=(("Comma Separated Values", "*.csv"),)
-            )
-        if self.export_location:
-            self.export_file = pathlib.Path(self.export_location)
-            with open(file=self.export_file, mode='w', newline='') as self.export:
-                self.export_writer = csv.writer(
-                    self.export,
-                    delimiter=',',
-                    quotechar='"',
-                    quoting=csv.QUOTE_MINIMAL
+            defaultextension='.csv',
+            filetypes=(
+                ("Comma Separated Values", "*.csv"),
+                ("JSON Lines", "*.jsonl"),
+                ("SQLite Dump", "*.sql"),
+                )
+            )
+        if not self.export_location:
+            return
+
+        self.export_file = pathlib.Path(self.export_location)
+        logger.info(f"Exporting {record_type}s to {self.export_file}")
+        self.executor.submit(
+            func=dbexport.export_table,
+            read_only=True,
+            callback=self.export_finished,
+            error_callback=self.export_failed,
+            record_type=record_type,
+            export_file=self.export_file
+            )
+
+    def export_finished(self, exported):
+        """Shows how many rows an export wrote.
+
+        Args:
+            exported: The number of rows returned by the export.
+        """
+        tkm.showinfo(
+            title="Export Complete",
+            message=f"Exported {exported} rows."
+            )
+
+    def export_failed(self, error):
+        """Shows why an export could not be written.
+
+        Args:
+            error: The exception raised by the export.
+        """
+        if not isinstance(error, (OSError, ValueError)):
+            raise error
+        logger.error(error)
+        tkm.showerror(
+            title="Export Failed",
+            message=f"The export could not be written: {error}"
+            )
+
+    def import_file(self, record_type: str) -> None:
+        """Imports models, artists or sources from a CSV or JSON Lines file.
+
+        Missing artists and sources are created when importing models.
+        The import runs on the database thread. The tables and
+        dropdowns are reloaded afterwards and a summary of the import
+        is shown.
+
+        Args:
+            record_type: One of model, artist, or source.
+        """
+        self.import_location = tkf.askopenfilename(
+            title="Import File",
+            initialdir=pathlib.Path.home(),
+            filetypes=(
+                ("Comma Separated Values", "*.csv"),
+                ("JSON Lines", "*.jsonl"),
+                )
+            )
+        if not self.import_location:
+            return
+
+        logger.info(f"Importing {record_type}s from {self.import_location}")
+        self.executor.submit(
+            func=importer.import_file,
+            callback=self.import_finished,
+            error_callback=self.import_failed,
+            data_file=pathlib.Path(self.import_location),
+            record_type=record_type,
+            cache=self.lookups,
+            progress=lambda report: logger.debug(
+                f"Imported {report.added} of {report.rows} rows"
+                )
+            )
+
+    def import_finished(self, report):
+        """Reloads the tables and shows a summary of an import.
+
+        Args:
+            report: The ImportReport returned by the import.
+        """
+        self.refresh_tables()
+        self.import_message = f"Added {report.added} of {report.rows} rows."
+        if report.error_count:
+            self.import_message += (
+                f"\n\n{report.error_count} rows were skipped:\n"
+                + "\n".join(
+                    f"Line {line}: {message}"
+                    for line, message in report.errors[:10]
                     )
-                self.export_writer.writerow(self.selected_table.columns)
-                for self.exported_row in self.exported_rows:
-                    self.export_writer.writerow(self.exported_row)
+                )
+        tkm.showinfo(title="Import Complete", message=self.import_message)
+
+    def import_failed(self, error):
+        """Shows why an import could not be run.
+
+        Args:
+            error: The exception raised by the import.
+        """
+        if not isinstance(error, (OSError, ValueError)):
+            raise error
+        logger.error(error)
+        tkm.showerror(title="Import Failed", message=str(error))
+
+    def scan_folders(self, full: bool = False) -> None:
+        """Finds the model files in every artist folder.
+
+        What the last scan found is read on a read only database
+        thread. The folders are then read on the executor's background
+        thread, which reads many directories at once, so the window and
+        the searches stay usable while a large or slow share is
+        scanned. The files found are then saved on the database thread.
+
+        Args:
+            full: Saves every directory again, linking its files to
+                models, not just the ones that changed since the last
+                scan.
+        """
+        logger.info("Scanning artist folders")
+        self.artist_scan_button.state(['disabled'])
+        self.artist_full_scan_button.state(['disabled'])
+        self.executor.submit(
+            func=scanner.read_scan_state,
+            read_only=True,
+            callback=self.scan_state_read,
+            error_callback=self.scan_failed,
+            root=self.scan_settings['root'],
+            full=full,
+            verify=self.scan_settings['verify']
+            )
+
+    def scan_state_read(self, state):
+        """Reads the artist folders once the database has been read.
+
+        Args:
+            state: The ScanState returned by read_scan_state.
+        """
+        self.executor.submit_background(
+            func=scanner.walk_artist_folders,
+            callback=self.scan_walked,
+            error_callback=self.scan_failed,
+            state=state,
+            workers=self.scan_settings['workers'],
+            stop=self.scan_stop.is_set
+            )
+
+    def scan_walked(self, scan):
+        """Saves the files found by a scan.
+
+        Args:
+            scan: The Scan returned by walk_artist_folders.
+        """
+        self.executor.submit(
+            func=scanner.save_scan,
+            callback=self.scan_finished,
+            error_callback=self.scan_failed,
+            scan=scan
+            )
+
+    def scan_finished(self, report):
+        """Shows a summary of a scan.
+
+        Args:
+            report: The ScanReport returned by save_scan.
+        """
+        self.artist_scan_button.state(['!disabled'])
+        self.artist_full_scan_button.state(['!disabled'])
+        self.scan_message = (
+            f"Read {report.directories} folders, {report.skipped} more "
+            f"hadn't changed. Found {report.files} files in them, "
+            f"{report.linked} of them linked to models.\n\n"
+            f"{report.added} added, {report.updated} changed and "
+            f"{report.removed} removed since the last scan."
+            )
+        if report.error_count:
+            self.scan_message += (
+                f"\n\n{report.error_count} folders could not be read:\n"
+                + "\n".join(report.errors[:10])
+                )
+        tkm.showinfo(title="Scan Complete", message=self.scan_message)
+
+    def scan_failed(self, error):
+        """Shows why a scan could not be run.
+
+        Args:
+            error: The exception raised by the scan.
+        """
+        self.artist_scan_button.state(['!disabled'])
+        self.artist_full_scan_button.state(['!disabled'])
+        if not isinstance(error, OSError):
+            raise error
+        logger.error(error)
+        tkm.showerror(title="Scan Failed", message=str(error))
+
+    def find_duplicates(self) -> None:
+        """Hashes the scanned model files to find the ones with copies.
+
+        The files that could have copies are read on a read only
+        database thread. They are then hashed by a pool of processes
+        started from the executor's background thread, so the window
+        and the searches stay usable while large files are read. The
+        hashes are then saved on the database thread and the duplicates
+        loaded again.
+        """
+        logger.info("Finding duplicate files")
+        self.duplicate_find_button.state(['disabled'])
+        self.duplicate_summary_label.config(text="Hashing files...")
+        self.executor.submit(
+            func=dbfiles.get_hash_candidates,
+            read_only=True,
+            callback=self.hash_candidates_read,
+            error_callback=self.duplicates_failed
+            )
+
+    def hash_candidates_read(self, candidates):
+        """Hashes the files that could have copies.
+
+        Args:
+            candidates: The FileHash list returned by get_hash_candidates.
+        """
+        self.executor.submit_background(
+            func=duplicates.hash_files,
+            callback=self.duplicates_hashed,
+            error_callback=self.duplicates_failed,
+            candidates=candidates,
+            workers=self.scan_settings['hash_workers'],
+            stop=self.scan_stop.is_set
+            )
+
+    def duplicates_hashed(self, hashing):
+        """Saves the hashes made while finding duplicates.
+
+        Args:
+            hashing: The Hashing returned by hash_files.
+        """
+        self.executor.submit(
+            func=duplicates.save_hashing,
+            callback=self.duplicates_saved,
+            error_callback=self.duplicates_failed,
+            hashing=hashing
+            )
+
+    def duplicates_saved(self, report):
+        """Shows a summary of the hashing and loads the duplicates.
+
+        Args:
+            report: The HashReport returned by save_hashing.
+        """
+        self.duplicate_find_button.state(['!disabled'])
+        self.duplicate_message = (
+            f"{report.duplicates} files have copies, "
+            f"{report.wasted / 1024**2:.1f} MB used by the extra copies. "
+            f"Read {report.full} files whole and the ends of "
+            f"{report.partial}, {report.cached} were already hashed."
+            )
+        if report.error_count:
+            self.duplicate_message += f" {report.error_count} files could not be read."
+        self.duplicate_summary_label.config(text=self.duplicate_message)
+        if report.errors:
+            tkm.showwarning(
+                title="Duplicates",
+                message=f"{report.error_count} files could not be read:\n"
+                    + "\n".join(report.errors[:10])
+                )
+        self.executor.submit(
+            func=dbfiles.get_duplicates,
+            read_only=True,
+            callback=self.show_duplicates
+            )
+
+    def show_duplicates(self, files):
+        """Replaces the duplicates table.
+
+        Args:
+            files: A list of duplicate file objects.
+        """
+        self.duplicates = files
+        self.show_results(table=self.duplicate_table, results=files)
+
+    def duplicates_failed(self, error):
+        """Shows why the files could not be hashed.
+
+        Args:
+            error: The exception raised while hashing.
+        """
+        self.duplicate_find_button.state(['!disabled'])
+        self.duplicate_summary_label.config(text="")
+        if not isinstance(error, OSError):
+            raise error
+        logger.error(error)
+        tkm.showerror(title="Finding Duplicates Failed", message=str(error))
+
+
+class MigrationWindow:
+    """Shows the progress of a schema update before the main window opens.
+
+    Table rebuilds can take minutes on a large inventory, and they run
+    on the main thread before the database threads start, so this small
+    window is updated from the migrate progress callback instead of a
+    mainloop. Closing it pauses the update after the current chunk.
+    """
+    def __init__(self):
+        """Opens the window."""
+        self.paused = False
+        self.root = tk.Tk()
+        self.root.title("3D Models")
+        self.root.resizable(width=False, height=False)
+        self.root.protocol('WM_DELETE_WINDOW', self.pause)
+
+        self.label = ttk.Label(
+            master=self.root,
+            text="Updating the database, this can take a few minutes"
+            )
+        self.label.pack(padx=10, pady=(10, 5))
+        self.progress_bar = ttk.Progressbar(master=self.root, length=300)
+        self.progress_bar.pack(padx=10, pady=(5, 10))
+        self.root.update()
+
+    def pause(self):
+        """Asks the update to stop after the chunk being copied."""
+        self.paused = True
+        self.label.config(text="Pausing the update")
+        self.root.update()
+
+    def stopped(self) -> bool:
+        """Returns whether the window was closed, for migrate's stop."""
+        return self.paused
+
+    def progress(self, migration, copied, total):
+        """Shows the rows a table rebuild has copied.
+
+        Args:
+            migration: The migration being applied.
+            copied: The rows copied so far.
+            total: The rows in the table.
+        """
+        if not self.paused:
+            self.label.config(
+                text=f"Updating the database: {migration.name}, "
+                    f"{copied} of {total} rows copied"
+                )
+        self.progress_bar.config(maximum=max(total, 1), value=copied)
+        self.root.update()
+
+    def close(self):
+        """Closes the window."""
+        self.root.destroy()
+
+
+def split_outcome(rows, outcome):
+    """Splits table rows by the outcome of a bulk delete.
+
+    Args:
+        rows: The selected table rows, with the ID first.
+        outcome: The outcome for every ID from a bulk delete function.
+
+    Returns:
+        A tuple of the deleted rows and the rows that are still in use.
+    """
+    deleted = []
+    rejected = []
+    for row in rows:
+        result = outcome.get(int(row[0]))
+        if result == dbqueries.DELETED:
+            deleted.append(row)
+        elif result == dbqueries.IN_USE:
+            rejected.append(row)
+    return deleted, rejected
+
+def sort_key(value) -> tuple:
+    """Returns a key for sorting the values of a table column.
+
+    Numbers, including numbers stored as text, sort by value and text
+    sorts without case. Empty values sort first.
+
+    Args:
+        value: The value of a cell.
+
+    Returns:
+        A tuple that compares correctly with the keys of other values
+        of any type.
+    """
+    if value is None or value == '':
+        return (0, 0)
+    if isinstance(value, (bool, int, float)):
+        return (1, value)
+    text = str(value)
+    try:
+        return (1, int(text))
+    except ValueError:
+        return (2, text.casefold())
 
 
 def focus_next_widget(event):
@@ -1094,67 +2010,108 @@ def focus_next_widget(event):
     return("break")
 
 
-class Table:
-    """Creates a table from the passed objects in the specified frame.
+class VirtualTable:
+    """Creates a virtualized table from the passed objects.
 
-    This class takes a list of one or more input objects and uses that
-    data to create a table in the specified frame. The object's 
-    attribute names become the header names and each object is added 
-    as a row to the new table. Methods are also provided to clear the
-    table and to refresh the table with new data.
-    """
-    def __init__(self, frame, input_obj):
-        """Creates an empty table.
+    The object's attribute names become the header names and each
+    object is a row of the table. The full list of rows is only kept in
+    memory. Treeview items are created for the rows that fit in the visible
+    part of the table and are reused as the table is scrolled, so
+    filling or refreshing the table depends on the window height
+    instead of the number of rows.
 
-        Creates an empty table in the specified frame using data from
-        an input object. 
+    With a pager the rows can also be loaded from the database a page
+    at a time as the table is scrolled, so only the rows that have been
+    scrolled past are ever in memory.
+    """
+    def __init__(self, frame, input_obj, record_type=None, pager=None):
+        """Creates an empty virtualized table.
 
         Args:
             frame: The frame that the table should be created in.
             input_obj: The object used to populate the table.
+            record_type: The dataclass used to name the columns when
+                the table is created without any rows.
+            pager: Called with after, order_by, descending and callback
+                to request a page of objects. The callback has to be
+                called with the objects and the next cursor token.
         """
         self.frame = frame
         self.input_obj = input_obj
-        self.scroll = ttk.Scrollbar(master=self.frame)
+        self.record_type = record_type
+        self.pager = pager
+        self.rows = []
+        # The IDs of the rows, so a page can skip the ones already loaded
+        self.row_ids = set()
+        self.columns = []
+        self.items = []
+        self.selected_ids = set()
+        self.offset = 0
+
+        # Paging state. generation is increased whenever the rows are
+        # replaced so that pages requested before then are ignored.
+        self.paged = False
+        self.next_page = None
+        self.loading = False
+        self.generation = 0
+        self.sort_column = 'id'
+        self.sort_descending = False
+
+        try:
+            self.row_height = int(ttk.Style().lookup('Treeview', 'rowheight'))
+        except (TypeError, ValueError):
+            self.row_height = 20
+
+        self.scroll = ttk.Scrollbar(master=self.frame, command=self.yview)
         self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.table = ttk.Treeview(master=frame, yscrollcommand=self.scroll.set)
+        self.table = ttk.Treeview(master=frame)
         self.table.pack(padx=2, pady=2, expand=True, fill=tk.BOTH)
-        self.scroll.config(command=self.table.yview)
+        self.table.bind(sequence='<Configure>', func=self.resize)
+        self.table.bind(sequence='<<TreeviewSelect>>', func=self.track_selection)
+        self.table.bind(sequence='<Button-1>', func=self.click)
+        self.table.bind(sequence='<MouseWheel>', func=self.mouse_scroll)
+        self.table.bind(
+            sequence='<Button-4>',
+            func=lambda event: self.scroll_to(self.offset - 3)
+            )
+        self.table.bind(
+            sequence='<Button-5>',
+            func=lambda event: self.scroll_to(self.offset + 3)
+            )
+        self.table.bind(sequence='<Up>', func=lambda event: self.key_scroll(-1))
+        self.table.bind(sequence='<Down>', func=lambda event: self.key_scroll(1))
+        self.table.bind(
+            sequence='<Prior>',
+            func=lambda event: self.scroll_to(self.offset - len(self.items))
+            )
+        self.table.bind(
+            sequence='<Next>',
+            func=lambda event: self.scroll_to(self.offset + len(self.items))
+            )
+
+        if self.record_type:
+            self.set_columns(
+                [field.name for field in dataclasses.fields(self.record_type)]
+                )
 
         try:
             self.add_rows(input_obj=self.input_obj)
         except TypeError:
             logger.warning("No entries found")
 
-    def add_rows(self, input_obj):
-        """Adds rows to the table from a supplied object.
-
-        Takes an list of objects and uses its attributes to create the
-        headers and enters one object per row in the table.
+    def set_columns(self, columns):
+        """Creates the table headers.
 
         Args:
-            input_obj: A list of model, artist, or source objects.
+            columns: A list of attribute names to use as the headers.
         """
-        self.input_obj = input_obj
-        # Checking to see if self.input_obj is a list or an individual object
-        # before proceeding.
-        try:
-            self.column_names_temp = vars(self.input_obj[0])
-        except (IndexError, TypeError):
-            self.column_names_temp = vars(self.input_obj)
-
-        self.column_names = self.column_names_temp.keys()
-
-        self.columns = []
-        for self.name in self.column_names:
-            self.columns.append(self.name)
-
+        self.columns = list(columns)
         self.table['columns'] = self.columns
 
         self.table.column(column='#0', width=0, stretch=tk.NO)
         self.table.heading(column='#0', text="", anchor=tk.W)
-        for self.heading in self.column_names:
+        for self.heading in self.columns:
             self.table.column(column=self.heading, anchor=tk.W, width=80)
             self.table.heading(
                 column=self.heading,
@@ -1163,26 +2120,45 @@ class Table:
                 command=lambda col=self.heading: self.sort_table(col, False)
                 )
 
+    def add_rows(self, input_obj):
+        """Adds rows to the table from a supplied object.
+
+        Only the backing list of rows is updated, the visible rows are
+        redrawn afterwards.
+
+        Args:
+            input_obj: A list of model, artist, or source objects.
+        """
+        self.input_obj = input_obj
         # Checking to see if self.input_obj is a list or an individual object
         # before proceeding.
         try:
-            for self.row in self.input_obj:
-                self.table.insert(
-                    parent='',
-                    index=tk.END,
-                    values=(self.row.astuple())
-                    )
+            first = self.input_obj[0]
+            new_rows = [row.astuple() for row in self.input_obj]
+        except IndexError:
+            return
         except TypeError:
-            self.table.insert(
-                parent='',
-                index=tk.END,
-                values=(self.input_obj.astuple())
-                )
+            first = self.input_obj
+            new_rows = [self.input_obj.astuple()]
+
+        if not self.columns:
+            self.set_columns([field.name for field in dataclasses.fields(first)])
+
+        self.rows.extend(new_rows)
+        self.row_ids.update(row[0] for row in new_rows)
+        self.render()
 
     def clear_table(self):
-        """Clears the data from the table."""
-        for item in self.table.get_children():
-            self.table.delete(item)
+        """Clears the data from the table and stops loading pages."""
+        self.rows = []
+        self.row_ids = set()
+        self.selected_ids.clear()
+        self.offset = 0
+        self.paged = False
+        self.next_page = None
+        self.loading = False
+        self.generation += 1
+        self.render()
 
     def refresh_table(self, input_obj):
         """Replaces the data in the table.
@@ -1200,41 +2176,232 @@ class Table:
         except TypeError:
             logger.warning("No rows to update")
 
+    def load_pages(self, order_by='id', descending=False):
+        """Replaces the rows with the first page from the pager.
+
+        Args:
+            order_by: The column to sort by.
+            descending: Whether to sort descending or not.
+        """
+        self.clear_table()
+        self.paged = True
+        self.sort_column = order_by
+        self.sort_descending = descending
+        self.request_page(after=None)
+
+    def load_more(self):
+        """Requests the next page unless one is already on its way."""
+        if self.paged and self.next_page is not None and not self.loading:
+            self.request_page(after=self.next_page)
+
+    def request_page(self, after):
+        """Asks the pager for the page after a cursor token.
+
+        Args:
+            after: The cursor token of the previous page or None.
+        """
+        self.loading = True
+        generation = self.generation
+        self.pager(
+            after=after,
+            order_by=self.sort_column,
+            descending=self.sort_descending,
+            callback=lambda page: self.add_page(page=page, generation=generation)
+            )
+
+    def add_page(self, page, generation):
+        """Adds a page of objects to the end of the table.
+
+        Rows that are already in the table, e.g. ones added with
+        insert_row after the first page was loaded, are skipped.
+
+        Args:
+            page: The objects and the cursor token for the next page.
+            generation: The generation the page was requested in.
+        """
+        if generation != self.generation:
+            return
+        objects, self.next_page = page
+        self.loading = False
+
+        for row in (obj.astuple() for obj in objects):
+            if row[0] not in self.row_ids:
+                self.rows.append(row)
+                self.row_ids.add(row[0])
+        self.render()
+
+    def resize(self, event):
+        """Resizes the pool of Treeview items to fit the table.
+
+        Args:
+            event: The Configure event for the Treeview.
+        """
+        # One row is left for the headings
+        visible = max(1, event.height // self.row_height - 1)
+        while len(self.items) < visible:
+            self.items.append(self.table.insert(parent='', index=tk.END))
+        while len(self.items) > visible:
+            self.table.delete(self.items.pop())
+        self.scroll_to(self.offset)
+
+    def render(self):
+        """Fills the visible Treeview items from the backing rows."""
+        selection = []
+        for position, item in enumerate(self.items):
+            index = self.offset + position
+            if index < len(self.rows):
+                row = self.rows[index]
+                self.table.item(item, values=row)
+                self.table.move(item, '', position)
+                if row[0] in self.selected_ids:
+                    selection.append(item)
+            else:
+                self.table.detach(item)
+        self.table.selection_set(selection)
+
+        if self.rows:
+            self.scroll.set(
+                self.offset / len(self.rows),
+                (self.offset + len(self.items)) / len(self.rows)
+                )
+        else:
+            self.scroll.set(0, 1)
+
+        # Keeps at least a screen of rows loaded below the visible ones
+        if self.offset + 2 * len(self.items) >= len(self.rows):
+            self.load_more()
+
+    def scroll_to(self, offset: int):
+        """Moves the visible window to start at the given row.
+
+        Args:
+            offset: The index of the first row to show.
+        """
+        last = max(0, len(self.rows) - len(self.items))
+        self.offset = min(max(0, int(offset)), last)
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Handles the scrollbar commands."""
+        if args[0] == tk.MOVETO:
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == tk.SCROLL:
+            amount = int(args[1])
+            if args[2] == tk.PAGES:
+                amount *= len(self.items)
+            self.scroll_to(self.offset + amount)
+
+    def mouse_scroll(self, event):
+        """Scrolls the table with the mouse wheel."""
+        if abs(event.delta) >= 120:
+            steps = event.delta // 120
+        else:
+            steps = 1 if event.delta > 0 else -1
+        return self.scroll_to(self.offset - steps * 3)
+
+    def key_scroll(self, step: int):
+        """Scrolls the table when the arrow keys reach the edge.
+
+        Args:
+            step: -1 to move up a row or 1 to move down a row.
+        """
+        if not self.items:
+            return None
+        focus = self.table.focus()
+        edge = self.items[0] if step < 0 else self.items[-1]
+        if focus and focus != edge:
+            return None
+        before = self.offset
+        self.scroll_to(self.offset + step)
+        if self.offset == before:
+            return "break"
+        if focus:
+            self.selected_ids.clear()
+            self.table.selection_set(focus)
+            self.track_selection(None)
+        return "break"
+
+    def click(self, event):
+        """Drops hidden selected rows when clicking without a modifier."""
+        # 0x0001 is Shift and 0x0004 is Control
+        if not event.state & 0x0005:
+            self.selected_ids.clear()
+
+    def track_selection(self, event):
+        """Keeps the selection in sync with the backing rows."""
+        selection = set(self.table.selection())
+        for position, item in enumerate(self.items):
+            index = self.offset + position
+            if index >= len(self.rows):
+                break
+            row_id = self.rows[index][0]
+            if item in selection:
+                self.selected_ids.add(row_id)
+            else:
+                self.selected_ids.discard(row_id)
+
     def sort_table(self, column: str, descending: bool) -> None:
         """Sorts the table by the selected column.
 
+        A paged table is reloaded from the first page with the ORDER BY
+        done by the database, since the rows that haven't been loaded
+        yet can't be sorted. Otherwise the backing rows are sorted with
+        typed keys and only the visible rows are redrawn.
+
         Args:
             column: The column to sort by
             descending: Whether to sort descending or not
         """
-        data = []
-        for child in self.table.get_children(''):
-            temp = [self.table.set(item=child, column=column), child]
-            temp[0] = temp[0].lower()
-            data.append(temp)
-
-        data.sort(reverse=descending)
-        for indx, item in enumerate(data):
-            self.table.move(item[1], '', indx)
+        if self.paged:
+            self.load_pages(order_by=column, descending=descending)
+        else:
+            position = self.columns.index(column)
+            self.rows.sort(
+                key=lambda row: sort_key(row[position]),
+                reverse=descending
+                )
+            self.render()
 
         self.table.heading(
             column=column,
             command=lambda col=column: self.sort_table(col, bool(not descending))
             )
 
+    def insert_row(self, input_obj):
+        """Adds a single object to the end of the table.
+
+        Args:
+            input_obj: A model, artist, or source object.
+        """
+        if not self.columns:
+            self.set_columns(
+                [field.name for field in dataclasses.fields(input_obj)]
+                )
+        row = input_obj.astuple()
+        self.rows.append(row)
+        self.row_ids.add(row[0])
+        self.render()
+
+    def delete_rows(self, row_ids):
+        """Removes the rows with the given IDs from the table.
+
+        Args:
+            row_ids: An iterable of model, artist, or source IDs.
+        """
+        row_ids = set(row_ids)
+        if not row_ids:
+            return
+        self.rows = [row for row in self.rows if row[0] not in row_ids]
+        self.row_ids -= row_ids
+        self.selected_ids -= row_ids
+        self.scroll_to(self.offset)
+
     def get_selected_rows(self) -> tuple:
-        """Returns the selected row."""
-        self.selected = (
-            self.table.item(self.selected)['values'] 
-            for self.selected in self.table.selection()
-            )
-        return tuple(self.selected)
+        """Returns the selected rows, including ones scrolled out of view."""
+        return tuple(row for row in self.rows if row[0] in self.selected_ids)
 
     def get_all_rows(self) -> tuple:
-        self.rows = (
-            self.table.item(self.child)['values']
-            for self.child in self.table.get_children()
-            )
         return tuple(self.rows)
 
 class TextBox:
@@ -1281,86 +2448,107 @@ class TextBox:
         self.text_box.delete(0, tk.END)
 
 
-class DropdownBox:
-    """ Creates a dropdown box.
+class SearchBox:
+    """Creates a combobox that suggests names as the user types.
 
-    Creates a dropdown box in the specified frame with the specified
-    grid options.
+    Used to pick an artist or source, as there can be too many for a
+    dropdown menu. The names are kept in a NameIndex, and every key press
+    replaces the list of the combobox with the names that start with
+    the typed text, or have a word that does, so the list never holds
+    more than SUGGESTION_LIMIT names.
     """
-    def __init__(self, frame, input_obj, row, column, sticky):
-        """Inits the new text entry box.
+    # Keys that move around the list instead of changing the text
+    NAVIGATION_KEYS = ('Up', 'Down', 'Return', 'Escape', 'Tab', 'ISO_Left_Tab')
 
-        Sets the text box's size, side, and anchor position.
+    def __init__(self, frame, input_obj, row, column, sticky, limit=SUGGESTION_LIMIT):
+        """Inits the new search box.
 
         Args:
-            frame: The frame that the text box will be created in.
+            frame: The frame that the search box will be created in.
             input_obj: The object used to populate the options.
             row: Grid row the widget is in.
             column: Grid column the widget is in.
             sticky: where in the column/row the widget is attached.
+            limit: The maximum number of suggestions shown.
         """
         self.frame = frame
         self.row = row
         self.column = column
         self.sticky = sticky
-        self.input_obj = input_obj
+        self.limit = limit
         self.var = tk.StringVar()
-        self.options = []
-
-        if self.input_obj:
-            try:
-                for self.item in self.input_obj:
-                    self.options.append(self.item.name)
-            except (IndexError, TypeError):
-                self.options.append(self.input_obj.name)
-            self.options.sort(key=str.lower)
-        else:
-            self.options.append("Empty")
+        self.index = name_index.NameIndex(
+            names=(item.name for item in input_obj or [])
+            )
 
-        self.dropdown = ttk.OptionMenu(
-            self.frame,
-            self.var,
-            "Please Select",
-            *self.options
+        self.combobox = ttk.Combobox(
+            master=self.frame,
+            textvariable=self.var,
+            postcommand=self.update_suggestions
             )
-        self.dropdown.grid(
+        self.combobox.grid(
             padx=2,
             pady=2,
             row=self.row,
             column=self.column,
             sticky=self.sticky
             )
+        self.combobox.bind('<KeyRelease>', self.filter_options)
+        self.update_suggestions()
+
+    def update_suggestions(self):
+        """Fills the list with the names matching the current text."""
+        self.combobox['values'] = self.index.matches(
+            text=self.var.get(),
+            limit=self.limit
+            )
+
+    def filter_options(self, event):
+        """Updates the suggestions after the text was edited."""
+        if event.keysym in self.NAVIGATION_KEYS:
+            return
+        self.update_suggestions()
 
     def get_selection(self):
         """Gets the selected item.
 
-        Retrieves the selected item from the dropdown box.
+        The text only counts as a selection if it is one of the names,
+        ignoring case.
 
         Returns:
-            A string containing the user's selection.
+            A string containing the name as it is stored, or None if
+            the text doesn't match a name.
         """
-        self.value = self.var.get()
-        if self.value == "Please Select":
-            return None
-        else:
-            return self.var.get()
+        return self.index.find(text=self.var.get())
 
-    def refresh_options(self, input):
-        """Replaces the data in the dropdown.
+    def add_option(self, name):
+        """Adds a single name to the suggestions.
+
+        Args:
+            name: The artist or source name to add.
+        """
+        self.index.add(name=name)
+        self.update_suggestions()
 
-        Takes the data from the input object and repopulates the
-        dropdown with that data.
+    def remove_option(self, name):
+        """Removes a single name from the suggestions.
+
+        Args:
+            name: The artist or source name to remove.
+        """
+        self.index.remove(name=name)
+        if self.var.get() == name:
+            self.var.set("")
+        self.update_suggestions()
+
+    def refresh_options(self, input):
+        """Replaces the names in the search box.
 
         Args:
             input: A list of artist or source objects.
         """
-        self.input_obj = input
-        self.dropdown['menu'].delete(0, tk.END)
-        for item in self.input_obj:
-            self.dropdown['menu'].add_command(
-                label=item.name,
-                command=lambda value=item.name: self.var.set(value)
-                )
+        self.index.rebuild(names=(item.name for item in input))
+        self.update_suggestions()
 
 
 class CheckBox:
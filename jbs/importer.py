@@ -0,0 +1,286 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import csv
+import dataclasses
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+from typing import Any, Callable, Iterator, Optional
+
+import jbs.database.database_cache as dbcache
+import jbs.database.database_queries as dbqueries
+import jbs.inventory as inv
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+RECORD_TYPES = ('model', 'artist', 'source')
+FILE_FORMATS = ('csv', 'jsonl')
+
+# Only this many errors are kept in a report so that a bad file can't
+# use up all of the memory. The rest are still counted.
+MAX_REPORTED_ERRORS = 1000
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'x')
+FALSE_VALUES = ('', '0', 'false', 'no', 'n')
+
+
+@dataclasses.dataclass
+class ImportReport:
+    """The outcome of an import.
+
+    Attributes:
+        rows: The number of rows read from the file.
+        added: The number of rows added to the database.
+        created_artists: Artists created for models that needed them.
+        created_sources: Sources created for models that needed them.
+        error_count: The number of rows that could not be imported.
+        errors: (line, message) pairs for the first rejected rows.
+    """
+    rows: int = 0
+    added: int = 0
+    created_artists: int = 0
+    created_sources: int = 0
+    error_count: int = 0
+    errors: list[tuple[int, str]] = dataclasses.field(default_factory=list)
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+        logger.warning(f"Line {line}: {message}")
+
+
+def read_csv(data_file: os.PathLike) -> Iterator[tuple[int, Optional[dict]]]:
+    """Reads a CSV file one row at a time.
+
+    The first row must be a header with the attribute names used by
+    the export, e.g. model, set, artist, source.
+
+    Args:
+        data_file: A path to a CSV file.
+
+    Yields:
+        The line number and a dictionary for each row.
+    """
+    with open(file=data_file, mode='r', newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.DictReader(csv_file)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(data_file: os.PathLike) -> Iterator[tuple[int, Optional[dict]]]:
+    """Reads a JSON Lines file one line at a time.
+
+    Args:
+        data_file: A path to a file with one JSON object per line.
+
+    Yields:
+        The line number and a dictionary for each line, or None when
+        the line isn't a JSON object.
+    """
+    with open(file=data_file, mode='r', encoding='utf-8-sig') as jsonl_file:
+        for line, text in enumerate(jsonl_file, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError:
+                row = None
+            yield line, row if isinstance(row, dict) else None
+
+
+def parse_flag(value: Any) -> bool:
+    """Converts a supports or printed value from a file to a boolean.
+
+    Raises:
+        ValueError: The value isn't recognised as true or false.
+    """
+    if value is None:
+        return False
+    if isinstance(value, (bool, int)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"{value!r} is not a yes/no value")
+
+
+def validate_row(record_type: str, row: Optional[dict]) -> Any:
+    """Converts a row from an import file to a model, artist or source.
+
+    Args:
+        record_type: One of model, artist, or source.
+        row: A dictionary of attribute names to values.
+
+    Returns:
+        A model, artist or source object.
+
+    Raises:
+        ValueError: The row is missing a required value or has an
+            invalid one.
+    """
+    if row is None:
+        raise ValueError("Line is not a JSON object")
+
+    values = {
+        str(key).strip().lower(): ('' if value is None else value)
+        for key, value in row.items() if key is not None
+        }
+
+    def text(key: str) -> str:
+        return str(values.get(key, '')).strip()
+
+    def required(key: str) -> str:
+        value = text(key)
+        if not value:
+            raise ValueError(f"Missing {key}")
+        return value
+
+    match record_type:
+        case 'model':
+            return inv.Model(
+                id=0,
+                model=required('model'),
+                set=text('set'),
+                artist=required('artist'),
+                source=required('source'),
+                source_note=text('source_note'),
+                supports=parse_flag(values.get('supports')),
+                format=text('format'),
+                folder='',
+                printed=parse_flag(values.get('printed'))
+                )
+        case 'artist':
+            return inv.Artist(
+                id=0,
+                name=required('name'),
+                website=text('website'),
+                email=text('email'),
+                folder=text('folder')
+                )
+        case 'source':
+            return inv.Source(
+                id=0,
+                name=required('name'),
+                website=text('website')
+                )
+        case _:
+            raise ValueError(f"Unknown record type {record_type}")
+
+
+def import_file(
+    connection: sqlite3.Connection,
+    data_file: os.PathLike,
+    record_type: str,
+    file_format: Optional[str] = None,
+    chunk_size: int = dbqueries.BULK_CHUNK_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+    cache: Optional[dbcache.LookupCache] = None
+    ) -> ImportReport:
+    """Streams a CSV or JSON Lines file into the database.
+
+    Rows are read and validated one at a time and written with the bulk
+    insert functions every chunk_size rows, so memory use does not
+    depend on the size of the file. When importing models, artists and
+    sources that don't exist yet are created first.
+
+    Args:
+        connection: A sqlite database connection.
+        data_file: A path to the file to import.
+        record_type: One of model, artist, or source.
+        file_format: csv or jsonl, taken from the file suffix if None.
+        chunk_size: The number of rows written per transaction.
+        progress: Called with the report after every chunk.
+        cache: The artist and source name cache to use and update.
+
+    Returns:
+        A report with the counts and the rejected rows.
+    """
+    if file_format is None:
+        file_format = pathlib.Path(data_file).suffix.lstrip('.').lower()
+        if file_format in ('json', 'ndjson'):
+            file_format = 'jsonl'
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file format {file_format}")
+    if record_type not in RECORD_TYPES:
+        raise ValueError(f"Unknown record type {record_type}")
+
+    reader = read_csv if file_format == 'csv' else read_jsonl
+    report = ImportReport()
+    # Resolved once, new artists and sources are added as they are created
+    artist_ids = {}
+    source_ids = {}
+    if record_type == 'model' and cache:
+        artist_ids = cache.artists.get_ids(connection=connection)
+        source_ids = cache.sources.get_ids(connection=connection)
+    elif record_type == 'model':
+        artist_ids = dbqueries.get_artist_ids(connection=connection)
+        source_ids = dbqueries.get_source_ids(connection=connection)
+
+    reported_rows = 0
+
+    def write(batch: list) -> None:
+        nonlocal reported_rows
+        match record_type:
+            case 'model':
+                artists, sources = len(artist_ids), len(source_ids)
+                # The new artists and sources are committed with the models
+                report.added += dbqueries.add_models_bulk(
+                    connection=connection,
+                    models=batch,
+                    chunk_size=chunk_size,
+                    cache=cache,
+                    artist_ids=artist_ids,
+                    source_ids=source_ids,
+                    create_names=True
+                    )
+                report.created_artists += len(artist_ids) - artists
+                report.created_sources += len(source_ids) - sources
+            case 'artist':
+                report.added += dbqueries.add_artists_bulk(
+                    connection=connection,
+                    artists=batch,
+                    chunk_size=chunk_size,
+                    cache=cache
+                    )
+            case 'source':
+                report.added += dbqueries.add_sources_bulk(
+                    connection=connection,
+                    sources=batch,
+                    chunk_size=chunk_size,
+                    cache=cache
+                    )
+        if progress:
+            reported_rows = report.rows
+            progress(report)
+
+    logger.info(f"Importing {record_type}s from {data_file}")
+    batch = []
+    for line, row in reader(data_file):
+        report.rows += 1
+        try:
+            batch.append(validate_row(record_type=record_type, row=row))
+        except ValueError as e:
+            report.add_error(line=line, message=str(e))
+            continue
+        if len(batch) >= chunk_size:
+            write(batch)
+            batch = []
+    if batch:
+        write(batch)
+    if progress and report.rows != reported_rows:
+        progress(report)
+
+    logger.info(
+        f"Imported {report.added} of {report.rows} rows "
+        f"with {report.error_count} errors"
+        )
+
+    return report
@@ -4,13 +4,14 @@
 
 import dataclasses
 import logging
+import operator
 from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.NOTSET)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Model:
     """A object representing a 3D model.
 
@@ -38,15 +39,21 @@ class Model:
     printed: bool | int
 
     def astuple(self, exclude: Optional[str]=None) -> tuple:
-        self.exclude = exclude
-        if not self.exclude:
-            return dataclasses.astuple(self)
+        if not exclude:
+            return MODEL_ROW(self)
         else:
-            return tuple(getattr(self, field.name) for field in 
-                dataclasses.fields(self) if field.name != self.exclude)
+            return tuple(getattr(self, name) for name in MODEL_FIELDS
+                if name != exclude)
 
+    def asdict(self) -> dict:
+        return dict(zip(MODEL_FIELDS, MODEL_ROW(self)))
 
-@dataclasses.dataclass
+
+MODEL_FIELDS = tuple(field.name for field in dataclasses.fields(Model))
+MODEL_ROW = operator.attrgetter(*MODEL_FIELDS)
+
+
+@dataclasses.dataclass(slots=True)
 class Artist:
     """A object representing an artist.
 
@@ -64,15 +71,21 @@ class Artist:
     folder: str
 
     def astuple(self, exclude: Optional[str]=None) -> tuple:
-        self.exclude = exclude
-        if not self.exclude:
-            return dataclasses.astuple(self)
+        if not exclude:
+            return ARTIST_ROW(self)
         else:
-            return tuple(getattr(self, field.name) for field in 
-                dataclasses.fields(self) if field.name != self.exclude)
+            return tuple(getattr(self, name) for name in ARTIST_FIELDS
+                if name != exclude)
+
+    def asdict(self) -> dict:
+        return dict(zip(ARTIST_FIELDS, ARTIST_ROW(self)))
+
 
+ARTIST_FIELDS = tuple(field.name for field in dataclasses.fields(Artist))
+ARTIST_ROW = operator.attrgetter(*ARTIST_FIELDS)
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class Source:
     """A object representing a source.
 
@@ -86,12 +99,88 @@ class Source:
     website: str
 
     def astuple(self, exclude: Optional[str]=None) -> tuple:
-        self.exclude = exclude
-        if not self.exclude:
-            return dataclasses.astuple(self)
+        if not exclude:
+            return SOURCE_ROW(self)
         else:
-            return tuple(getattr(self, field.name) for field in 
-                dataclasses.fields(self) if field.name != self.exclude)
+            return tuple(getattr(self, name) for name in SOURCE_FIELDS
+                if name != exclude)
+
+    def asdict(self) -> dict:
+        return dict(zip(SOURCE_FIELDS, SOURCE_ROW(self)))
+
+
+SOURCE_FIELDS = tuple(field.name for field in dataclasses.fields(Source))
+SOURCE_ROW = operator.attrgetter(*SOURCE_FIELDS)
+
+
+@dataclasses.dataclass(slots=True)
+class ModelFile:
+    """A object representing a model file found on disk.
+
+    Attributes:
+        id: The id of the file.
+        path: The full path of the file.
+        artist: The id of the artist whose folder the file is in.
+        model: The id of the model the file belongs to, if known.
+        size: The size of the file in bytes.
+        modified: When the file was last modified, in nanoseconds.
+        extension: The file type, e.g. STL.
+    """
+    id: int
+    path: str
+    artist: int
+    model: Optional[int]
+    size: int
+    modified: int
+    extension: str
+
+    def astuple(self, exclude: Optional[str]=None) -> tuple:
+        if not exclude:
+            return FILE_ROW(self)
+        else:
+            return tuple(getattr(self, name) for name in FILE_FIELDS
+                if name != exclude)
+
+    def asdict(self) -> dict:
+        return dict(zip(FILE_FIELDS, FILE_ROW(self)))
+
+
+FILE_FIELDS = tuple(field.name for field in dataclasses.fields(ModelFile))
+FILE_ROW = operator.attrgetter(*FILE_FIELDS)
+
+
+@dataclasses.dataclass(slots=True)
+class DuplicateFile:
+    """A object representing a model file that has copies elsewhere.
+
+    Attributes:
+        id: The id of the file.
+        group: The number shared by the file and its copies.
+        size: The size of the file in bytes.
+        artist: The name of the artist whose folder the file is in.
+        model: The name of the model the file belongs to, if known.
+        path: The full path of the file.
+    """
+    id: int
+    group: int
+    size: int
+    artist: str
+    model: Optional[str]
+    path: str
+
+    def astuple(self, exclude: Optional[str]=None) -> tuple:
+        if not exclude:
+            return DUPLICATE_ROW(self)
+        else:
+            return tuple(getattr(self, name) for name in DUPLICATE_FIELDS
+                if name != exclude)
+
+    def asdict(self) -> dict:
+        return dict(zip(DUPLICATE_FIELDS, DUPLICATE_ROW(self)))
+
+
+DUPLICATE_FIELDS = tuple(field.name for field in dataclasses.fields(DuplicateFile))
+DUPLICATE_ROW = operator.attrgetter(*DUPLICATE_FIELDS)
 
 
 class ObjectFactory:
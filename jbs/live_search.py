@@ -0,0 +1,274 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import logging
+import operator
+import re
+import string
+import unicodedata
+from typing import Any, Callable, Optional
+
+import jbs.database.database_executor as dbexecutor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Milliseconds to wait after the last key press before searching
+SEARCH_DELAY = 250
+
+DEFAULT_SEARCH_SETTINGS = {
+    'live': True,
+    'delay': SEARCH_DELAY,
+    }
+
+# The unicode61 tokenizer treats underscores as separators, unlike \w
+WORD = re.compile(r'[^\W_]+')
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def get_search_settings(settings: Optional[dict] = None) -> dict:
+    """Merges the "search" section of the config file with the defaults.
+
+    Args:
+        settings: The "search" section of the config file, if any.
+
+    Returns:
+        A dictionary with every search setting.
+
+    Raises:
+        ValueError: If a setting is unknown or has an invalid value.
+    """
+    merged = dict(DEFAULT_SEARCH_SETTINGS)
+    for name, value in (settings or {}).items():
+        if name not in DEFAULT_SEARCH_SETTINGS:
+            raise ValueError(f"Unknown search setting {name}")
+        if name == 'live' and not isinstance(value, bool):
+            raise ValueError(f"Invalid value {value} for {name}")
+        if name == 'delay' and (
+            isinstance(value, bool) or not isinstance(value, int) or value < 0
+            ):
+            raise ValueError(f"Invalid value {value} for {name}")
+        merged[name] = value
+
+    return merged
+
+
+def fold_words(text: str) -> list[str]:
+    """Splits text into words the way the full-text indexes do.
+
+    Words are casefolded and stripped of diacritics, close to the
+    unicode61 tokenizer with remove_diacritics 2.
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return WORD.findall(text.casefold())
+
+
+def full_text_narrows(previous: str, term: str) -> bool:
+    """Checks whether a full-text search can only match a subset of another.
+
+    A word searched as a prefix matches everything a prefix of it
+    matches, so the new search is narrower if every previous word is
+    the start of one of the new words.
+
+    Args:
+        previous: The text of the earlier search.
+        term: The text of the new search.
+    """
+    if '_' in previous or '_' in term:
+        return False
+    new_words = fold_words(term)
+    return all(
+        any(word.startswith(old_word) for word in new_words)
+        for old_word in fold_words(previous)
+        )
+
+
+def full_text_filter(*fields: str) -> Callable[[Any, str], bool]:
+    """Returns a function that checks a record against full-text search text.
+
+    The function matches a record if every searched word is the start
+    of a word in one of the fields, like build_match_query.
+
+    Args:
+        *fields: The attributes of the record that are indexed.
+    """
+    values = operator.attrgetter(*fields)
+
+    def matches(record: Any, term: str) -> bool:
+        words = fold_words(' '.join(str(value) for value in values(record) if value))
+        return all(
+            any(word.startswith(search_word) for word in words)
+            for search_word in fold_words(term)
+            )
+
+    return matches
+
+
+def like_narrows(previous: str, term: str) -> bool:
+    """Checks whether a LIKE search can only match a subset of another.
+
+    Search text containing LIKE wildcards is never reused.
+
+    Args:
+        previous: The text of the earlier search.
+        term: The text of the new search.
+    """
+    if any(char in text for text in (previous, term) for char in '%_'):
+        return False
+    return previous.translate(ASCII_LOWER) in term.translate(ASCII_LOWER)
+
+
+def like_filter(field: str) -> Callable[[Any, str], bool]:
+    """Returns a function that checks a record against LIKE search text.
+
+    Like SQLite, only ASCII letters are compared without case.
+
+    Args:
+        field: The attribute of the record that is searched.
+    """
+    value = operator.attrgetter(field)
+
+    def matches(record: Any, term: str) -> bool:
+        text = value(record) or ''
+        return term.translate(ASCII_LOWER) in str(text).translate(ASCII_LOWER)
+
+    return matches
+
+
+class LiveSearch:
+    """Runs the searches of one search box as the user types.
+
+    Key presses are debounced: a search only starts once no key has
+    been pressed for delay milliseconds. Starting a search cancels the
+    one before it, interrupting its query if it is already running.
+    When the new text can only match a subset of the last results, and
+    nothing was committed to the database since, those results are
+    filtered in memory instead of querying the database again.
+
+    Attributes:
+        widget: The Tk widget used to schedule searches.
+        executor: The executor the queries run on.
+        version: Returns the data version of the database.
+        delay: The debounce delay in milliseconds.
+        timer: The id of the scheduled search, if any.
+        job: The running search, if any.
+        requested: The key and text of the last search.
+        last: The key, text, data version and results of the last
+            finished search.
+        queries: The number of searches sent to the database.
+        reused: The number of searches answered from the last results.
+    """
+    def __init__(
+        self,
+        widget: Any,
+        executor: dbexecutor.DatabaseExecutor,
+        version: Callable[[], Any],
+        delay: int = SEARCH_DELAY
+        ):
+        self.widget = widget
+        self.executor = executor
+        self.version = version
+        self.delay = delay
+        self.timer = None
+        self.job = None
+        self.requested = None
+        self.last = None
+        self.queries = 0
+        self.reused = 0
+
+    def schedule(self, key: Any, term: str, run: Callable[[], None]) -> None:
+        """Runs a search once the user stops typing.
+
+        Key presses that didn't change the text, like Shift or the
+        arrow keys, don't start a new search.
+
+        Args:
+            key: Identifies what is searched, e.g. the search field.
+            term: The current search text.
+            run: Called without arguments to start the search.
+        """
+        self.cancel_timer()
+        if (key, term) == self.requested:
+            return
+        self.timer = self.widget.after(self.delay, self.fire, run)
+
+    def fire(self, run: Callable[[], None]) -> None:
+        """Starts a scheduled search."""
+        self.timer = None
+        run()
+
+    def search(
+        self,
+        key: Any,
+        term: str,
+        func: Callable,
+        callback: Callable[[list], None],
+        matches: Optional[Callable[[Any, str], bool]] = None,
+        narrows: Optional[Callable[[str, str], bool]] = None,
+        **kwargs
+        ) -> Optional[dbexecutor.Job]:
+        """Starts a search, cancelling the one before it.
+
+        Args:
+            key: Identifies what is searched, e.g. the search field.
+            term: The search text.
+            func: The query function, run as a read only job.
+            callback: Called on the GUI thread with the results.
+            matches: Checks whether a record matches search text. The
+                last results are only reused if this is given.
+            narrows: Checks whether the new text can only match a
+                subset of what the previous text matched.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The job running the query, or None if the last results
+            were reused.
+        """
+        self.cancel()
+        self.requested = (key, term)
+
+        version = self.version()
+        if matches and narrows and self.last:
+            last_key, last_term, last_version, results = self.last
+            if (last_key == key and last_version == version
+                and narrows(last_term, term)):
+                results = [record for record in results if matches(record, term)]
+                self.last = (key, term, version, results)
+                self.reused += 1
+                logger.debug(f"Refined {last_term!r} to {term!r} in memory")
+                callback(results)
+                return None
+
+        def finished(results):
+            self.job = None
+            self.last = (key, term, version, results)
+            callback(results)
+
+        self.queries += 1
+        self.job = self.executor.submit(
+            func=func,
+            callback=finished,
+            read_only=True,
+            **kwargs
+            )
+        return self.job
+
+    def cancel_timer(self) -> None:
+        """Drops the scheduled search, if any."""
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+            self.timer = None
+
+    def cancel(self) -> None:
+        """Drops the scheduled search and cancels the running one."""
+        self.cancel_timer()
+        self.executor.cancel(self.job)
+        self.job = None
+        self.requested = None
+
+    def clear(self) -> None:
+        """Cancels everything and forgets the last results."""
+        self.cancel()
+        self.last = None
@@ -0,0 +1,488 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import array
+import bisect
+import logging
+import sqlite3
+import sys
+from typing import Any, Iterable, Iterator, Optional
+
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_search as dbsearch
+import jbs.inventory as inv
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Free text columns, searched with a scan of the whole column
+TEXT_COLUMNS = ('model', 'set', 'source_note', 'folder')
+# Columns with few distinct values, stored as codes into a dictionary
+ENCODED_COLUMNS = ('artist', 'source', 'format')
+# Boolean columns, stored as bitmaps
+FLAG_COLUMNS = ('supports', 'printed')
+COLUMNS = TEXT_COLUMNS + ENCODED_COLUMNS + FLAG_COLUMNS
+
+# Number of evaluated conditions remembered by a store
+FILTER_CACHE_SIZE = 256
+
+# Separates the values of a text column in its search string
+SEPARATOR = '\0'
+
+
+def to_bitmap(rows: Iterable[int], size: int) -> int:
+    """Builds a bitmap with the bits of the given row numbers set.
+
+    Bit n of the returned integer is set if row n is in rows, so
+    bitmaps are combined with the integer &, | and ^ operators, which
+    work on whole machine words at a time.
+
+    Args:
+        rows: Row numbers, each less than size.
+        size: The number of rows in the store.
+    """
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def flag_value(value: Any) -> bool:
+    """Reads a flag compared with a flag column.
+
+    Text is read with the same yes and no words as structured queries,
+    anything else by its truth value.
+
+    Raises:
+        ValueError: If text isn't one of the yes or no words.
+    """
+    if isinstance(value, str):
+        if value.lower() not in dbsearch.FLAG_VALUES:
+            raise ValueError(f"Flags have to be yes or no, not {value}")
+        return bool(dbsearch.FLAG_VALUES[value.lower()])
+    return bool(value)
+
+
+def bitmap_rows(bitmap: int) -> Iterator[int]:
+    """Yields the row numbers of the set bits of a bitmap in order."""
+    bits = format(bitmap, 'b')[::-1]
+    row = bits.find('1')
+    while row != -1:
+        yield row
+        row = bits.find('1', row + 1)
+
+
+class TextColumn:
+    """A column of free text.
+
+    The casefolded values are joined into one string, so a substring
+    search over the whole column is a few str.find calls instead of a
+    Python loop over the rows.
+
+    Attributes:
+        values: The value of every row.
+        text: The casefolded values joined with SEPARATOR.
+        starts: The position in text where each row starts.
+    """
+    def __init__(self, values: list):
+        self.values = values
+        folded = [(value or '').replace(SEPARATOR, ' ').casefold() for value in values]
+        self.text = SEPARATOR.join(folded)
+        self.starts = array.array('q')
+        position = 0
+        for value in folded:
+            self.starts.append(position)
+            position += len(value) + 1
+
+    def __getitem__(self, row: int) -> Any:
+        return self.values[row]
+
+    def contains(self, text: str, size: int) -> int:
+        """Returns the bitmap of rows whose value contains the text."""
+        text = text.casefold()
+        if SEPARATOR in text:
+            return 0
+        rows = []
+        position = self.text.find(text)
+        while position != -1:
+            row = bisect.bisect_right(self.starts, position) - 1
+            rows.append(row)
+            if row + 1 == len(self.starts):
+                break
+            # Every row is only counted once
+            position = self.text.find(text, self.starts[row + 1])
+        return to_bitmap(rows=rows, size=size)
+
+    def starts_with(self, text: str, size: int) -> int:
+        """Returns the bitmap of rows whose value starts with the text."""
+        text = text.casefold()
+        if SEPARATOR in text:
+            return 0
+        # Every row but the first starts after a separator
+        rows = [0] if self.starts and self.text.startswith(text) else []
+        text = SEPARATOR + text
+        position = self.text.find(text)
+        while position != -1:
+            rows.append(bisect.bisect_right(self.starts, position + 1) - 1)
+            position = self.text.find(text, position + 1)
+        return to_bitmap(rows=rows, size=size)
+
+    def equals(self, value: str, size: int) -> int:
+        """Returns the bitmap of rows whose value equals the text, ignoring case."""
+        value = (value or '').casefold()
+        return to_bitmap(
+            rows=(row for row, text in enumerate(self.values)
+                if (text or '').casefold() == value),
+            size=size
+            )
+
+
+class EncodedColumn:
+    """A dictionary encoded column.
+
+    Every distinct value is stored once and the rows hold an index into
+    the list of values. The bitmap of the rows of each value is built
+    when the column is, so conditions on these columns only have to
+    look at the distinct values.
+
+    Attributes:
+        values: The distinct values.
+        codes: The index into values of every row.
+        bitmaps: The bitmap of the rows of every value.
+    """
+    def __init__(self, values: list, size: int):
+        self.values = []
+        self.codes = array.array('I')
+        lookup = {}
+        rows = []
+        for row, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.values)
+                self.values.append(value)
+                rows.append([])
+            self.codes.append(code)
+            rows[code].append(row)
+        self.bitmaps = [to_bitmap(rows=code_rows, size=size) for code_rows in rows]
+
+    def __getitem__(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+    def matching(self, test) -> int:
+        """Returns the bitmap of rows whose value passes a test."""
+        bitmap = 0
+        for value, value_bitmap in zip(self.values, self.bitmaps):
+            if test((value or '').casefold()):
+                bitmap |= value_bitmap
+        return bitmap
+
+    def contains(self, text: str, size: int) -> int:
+        """Returns the bitmap of rows whose value contains the text."""
+        text = text.casefold()
+        return self.matching(lambda value: text in value)
+
+    def starts_with(self, text: str, size: int) -> int:
+        """Returns the bitmap of rows whose value starts with the text."""
+        text = text.casefold()
+        return self.matching(lambda value: value.startswith(text))
+
+    def equals(self, value: str, size: int) -> int:
+        """Returns the bitmap of rows whose value equals the text, ignoring case."""
+        value = (value or '').casefold()
+        return self.matching(lambda text: text == value)
+
+
+class FlagColumn:
+    """A boolean column stored as the bitmap of its true rows."""
+    def __init__(self, values: list, size: int):
+        self.bitmap = to_bitmap(
+            rows=(row for row, value in enumerate(values) if value),
+            size=size
+            )
+
+    def __getitem__(self, row: int) -> bool:
+        return bool(self.bitmap >> row & 1)
+
+    def equals(self, value: Any, size: int) -> int:
+        """Returns the bitmap of rows with the given flag, see flag_value."""
+        if flag_value(value):
+            return self.bitmap
+        return ((1 << size) - 1) ^ self.bitmap
+
+    def contains(self, text: str, size: int) -> int:
+        raise ValueError("Flag columns can only be compared with equals")
+
+    def starts_with(self, text: str, size: int) -> int:
+        raise ValueError("Flag columns can only be compared with equals")
+
+
+class Filter:
+    """A condition on the models of a ModelStore.
+
+    Filters are combined with & (and), | (or) and ~ (not):
+
+        (field('printed').equals(False) & field('supports').equals(True)
+            & field('format').contains('stl'))
+    """
+    def evaluate(self, store: 'ModelStore') -> int:
+        """Returns the bitmap of the rows of the store that match."""
+        raise NotImplementedError
+
+    def __and__(self, other: 'Filter') -> 'Filter':
+        return AllOf(self, other)
+
+    def __or__(self, other: 'Filter') -> 'Filter':
+        return AnyOf(self, other)
+
+    def __invert__(self) -> 'Filter':
+        return Not(self)
+
+
+class Condition(Filter):
+    """Compares one column with a value.
+
+    Attributes:
+        field: The model attribute to compare.
+        operator: equals, contains or starts_with.
+        value: The value to compare with.
+    """
+    def __init__(self, field: str, operator: str, value: Any):
+        if field not in COLUMNS:
+            raise ValueError(f"Unknown field {field}")
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def key(self) -> tuple:
+        return (self.field, self.operator, self.value)
+
+    def evaluate(self, store: 'ModelStore') -> int:
+        return store.condition(self)
+
+    def __repr__(self) -> str:
+        return f"{self.field}.{self.operator}({self.value!r})"
+
+
+class AllOf(Filter):
+    """Matches rows that match every one of the filters."""
+    def __init__(self, *filters: Filter):
+        self.filters = filters
+
+    def evaluate(self, store: 'ModelStore') -> int:
+        bitmap = store.all
+        for part in self.filters:
+            bitmap &= part.evaluate(store)
+            if not bitmap:
+                break
+        return bitmap
+
+
+class AnyOf(Filter):
+    """Matches rows that match at least one of the filters."""
+    def __init__(self, *filters: Filter):
+        self.filters = filters
+
+    def evaluate(self, store: 'ModelStore') -> int:
+        bitmap = 0
+        for part in self.filters:
+            bitmap |= part.evaluate(store)
+        return bitmap
+
+
+class Not(Filter):
+    """Matches rows that don't match the filter."""
+    def __init__(self, inner: Filter):
+        self.inner = inner
+
+    def evaluate(self, store: 'ModelStore') -> int:
+        return store.all ^ self.inner.evaluate(store)
+
+
+class Field:
+    """Builds conditions on one model attribute."""
+    def __init__(self, name: str):
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown field {name}")
+        self.name = name
+
+    def equals(self, value: Any) -> Condition:
+        """Matches rows where the field equals the value, ignoring case."""
+        return Condition(field=self.name, operator='equals', value=value)
+
+    def contains(self, text: str) -> Condition:
+        """Matches rows where the field contains the text, ignoring case."""
+        return Condition(field=self.name, operator='contains', value=text)
+
+    def starts_with(self, text: str) -> Condition:
+        """Matches rows where the field starts with the text, ignoring case."""
+        return Condition(field=self.name, operator='starts_with', value=text)
+
+
+def field(name: str) -> Field:
+    """Returns the condition builder for a model attribute."""
+    return Field(name=name)
+
+
+class ModelStore:
+    """A read only, column oriented copy of the model table.
+
+    Used to filter models on several fields at once without querying
+    the database. Each condition is evaluated over a whole column into
+    a bitmap of the matching rows, and filters combine those bitmaps,
+    so a filter costs a few operations on large integers rather than a
+    Python call per model. The bitmaps of recent conditions are kept,
+    so refining a filter only evaluates the new condition.
+
+    The store is not updated when the database changes. Build a new
+    one, e.g. through DataSnapshot.get_model_store.
+
+    Attributes:
+        size: The number of models.
+        all: The bitmap with every row set.
+        ids: The model IDs, in the order of the rows.
+        columns: The columns by model attribute.
+    """
+    def __init__(self, rows: Iterable[tuple]):
+        """Builds the store.
+
+        Args:
+            rows: Model rows with the columns of dbqueries.MODEL_QUERY.
+        """
+        columns = list(zip(*rows))
+        if not columns:
+            columns = [()] * len(inv.MODEL_FIELDS)
+        data = dict(zip(inv.MODEL_FIELDS, columns))
+
+        self.size = len(data['id'])
+        self.all = (1 << self.size) - 1
+        self.ids = array.array('q', data['id'])
+        self.columns = {}
+        for name in TEXT_COLUMNS:
+            self.columns[name] = TextColumn(values=list(data[name]))
+        for name in ENCODED_COLUMNS:
+            self.columns[name] = EncodedColumn(values=data[name], size=self.size)
+        for name in FLAG_COLUMNS:
+            self.columns[name] = FlagColumn(values=data[name], size=self.size)
+        self.cache = {}
+        logger.debug(f"Model store built with {self.size} models")
+
+    @classmethod
+    def load(cls, connection: sqlite3.Connection) -> 'ModelStore':
+        """Reads every model from the database into a new store.
+
+        Args:
+            connection: A sqlite database connection.
+        """
+        try:
+            cur = connection.cursor()
+            cur.execute(dbqueries.MODEL_QUERY + ' ORDER BY m.Model_ID;')
+            rows = cur.fetchall()
+        except sqlite3.Error as e:
+            logger.error(e)
+            sys.exit(1)
+
+        return cls(rows=rows)
+
+    @classmethod
+    def from_models(cls, models: Iterable[inv.Model]) -> 'ModelStore':
+        """Builds a store from model objects."""
+        return cls(rows=(model.astuple() for model in models))
+
+    def condition(self, condition: Condition) -> int:
+        """Returns the bitmap of the rows matching a single condition."""
+        key = condition.key()
+        bitmap = self.cache.get(key)
+        if bitmap is None:
+            column = self.columns[condition.field]
+            if condition.operator == 'equals':
+                bitmap = column.equals(condition.value, self.size)
+            elif condition.operator == 'contains':
+                bitmap = column.contains(condition.value, self.size)
+            elif condition.operator == 'starts_with':
+                bitmap = column.starts_with(condition.value, self.size)
+            else:
+                raise ValueError(f"Unknown operator {condition.operator}")
+            if len(self.cache) >= FILTER_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = bitmap
+        return bitmap
+
+    def rows(self, where: Optional[Filter] = None) -> Iterator[int]:
+        """Yields the row numbers matching a filter, or every row."""
+        if where is None:
+            return iter(range(self.size))
+        return bitmap_rows(where.evaluate(self))
+
+    def count(self, where: Optional[Filter] = None) -> int:
+        """Returns the number of models matching a filter."""
+        if where is None:
+            return self.size
+        return where.evaluate(self).bit_count()
+
+    def model(self, row: int) -> inv.Model:
+        """Builds the model object of a row."""
+        return inv.Model(
+            self.ids[row],
+            *(self.columns[name][row] for name in inv.MODEL_FIELDS[1:])
+            )
+
+    def select(
+        self,
+        where: Optional[Filter] = None,
+        limit: Optional[int] = None
+        ) -> list[inv.Model]:
+        """Returns the models matching a filter, in ID order.
+
+        Args:
+            where: The filter, None for every model.
+            limit: The maximum number of models to return.
+        """
+        models = []
+        for row in self.rows(where=where):
+            if limit is not None and len(models) >= limit:
+                break
+            models.append(self.model(row))
+        return models
+
+    def select_ids(self, where: Optional[Filter] = None) -> list[int]:
+        """Returns the IDs of the models matching a filter."""
+        return [self.ids[row] for row in self.rows(where=where)]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def compile_query(query: str) -> Optional[Filter]:
+    """Compiles a structured query into a filter on a ModelStore.
+
+    Terms are compared the way dbsearch.compile_query compares them in
+    SQL. Words without a field are matched with the full-text index and
+    ranked by it, which a store can't do.
+
+    Args:
+        query: The text the user searched for, see dbsearch.parse_query.
+
+    Returns:
+        The filter, or None if the query has words without a field.
+
+    Raises:
+        ValueError: If the query has an unknown field or flag value.
+    """
+    conditions = []
+    for term in dbsearch.parse_query(query):
+        if term.field is None:
+            return None
+        kind = dbsearch.QUERY_FIELDS[term.field][1]
+        column = field(term.field)
+        if kind == 'flag':
+            condition = column.equals(term.value)
+        elif term.prefix:
+            condition = column.starts_with(term.value)
+        elif kind == 'name':
+            condition = column.equals(term.value)
+        else:
+            condition = column.contains(term.value)
+        conditions.append(~condition if term.negated else condition)
+
+    return AllOf(*conditions)
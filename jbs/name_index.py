@@ -0,0 +1,130 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import bisect
+import logging
+import re
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# Number of matches returned by NameIndex.matches by default
+MATCH_LIMIT = 20
+
+WORD_START = re.compile(r'\b\w')
+
+
+class NameIndex:
+    """A sorted index of artist or source names for type-ahead lookups.
+
+    Names are kept in two sorted lists of (key, name) entries, one keyed
+    by the whole name and one by the rest of the name from the start of
+    each later word, so that "dra" finds "Red Dragon Studio" as well as
+    "Dragon Forge". Keys are casefolded. A lookup is a binary search
+    followed by reading at most limit entries, so it doesn't depend on
+    the number of names.
+    """
+    def __init__(self, names: Iterable[str] = ()):
+        """Builds the index.
+
+        Args:
+            names: The names to index.
+        """
+        self.names = []
+        self.words = []
+        self.rebuild(names=names)
+
+    @staticmethod
+    def entry(key: str, name: str) -> tuple[str, str, str]:
+        """Returns a list entry, which sorts names with equal keys by case."""
+        return (key, name.casefold(), name)
+
+    @staticmethod
+    def word_keys(name: str) -> list[str]:
+        """Returns the keys for every word of a name but the first."""
+        key = name.casefold()
+        return [key[match.start():] for match in WORD_START.finditer(key)
+            if match.start() > 0]
+
+    def rebuild(self, names: Iterable[str]) -> None:
+        """Replaces every name in the index.
+
+        Args:
+            names: The names to index.
+        """
+        names = list(names)
+        self.names = sorted(self.entry(key=name.casefold(), name=name) for name in names)
+        self.words = sorted(
+            self.entry(key=key, name=name)
+            for name in names for key in self.word_keys(name)
+            )
+        logger.debug(f"Indexed {len(self.names)} names")
+
+    def add(self, name: str) -> None:
+        """Adds a single name to the index."""
+        bisect.insort(self.names, self.entry(key=name.casefold(), name=name))
+        for key in self.word_keys(name):
+            bisect.insort(self.words, self.entry(key=key, name=name))
+
+    def remove(self, name: str) -> None:
+        """Removes a single name from the index if it is there."""
+        self._remove_entry(self.names, self.entry(key=name.casefold(), name=name))
+        for key in self.word_keys(name):
+            self._remove_entry(self.words, self.entry(key=key, name=name))
+
+    @staticmethod
+    def _remove_entry(entries: list, entry: tuple) -> None:
+        index = bisect.bisect_left(entries, entry)
+        if index < len(entries) and entries[index] == entry:
+            del entries[index]
+
+    def find(self, text: str) -> Optional[str]:
+        """Returns the indexed name that equals the text ignoring case.
+
+        Args:
+            text: The text the user entered.
+
+        Returns:
+            The name as it is stored or None if there isn't one.
+        """
+        key = text.strip().casefold()
+        index = bisect.bisect_left(self.names, (key,))
+        if index < len(self.names) and self.names[index][0] == key:
+            return self.names[index][2]
+        return None
+
+    def matches(self, text: str, limit: int = MATCH_LIMIT) -> list[str]:
+        """Returns names that start with the text or have a word that does.
+
+        Names that start with the text come first, then names where a
+        later word does, each group in alphabetical order.
+
+        Args:
+            text: The text the user has typed so far.
+            limit: The maximum number of names to return.
+
+        Returns:
+            A list of at most limit names.
+        """
+        prefix = text.strip().casefold()
+        found = []
+        seen = set()
+        for entries in (self.names, self.words):
+            index = bisect.bisect_left(entries, (prefix,))
+            while len(found) < limit and index < len(entries):
+                key, _, name = entries[index]
+                if not key.startswith(prefix):
+                    break
+                if name not in seen:
+                    seen.add(name)
+                    found.append(name)
+                index += 1
+            if not prefix:
+                break
+
+        return found
+
+    def __len__(self) -> int:
+        return len(self.names)
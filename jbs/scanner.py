@@ -0,0 +1,610 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import concurrent.futures
+import dataclasses
+import logging
+import os
+import pathlib
+import re
+import sqlite3
+import time
+from typing import Callable, Iterable, Optional
+
+import jbs.database.database_files as dbfiles
+import jbs.duplicates as duplicates
+import jbs.inventory as inv
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.NOTSET)
+
+# The file types recorded by a scan
+MODEL_EXTENSIONS = ('STL', 'OBJ', '3MF', 'LYS', 'ZIP')
+
+# Number of directories read at the same time. Reading a directory on a
+# network share mostly waits on the network, so this can be well above
+# the number of processors.
+SCAN_WORKERS = 8
+
+# Settings used when the config file doesn't have a "scan" section.
+# Relative artist folders are found under root, hash_workers is the
+# number of files hashed at once when looking for duplicates and verify
+# makes every scan compare the files of unchanged directories too.
+DEFAULT_SCAN_SETTINGS = {
+    'root': '',
+    'workers': SCAN_WORKERS,
+    'hash_workers': duplicates.HASH_WORKERS,
+    'verify': False,
+    }
+
+# Only this many errors are kept in a report, the rest are still counted
+MAX_REPORTED_ERRORS = 1000
+
+# A directory modified this recently, in nanoseconds, could change again
+# without its modification time changing on file systems that only keep
+# whole seconds, so it is read again by the next scan.
+RECENT_CHANGE = 2_000_000_000
+
+
+def get_scan_settings(settings: Optional[dict] = None) -> dict:
+    """Combines scan settings with the defaults.
+
+    Args:
+        settings: The "scan" section of the config file, if any.
+
+    Returns:
+        A dictionary with every setting in DEFAULT_SCAN_SETTINGS.
+
+    Raises:
+        ValueError: A setting is unknown or has an invalid value.
+    """
+    combined = dict(DEFAULT_SCAN_SETTINGS)
+    for name, value in (settings or {}).items():
+        if name not in DEFAULT_SCAN_SETTINGS:
+            raise ValueError(f"Unknown scan setting {name}")
+        if name == 'root' and not isinstance(value, str):
+            raise ValueError("scan setting root must be a folder")
+        if name in ('workers', 'hash_workers') and (
+            isinstance(value, bool) or not isinstance(value, int) or value < 1
+            ):
+            raise ValueError(f"scan setting {name} must be a positive number")
+        if name == 'verify' and not isinstance(value, bool):
+            raise ValueError("scan setting verify must be true or false")
+        combined[name] = value
+
+    return combined
+
+
+@dataclasses.dataclass
+class ScanReport:
+    """The outcome of a scan.
+
+    Attributes:
+        folders: The number of artist folders scanned.
+        directories: The number of directories that were new or changed.
+        skipped: The number of directories that hadn't changed since
+            the last scan, so weren't saved again.
+        files: The number of model files in the directories read.
+        linked: The number of files linked to a model.
+        added: The number of files added to the database.
+        updated: The number of files that changed since the last scan.
+        removed: The number of files that are gone since the last scan.
+        error_count: The number of folders that could not be read.
+        errors: Messages for the first folders that could not be read.
+    """
+    folders: int = 0
+    directories: int = 0
+    skipped: int = 0
+    files: int = 0
+    linked: int = 0
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    error_count: int = 0
+    errors: list[str] = dataclasses.field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+        logger.warning(message)
+
+
+@dataclasses.dataclass
+class Scan:
+    """The changes found under the artist folders, ready to be saved.
+
+    Attributes:
+        roots: The folder of every scanned artist by artist ID.
+        directories: The directories that were read, in the order they
+            were found.
+        deleted: The directories that no longer exist.
+        report: The counts of the scan so far.
+    """
+    roots: dict[int, str]
+    directories: list[dbfiles.ScannedDirectory]
+    deleted: list[str]
+    report: ScanReport
+
+
+@dataclasses.dataclass
+class ScanState:
+    """What the database knows about the artist folders before a scan.
+
+    Attributes:
+        folders: The folder of each artist to scan by artist ID.
+        snapshot: The directories recorded by the last scan, None for
+            a full scan.
+        known_files: The files recorded by the last scan by directory,
+            None unless the scan verifies unchanged directories.
+        model_names: (model ID, name) of each model by artist ID.
+        report: The counts of the scan so far.
+    """
+    folders: dict[int, pathlib.Path]
+    snapshot: Optional[dict[str, tuple[int, Optional[str], int, int]]]
+    known_files: Optional[dict[str, dict[str, tuple[int, int]]]]
+    model_names: dict[int, list[tuple[int, str]]]
+    report: ScanReport
+
+
+def normalize_name(name: str) -> str:
+    """Reduces a model or file name to lower case words.
+
+    Punctuation, underscores and repeated spaces are ignored, so
+    Red_Dragon-v2 and "red dragon v2" are the same.
+    """
+    return ' '.join(re.sub(r'[\W_]+', ' ', name).split()).casefold()
+
+
+def artist_folder(folder: str, root: os.PathLike) -> pathlib.Path:
+    """Gets the full path of an artist folder.
+
+    Args:
+        folder: The folder of the artist, absolute or relative to root.
+        root: The folder the relative artist folders are in.
+    """
+    return pathlib.Path(root).joinpath(folder.strip())
+
+
+def read_directory(
+    directory: str,
+    extensions: tuple[str, ...]
+    ) -> tuple[list[tuple[str, int, int, str]], list[str]]:
+    """Lists the model files and subdirectories of one directory.
+
+    Links are not followed, so a link to a parent directory can't make
+    a scan run forever.
+
+    Args:
+        directory: The directory to read.
+        extensions: The upper case extensions of the files to list.
+
+    Returns:
+        (path, size, modified, extension) for each model file, and the
+        paths of the subdirectories.
+
+    Raises:
+        OSError: If the directory can't be read.
+    """
+    files = []
+    directories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+                continue
+            extension = os.path.splitext(entry.name)[1][1:].upper()
+            if extension not in extensions or not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            files.append((entry.path, stat.st_size, stat.st_mtime_ns, extension))
+
+    return files, directories
+
+
+def visit_directory(
+    directory: str,
+    extensions: tuple[str, ...],
+    known: Optional[tuple[int, int]] = None,
+    known_files: Optional[dict[str, tuple[int, int]]] = None
+    ) -> tuple[int, int, Optional[tuple[list, list]], bool]:
+    """Reads a directory unless it is the same as when it was last scanned.
+
+    Adding, removing or renaming anything in a directory changes its
+    modification time, and replacing it changes its inode, so if
+    neither changed it has the same files and subdirectories as before
+    and costs a single stat. Writing to a file in place changes
+    neither, so with known_files the directory is read anyway and the
+    sizes and modification times of its files are compared. That
+    costs as much as reading a changed directory: a stat of every
+    model file, which is a round trip per file on most network shares.
+
+    Args:
+        directory: The directory to read.
+        extensions: The upper case extensions of the files to list.
+        known: The modification time and inode recorded by the last
+            scan, None if the directory is new.
+        known_files: (size, modified) of the files recorded by the last
+            scan by path. None skips an unchanged directory without
+            reading it, so files changed in place aren't noticed.
+
+    Returns:
+        The modification time and inode of the directory, what
+        read_directory returns, None if the directory wasn't read, and
+        whether the directory changed.
+
+    Raises:
+        OSError: If the directory can't be read.
+    """
+    stat = os.stat(directory)
+    unchanged = known == (stat.st_mtime_ns, stat.st_ino)
+    if unchanged and known_files is None:
+        return stat.st_mtime_ns, stat.st_ino, None, False
+
+    listing = read_directory(directory, extensions)
+    changed = not unchanged or known_files != {
+        path: (size, modified) for path, size, modified, _ in listing[0]
+        }
+    return stat.st_mtime_ns, stat.st_ino, listing, changed
+
+
+def walk_folders(
+    folders: dict[int, pathlib.Path],
+    snapshot: Optional[dict[str, tuple[int, Optional[str], int, int]]] = None,
+    known_files: Optional[dict[str, dict[str, tuple[int, int]]]] = None,
+    workers: int = SCAN_WORKERS,
+    extensions: Iterable[str] = MODEL_EXTENSIONS,
+    report: Optional[ScanReport] = None,
+    progress: Optional[Callable[[ScanReport], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> tuple[dict[int, list[tuple[str, Optional[str], int, int, list, list]]], list[str]]:
+    """Finds the directories under the artist folders that changed.
+
+    Every directory is visited by a thread pool as a separate task, and
+    the subdirectories are queued as new tasks, so a large folder tree
+    is read by all of the workers at once. A directory that is the same
+    as in the snapshot, with files that are the same as in known_files,
+    isn't returned. If it wasn't read, only its subdirectories from the
+    snapshot are visited, as changes further down don't change it.
+
+    A directory with a subdirectory that couldn't be read, or wasn't
+    visited because the scan was stopped, is returned with a
+    modification time of -1, so the next scan reads it and visits all
+    of its subdirectories again.
+
+    Args:
+        folders: The folder of each artist by artist ID.
+        snapshot: The directories recorded by the last scan, as
+            returned by dbfiles.get_directories. None reads every
+            directory.
+        known_files: The files recorded by the last scan, as returned
+            by dbfiles.get_directory_files, to find files changed in
+            place. None skips the directories that are the same as in
+            the snapshot without reading them, which is much quicker.
+        workers: The number of directories visited at the same time.
+        extensions: The file types to find.
+        report: Counts the directories, files and errors.
+        progress: Called on the scanning thread after every directory.
+        stop: Called after every directory, the scan ends early if it
+            returns True.
+
+    Returns:
+        (path, parent, modified, inode, files, subdirectories) for each
+        directory that was read, by artist ID, and the paths of the
+        directories in the snapshot that no longer exist.
+    """
+    extensions = tuple(extension.upper() for extension in extensions)
+    snapshot = snapshot or {}
+    report = report or ScanReport()
+    children = {}
+    for path, (_, parent, _, _) in snapshot.items():
+        if parent is not None:
+            children.setdefault(parent, []).append(path)
+    found = {artist_id: [] for artist_id in folders}
+    deleted = []
+    # Directories with a subdirectory that wasn't read
+    incomplete = set()
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix='scanner'
+        ) as pool:
+        running = {}
+
+        def visit(artist_id, directory, parent):
+            # A directory that moved to another artist, or became an
+            # artist folder, is read again
+            known = snapshot.get(directory)
+            if known is not None and known[:2] != (artist_id, parent):
+                known = None
+            future = pool.submit(
+                visit_directory,
+                directory,
+                extensions,
+                None if known is None else known[2:],
+                None if known_files is None else known_files.get(directory, {})
+                )
+            running[future] = (artist_id, directory, parent)
+
+        for artist_id, folder in folders.items():
+            visit(artist_id, str(folder), None)
+
+        while running:
+            done, _ = concurrent.futures.wait(
+                running,
+                return_when=concurrent.futures.FIRST_COMPLETED
+                )
+            for future in done:
+                artist_id, directory, parent = running.pop(future)
+                try:
+                    modified, inode, listing, changed = future.result()
+                except FileNotFoundError:
+                    if directory in snapshot:
+                        deleted.append(directory)
+                    continue
+                except OSError as e:
+                    report.add_error(f"Could not read {directory}: {e.strerror}")
+                    incomplete.add(parent)
+                    continue
+
+                if not changed:
+                    report.skipped += 1
+                    if listing is None:
+                        subdirectories = children.get(directory, ())
+                    else:
+                        subdirectories = listing[1]
+                else:
+                    files, subdirectories = listing
+                    report.directories += 1
+                    report.files += len(files)
+                    if time.time_ns() - modified < RECENT_CHANGE:
+                        modified = -1
+                    found[artist_id].append(
+                        (directory, parent, modified, inode, files, subdirectories)
+                        )
+                for subdirectory in subdirectories:
+                    visit(artist_id, subdirectory, directory)
+
+            if progress is not None:
+                progress(report)
+            if stop is not None and stop():
+                logger.info("Scan stopped")
+                for future in running:
+                    future.cancel()
+                    incomplete.add(running[future][2])
+                break
+
+    for artist_id, directories in found.items():
+        found[artist_id] = [
+            (path, parent, -1 if path in incomplete else modified, inode, files, subdirectories)
+            for path, parent, modified, inode, files, subdirectories in directories
+            ]
+
+    return found, deleted
+
+
+def link_model(
+    path: str,
+    folder: pathlib.Path,
+    names: dict[str, int]
+    ) -> Optional[int]:
+    """Finds the model a file belongs to.
+
+    The file name and then each directory between it and the artist
+    folder, innermost first, are compared with the artist's model names.
+
+    Args:
+        path: The path of the file.
+        folder: The artist folder the file was found in.
+        names: Model IDs by normalized model name.
+
+    Returns:
+        The model ID, None if no name matches.
+    """
+    path = pathlib.Path(path)
+    candidates = [path.stem]
+    try:
+        candidates.extend(reversed(path.parent.relative_to(folder).parts))
+    except ValueError:
+        pass
+    for candidate in candidates:
+        model_id = names.get(normalize_name(candidate))
+        if model_id is not None:
+            return model_id
+    return None
+
+
+def read_scan_state(
+    connection: sqlite3.Connection,
+    root: os.PathLike = '',
+    full: bool = False,
+    verify: bool = False
+    ) -> ScanState:
+    """Reads what a scan needs from the database.
+
+    Only reads the database, so it can run on a read only connection,
+    and doesn't read the artist folders, so it is quick. The folders
+    are then read by walk_artist_folders, which doesn't need a
+    connection. Folders that don't exist are reported as errors.
+
+    Args:
+        connection: A sqlite database connection.
+        root: The folder the relative artist folders are in.
+        full: Leaves out the snapshot, so every directory is read.
+        verify: Reads the files of every directory, so unchanged
+            directories can be checked for files changed in place.
+    """
+    report = ScanReport()
+    folders = {}
+    for artist_id, folder in dbfiles.get_artist_folders(connection=connection):
+        path = artist_folder(folder=folder, root=root)
+        if path.is_dir():
+            folders[artist_id] = path
+        else:
+            report.add_error(f"Artist folder {path} does not exist")
+    report.folders = len(folders)
+
+    return ScanState(
+        folders=folders,
+        snapshot=None if full else dbfiles.get_directories(connection=connection),
+        known_files=dbfiles.get_directory_files(
+            connection=connection
+            ) if verify and not full else None,
+        model_names=dbfiles.get_model_names(connection=connection),
+        report=report
+        )
+
+
+def walk_artist_folders(
+    state: ScanState,
+    workers: int = SCAN_WORKERS,
+    extensions: Iterable[str] = MODEL_EXTENSIONS,
+    progress: Optional[Callable[[ScanReport], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> Scan:
+    """Finds the model files under every artist folder that changed.
+
+    Doesn't use the database, so a long scan of a slow share can run on
+    its own thread without holding a connection. The result is saved
+    with save_scan. Files in folders that don't exist are kept in the
+    database.
+
+    Directories that haven't changed since the last scan aren't read,
+    see walk_folders. A file that is changed in place doesn't change
+    its directory, so it is only noticed by a scan that verifies the
+    files of unchanged directories, or by a full scan. A full scan also
+    saves every directory, which links every file to its model again,
+    for instance after models were added or renamed.
+
+    Args:
+        state: What the database knows, from read_scan_state.
+        workers: The number of directories visited at the same time.
+        extensions: The file types to find.
+        progress: Called on the scanning thread after every directory.
+        stop: Called after every directory, the scan ends early if it
+            returns True.
+
+    Returns:
+        The directories that were read, with their files linked to
+        their models where possible.
+    """
+    report = state.report
+    folders = state.folders
+    logger.info(f"Scanning {len(folders)} artist folders")
+    found, deleted = walk_folders(
+        folders=folders,
+        snapshot=state.snapshot,
+        known_files=state.known_files,
+        workers=workers,
+        extensions=extensions,
+        report=report,
+        progress=progress,
+        stop=stop
+        )
+
+    directories = []
+    for artist_id, artist_directories in found.items():
+        names = {}
+        for model_id, name in state.model_names.get(artist_id, ()):
+            names.setdefault(normalize_name(name), model_id)
+        for path, parent, modified, inode, listing, subdirectories in artist_directories:
+            files = []
+            for file_path, size, file_modified, extension in listing:
+                model_id = link_model(
+                    path=file_path,
+                    folder=folders[artist_id],
+                    names=names
+                    )
+                if model_id is not None:
+                    report.linked += 1
+                files.append(inv.ModelFile(
+                    0, file_path, artist_id, model_id, size, file_modified,
+                    extension
+                    ))
+            directories.append(dbfiles.ScannedDirectory(
+                path=path,
+                artist=artist_id,
+                parent=parent,
+                modified=modified,
+                inode=inode,
+                files=files,
+                subdirectories=subdirectories
+                ))
+    # Parents are saved before the directories in them
+    directories.sort(key=lambda directory: directory.path.count(os.sep))
+
+    logger.info(
+        f"Read {report.directories} directories, {report.skipped} unchanged"
+        )
+    # A stopped scan didn't visit every artist folder
+    roots = {} if stop is not None and stop() else {
+        artist_id: str(folder) for artist_id, folder in folders.items()
+        }
+
+    return Scan(roots=roots, directories=directories, deleted=deleted, report=report)
+
+
+def scan_artist_folders(
+    connection: sqlite3.Connection,
+    root: os.PathLike = '',
+    full: bool = False,
+    verify: bool = False,
+    workers: int = SCAN_WORKERS,
+    extensions: Iterable[str] = MODEL_EXTENSIONS,
+    progress: Optional[Callable[[ScanReport], None]] = None,
+    stop: Optional[Callable[[], bool]] = None
+    ) -> Scan:
+    """Finds the model files under every artist folder that changed.
+
+    Runs read_scan_state and walk_artist_folders one after the other on
+    the same thread, for callers that don't mind the connection being
+    held for the whole scan.
+
+    Args:
+        connection: A sqlite database connection.
+        root: The folder the relative artist folders are in.
+        full: Reads every directory, even unchanged ones.
+        verify: Compares the files of unchanged directories too.
+        workers: The number of directories visited at the same time.
+        extensions: The file types to find.
+        progress: Called on the scanning thread after every directory.
+        stop: Called after every directory, the scan ends early if it
+            returns True.
+    """
+    state = read_scan_state(
+        connection=connection,
+        root=root,
+        full=full,
+        verify=verify
+        )
+    return walk_artist_folders(
+        state=state,
+        workers=workers,
+        extensions=extensions,
+        progress=progress,
+        stop=stop
+        )
+
+
+def save_scan(connection: sqlite3.Connection, scan: Scan) -> ScanReport:
+    """Writes the result of a scan to the database.
+
+    Args:
+        connection: A sqlite database connection.
+        scan: The result of walk_artist_folders.
+
+    Returns:
+        The report of the scan with the database changes added.
+    """
+    added, updated, removed = dbfiles.save_directories(
+        connection=connection,
+        directories=scan.directories,
+        deleted=scan.deleted,
+        roots=scan.roots
+        )
+    scan.report.added = added
+    scan.report.updated = updated
+    scan.report.removed = removed
+
+    return scan.report
@@ -3,12 +3,14 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import logging
+import multiprocessing
 import pathlib
 
 # jbs.logging is imported to create the root logger before the other 
 # modules are imported otherwise they get a different root logger.
 import jbs.logging
 import jbs.config as config
+import jbs.database.database_migrations as dbmigrations
 import jbs.database.database_utils as db
 import jbs.gui as gui
 
@@ -16,31 +18,59 @@ scriptpath = pathlib.Path(__file__).resolve().parent
 
 default_database = scriptpath.joinpath('3D_Models.db')
 sql_schema_new = scriptpath.joinpath('sql', 'empty_database.sql')
-sql_schema_update = scriptpath.joinpath('sql', 'update_database.sql')
-sql_update_version = scriptpath.joinpath('sql', 'schema_version.json')
+sql_migrations = scriptpath.joinpath('sql', 'migrations')
 default_config = scriptpath.joinpath('config.json')
 
 
+def log_progress(
+    migration: dbmigrations.Migration,
+    copied: int,
+    total: int
+    ) -> None:
+    logger = logging.getLogger(__name__)
+    logger.info(f"Migration {migration.version}: {copied} of {total} rows copied")
+
+
 def main() -> None:
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.NOTSET)
 
     logger.info("Starting Application")
+    # Connection, search and scan settings come from the optional
+    # "sqlite", "search" and "scan" sections of the config file.
+    settings = None
+    search_settings = None
+    scan_settings = None
+    if default_config.exists():
+        configuration = config.get_config(config_file=default_config)
+        settings = configuration.get('sqlite')
+        search_settings = configuration.get('search')
+        scan_settings = configuration.get('scan')
+
     # Determine how to connect to the database. Either default 
     # location, location specified in the config file, or create 
     # a new database.
     if default_database.exists():
         logger.info("Using default database")
         logger.debug(default_database)
-        connection = db.connect_database(database=default_database)
+        connection = db.connect_database(
+            database=default_database,
+            settings=settings
+            )
     elif default_config.exists():
         logger.info("Using database from config file")
         configuration = config.get_config(config_file=default_config)
         logger.debug(configuration['database'])
-        connection = db.connect_database(database=configuration['database'])
+        connection = db.connect_database(
+            database=configuration['database'],
+            settings=settings
+            )
     else:
         logger.info("No database, Creating New")
-        connection = db.connect_database(database=default_database)
+        connection = db.connect_database(
+            database=default_database,
+            settings=settings
+            )
         logger.debug(default_database)
         db.modify_database_schema(
             connection=connection,
@@ -48,29 +78,58 @@ def main() -> None:
             )
         logger.info("Database has been created")
 
-    # Check if a database update is needed
-    file_version = config.get_update_version(
-        update_version_file=sql_update_version
-        )
-    logger.debug(f"Newest schema is {file_version}")
-    db_version = db.check_database_schema(connection=connection)
-    logger.debug(f"Database schema is {db_version}")
-
-    if file_version > db_version:
+    # Apply the migrations the database doesn't have yet
+    if not dbmigrations.is_current(
+        connection=connection,
+        directory=sql_migrations
+        ):
         logger.debug("Schema update is needed")
-        db.modify_database_schema(
+        pending = dbmigrations.pending_migrations(
             connection=connection,
-            sql_file=sql_schema_update
+            directory=sql_migrations
             )
-        logger.info("Schema update has been applied")
-    else:
-        pass
+        # Table rebuilds can take minutes, so they get a progress window
+        window = None
+        if any(migration.rebuild_table() for migration in pending):
+            window = gui.MigrationWindow()
 
-    app = gui.Window(connection)
-    app.root.mainloop()
+        def progress(migration, copied, total):
+            log_progress(migration=migration, copied=copied, total=total)
+            if window is not None:
+                window.progress(migration=migration, copied=copied, total=total)
 
+        try:
+            applied = dbmigrations.migrate(
+                connection=connection,
+                directory=sql_migrations,
+                progress=progress,
+                stop=window.stopped if window is not None else None
+                )
+        finally:
+            if window is not None:
+                window.close()
+        if len(applied) < len(pending):
+            # The copied chunks are kept, the next start carries on
+            logger.info("Schema update has been paused")
+            db.close_database(connection=connection)
+            return
+        logger.info("Schema update has been applied")
+
+    # The window opens its own connections, so this one is only needed
+    # to create or update the database
+    database = db.get_database_path(connection=connection)
     logger.info("closing the database connection")
     db.close_database(connection=connection)
 
+    app = gui.Window(
+        database=database,
+        settings=settings,
+        search_settings=search_settings,
+        scan_settings=scan_settings
+        )
+    app.root.mainloop()
+
 if __name__ == '__main__':
+    # Lets the duplicate finder's worker processes start in the executable
+    multiprocessing.freeze_support()
     main()
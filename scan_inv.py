@@ -0,0 +1,123 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import argparse
+import logging
+import pathlib
+import sys
+
+# jbs.logging is imported to create the root logger before the other
+# modules are imported otherwise they get a different root logger.
+import jbs.logging
+import jbs.config as config
+import jbs.database.database_utils as db
+import jbs.scanner as scanner
+
+scriptpath = pathlib.Path(__file__).resolve().parent
+
+default_database = scriptpath.joinpath('3D_Models.db')
+default_config = scriptpath.joinpath('config.json')
+
+
+def print_progress(report: scanner.ScanReport) -> None:
+    print(
+        f"\r{report.directories} directories read, {report.files} files found",
+        end='',
+        flush=True
+        )
+
+
+def main() -> None:
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.NOTSET)
+
+    parser = argparse.ArgumentParser(
+        description="Find the model files in every artist folder."
+        )
+    parser.add_argument(
+        '-r', '--root',
+        type=pathlib.Path,
+        help="Folder the relative artist folders are in"
+        )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        help="Directories read at the same time"
+        )
+    parser.add_argument(
+        '-f', '--full',
+        action='store_true',
+        help="Save every directory and link its files to models again"
+        )
+    parser.add_argument(
+        '-v', '--verify',
+        action='store_true',
+        help="Look for files changed in place in unchanged directories"
+        )
+    parser.add_argument(
+        '-d', '--database',
+        type=pathlib.Path,
+        help="Database to scan for"
+        )
+    args = parser.parse_args()
+
+    configuration = {}
+    if default_config.exists():
+        configuration = config.get_config(config_file=default_config)
+
+    if args.database:
+        database = args.database
+    elif default_database.exists():
+        database = default_database
+    elif 'database' in configuration:
+        database = configuration['database']
+    else:
+        print("No Database Found")
+        sys.exit(1)
+
+    try:
+        settings = scanner.get_scan_settings(settings=configuration.get('scan'))
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    root = args.root or settings['root']
+    workers = args.workers or settings['workers']
+
+    logger.info(f"Scanning the artist folders of {database}")
+    connection = db.connect_database(
+        database=database,
+        settings=configuration.get('sqlite')
+        )
+    try:
+        scan = scanner.scan_artist_folders(
+            connection=connection,
+            root=root,
+            full=args.full,
+            verify=args.verify or settings['verify'],
+            workers=workers,
+            progress=print_progress
+            )
+        report = scanner.save_scan(connection=connection, scan=scan)
+    finally:
+        db.close_database(connection=connection)
+
+    print()
+    print(
+        f"{report.directories} directories read, {report.skipped} unchanged"
+        )
+    print(
+        f"{report.files} files in {report.folders} artist folders, "
+        f"{report.linked} linked to models"
+        )
+    print(
+        f"{report.added} added, {report.updated} changed, "
+        f"{report.removed} removed"
+        )
+    for message in report.errors:
+        print(message)
+    if report.error_count > len(report.errors):
+        print(f"... {report.error_count - len(report.errors)} more errors")
+
+if __name__ == '__main__':
+    main()
@@ -23,11 +23,139 @@ CREATE TABLE IF NOT EXISTS "tblModel" (
 	"Supports"	INTEGER,
 	"Format"	TEXT,
 	"Printed"	INTEGER,
-	PRIMARY KEY("Model_ID" AUTOINCREMENT)
+	PRIMARY KEY("Model_ID" AUTOINCREMENT),
+	FOREIGN KEY("Artist") REFERENCES "tblArtist"("Artist_ID") ON DELETE RESTRICT,
+	FOREIGN KEY("Source") REFERENCES "tblSource"("Source_ID") ON DELETE RESTRICT
 );
+CREATE INDEX IF NOT EXISTS "idxModelArtist" ON "tblModel" ("Artist");
+CREATE INDEX IF NOT EXISTS "idxModelSource" ON "tblModel" ("Source");
+CREATE INDEX IF NOT EXISTS "idxArtistName" ON "tblArtist" ("Artist_Name");
+CREATE INDEX IF NOT EXISTS "idxSourceName" ON "tblSource" ("Source_Name");
+CREATE INDEX IF NOT EXISTS "idxArtistNameNoCase" ON "tblArtist" ("Artist_Name" COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxSourceNameNoCase" ON "tblSource" ("Source_Name" COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxModelName" ON "tblModel" (IFNULL("Model_Name", '') COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxModelSet" ON "tblModel" (IFNULL("Set_Name", '') COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxModelFormat" ON "tblModel" (IFNULL("Format", '') COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS "ftsModel" USING fts5(
+	"Model_Name",
+	"Set_Name",
+	"Source_Note",
+	"Format",
+	"Artist_Name",
+	"Source_Name",
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS "ftsArtist" USING fts5(
+	"Artist_Name",
+	"Artist_Website",
+	"Artist_Email",
+	content = 'tblArtist',
+	content_rowid = 'Artist_ID',
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS "ftsSource" USING fts5(
+	"Source_Name",
+	"Source_Website",
+	content = 'tblSource',
+	content_rowid = 'Source_ID',
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS "trgModelInsert" AFTER INSERT ON "tblModel" BEGIN
+	INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+	VALUES (NEW."Model_ID", NEW."Model_Name", NEW."Set_Name", NEW."Source_Note", NEW."Format",
+		(SELECT "Artist_Name" FROM "tblArtist" WHERE "Artist_ID" = NEW."Artist"),
+		(SELECT "Source_Name" FROM "tblSource" WHERE "Source_ID" = NEW."Source"));
+END;
+CREATE TRIGGER IF NOT EXISTS "trgModelUpdate" AFTER UPDATE ON "tblModel" BEGIN
+	DELETE FROM "ftsModel" WHERE rowid = OLD."Model_ID";
+	INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+	VALUES (NEW."Model_ID", NEW."Model_Name", NEW."Set_Name", NEW."Source_Note", NEW."Format",
+		(SELECT "Artist_Name" FROM "tblArtist" WHERE "Artist_ID" = NEW."Artist"),
+		(SELECT "Source_Name" FROM "tblSource" WHERE "Source_ID" = NEW."Source"));
+END;
+CREATE TRIGGER IF NOT EXISTS "trgModelDelete" AFTER DELETE ON "tblModel" BEGIN
+	DELETE FROM "ftsModel" WHERE rowid = OLD."Model_ID";
+END;
+CREATE TRIGGER IF NOT EXISTS "trgArtistInsert" AFTER INSERT ON "tblArtist" BEGIN
+	INSERT INTO "ftsArtist" (rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES (NEW."Artist_ID", NEW."Artist_Name", NEW."Artist_Website", NEW."Artist_Email");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgArtistUpdate" AFTER UPDATE ON "tblArtist" BEGIN
+	INSERT INTO "ftsArtist" ("ftsArtist", rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES ('delete', OLD."Artist_ID", OLD."Artist_Name", OLD."Artist_Website", OLD."Artist_Email");
+	INSERT INTO "ftsArtist" (rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES (NEW."Artist_ID", NEW."Artist_Name", NEW."Artist_Website", NEW."Artist_Email");
+	UPDATE "ftsModel" SET "Artist_Name" = NEW."Artist_Name"
+	WHERE rowid IN (SELECT "Model_ID" FROM "tblModel" WHERE "Artist" = NEW."Artist_ID");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgArtistDelete" AFTER DELETE ON "tblArtist" BEGIN
+	INSERT INTO "ftsArtist" ("ftsArtist", rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES ('delete', OLD."Artist_ID", OLD."Artist_Name", OLD."Artist_Website", OLD."Artist_Email");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgSourceInsert" AFTER INSERT ON "tblSource" BEGIN
+	INSERT INTO "ftsSource" (rowid, "Source_Name", "Source_Website")
+	VALUES (NEW."Source_ID", NEW."Source_Name", NEW."Source_Website");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgSourceUpdate" AFTER UPDATE ON "tblSource" BEGIN
+	INSERT INTO "ftsSource" ("ftsSource", rowid, "Source_Name", "Source_Website")
+	VALUES ('delete', OLD."Source_ID", OLD."Source_Name", OLD."Source_Website");
+	INSERT INTO "ftsSource" (rowid, "Source_Name", "Source_Website")
+	VALUES (NEW."Source_ID", NEW."Source_Name", NEW."Source_Website");
+	UPDATE "ftsModel" SET "Source_Name" = NEW."Source_Name"
+	WHERE rowid IN (SELECT "Model_ID" FROM "tblModel" WHERE "Source" = NEW."Source_ID");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgSourceDelete" AFTER DELETE ON "tblSource" BEGIN
+	INSERT INTO "ftsSource" ("ftsSource", rowid, "Source_Name", "Source_Website")
+	VALUES ('delete', OLD."Source_ID", OLD."Source_Name", OLD."Source_Website");
+END;
+CREATE TABLE IF NOT EXISTS "tblDirectory" (
+	"Directory_ID"	INTEGER UNIQUE,
+	"Directory_Path"	TEXT NOT NULL UNIQUE,
+	"Artist"	INTEGER NOT NULL,
+	"Parent"	INTEGER,
+	"Directory_Modified"	INTEGER NOT NULL,
+	"Directory_Inode"	INTEGER NOT NULL,
+	PRIMARY KEY("Directory_ID" AUTOINCREMENT),
+	FOREIGN KEY("Artist") REFERENCES "tblArtist"("Artist_ID") ON DELETE CASCADE,
+	FOREIGN KEY("Parent") REFERENCES "tblDirectory"("Directory_ID") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idxDirectoryArtist" ON "tblDirectory" ("Artist");
+CREATE INDEX IF NOT EXISTS "idxDirectoryParent" ON "tblDirectory" ("Parent");
+CREATE TABLE IF NOT EXISTS "tblFile" (
+	"File_ID"	INTEGER UNIQUE,
+	"File_Path"	TEXT NOT NULL UNIQUE,
+	"Artist"	INTEGER NOT NULL,
+	"Model"	INTEGER,
+	"File_Size"	INTEGER NOT NULL,
+	"File_Modified"	INTEGER NOT NULL,
+	"File_Extension"	TEXT NOT NULL,
+	"Directory"	INTEGER,
+	PRIMARY KEY("File_ID" AUTOINCREMENT),
+	FOREIGN KEY("Artist") REFERENCES "tblArtist"("Artist_ID") ON DELETE CASCADE,
+	FOREIGN KEY("Model") REFERENCES "tblModel"("Model_ID") ON DELETE SET NULL,
+	FOREIGN KEY("Directory") REFERENCES "tblDirectory"("Directory_ID") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idxFileArtist" ON "tblFile" ("Artist");
+CREATE INDEX IF NOT EXISTS "idxFileModel" ON "tblFile" ("Model");
+CREATE INDEX IF NOT EXISTS "idxFileDirectory" ON "tblFile" ("Directory");
+CREATE INDEX IF NOT EXISTS "idxFileSize" ON "tblFile" ("File_Size");
+CREATE TABLE IF NOT EXISTS "tblHash" (
+	"File"	INTEGER NOT NULL UNIQUE,
+	"Hash_Size"	INTEGER NOT NULL,
+	"Hash_Modified"	INTEGER NOT NULL,
+	"Hash_Partial"	TEXT NOT NULL,
+	"Hash_Full"	TEXT,
+	PRIMARY KEY("File"),
+	FOREIGN KEY("File") REFERENCES "tblFile"("File_ID") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idxHashPartial" ON "tblHash" ("Hash_Size", "Hash_Partial");
+CREATE INDEX IF NOT EXISTS "idxHashFull" ON "tblHash" ("Hash_Full");
 CREATE TABLE IF NOT EXISTS "tblSchema" (
 	"label"	TEXT NOT NULL,
 	"version"	INTEGER NOT NULL
 );
-INSERT INTO "tblSchema" ("label","version") VALUES ("current", 2);
+INSERT INTO "tblSchema" ("label","version") VALUES ("current", 9);
 COMMIT;
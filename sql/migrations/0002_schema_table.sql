@@ -0,0 +1,6 @@
+-- Version 2: the table holding the schema version. The migration
+-- engine adds the version row.
+CREATE TABLE IF NOT EXISTS "tblSchema" (
+	"label"	TEXT NOT NULL,
+	"version"	INTEGER NOT NULL
+);
@@ -0,0 +1,85 @@
+-- Version 3: full-text search over models, artists and sources
+CREATE VIRTUAL TABLE IF NOT EXISTS "ftsModel" USING fts5(
+	"Model_Name",
+	"Set_Name",
+	"Source_Note",
+	"Format",
+	"Artist_Name",
+	"Source_Name",
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS "ftsArtist" USING fts5(
+	"Artist_Name",
+	"Artist_Website",
+	"Artist_Email",
+	content = 'tblArtist',
+	content_rowid = 'Artist_ID',
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS "ftsSource" USING fts5(
+	"Source_Name",
+	"Source_Website",
+	content = 'tblSource',
+	content_rowid = 'Source_ID',
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS "trgModelInsert" AFTER INSERT ON "tblModel" BEGIN
+	INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+	VALUES (NEW."Model_ID", NEW."Model_Name", NEW."Set_Name", NEW."Source_Note", NEW."Format",
+		(SELECT "Artist_Name" FROM "tblArtist" WHERE "Artist_ID" = NEW."Artist"),
+		(SELECT "Source_Name" FROM "tblSource" WHERE "Source_ID" = NEW."Source"));
+END;
+CREATE TRIGGER IF NOT EXISTS "trgModelUpdate" AFTER UPDATE ON "tblModel" BEGIN
+	DELETE FROM "ftsModel" WHERE rowid = OLD."Model_ID";
+	INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+	VALUES (NEW."Model_ID", NEW."Model_Name", NEW."Set_Name", NEW."Source_Note", NEW."Format",
+		(SELECT "Artist_Name" FROM "tblArtist" WHERE "Artist_ID" = NEW."Artist"),
+		(SELECT "Source_Name" FROM "tblSource" WHERE "Source_ID" = NEW."Source"));
+END;
+CREATE TRIGGER IF NOT EXISTS "trgModelDelete" AFTER DELETE ON "tblModel" BEGIN
+	DELETE FROM "ftsModel" WHERE rowid = OLD."Model_ID";
+END;
+CREATE TRIGGER IF NOT EXISTS "trgArtistInsert" AFTER INSERT ON "tblArtist" BEGIN
+	INSERT INTO "ftsArtist" (rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES (NEW."Artist_ID", NEW."Artist_Name", NEW."Artist_Website", NEW."Artist_Email");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgArtistUpdate" AFTER UPDATE ON "tblArtist" BEGIN
+	INSERT INTO "ftsArtist" ("ftsArtist", rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES ('delete', OLD."Artist_ID", OLD."Artist_Name", OLD."Artist_Website", OLD."Artist_Email");
+	INSERT INTO "ftsArtist" (rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES (NEW."Artist_ID", NEW."Artist_Name", NEW."Artist_Website", NEW."Artist_Email");
+	UPDATE "ftsModel" SET "Artist_Name" = NEW."Artist_Name"
+	WHERE rowid IN (SELECT "Model_ID" FROM "tblModel" WHERE "Artist" = NEW."Artist_ID");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgArtistDelete" AFTER DELETE ON "tblArtist" BEGIN
+	INSERT INTO "ftsArtist" ("ftsArtist", rowid, "Artist_Name", "Artist_Website", "Artist_Email")
+	VALUES ('delete', OLD."Artist_ID", OLD."Artist_Name", OLD."Artist_Website", OLD."Artist_Email");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgSourceInsert" AFTER INSERT ON "tblSource" BEGIN
+	INSERT INTO "ftsSource" (rowid, "Source_Name", "Source_Website")
+	VALUES (NEW."Source_ID", NEW."Source_Name", NEW."Source_Website");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgSourceUpdate" AFTER UPDATE ON "tblSource" BEGIN
+	INSERT INTO "ftsSource" ("ftsSource", rowid, "Source_Name", "Source_Website")
+	VALUES ('delete', OLD."Source_ID", OLD."Source_Name", OLD."Source_Website");
+	INSERT INTO "ftsSource" (rowid, "Source_Name", "Source_Website")
+	VALUES (NEW."Source_ID", NEW."Source_Name", NEW."Source_Website");
+	UPDATE "ftsModel" SET "Source_Name" = NEW."Source_Name"
+	WHERE rowid IN (SELECT "Model_ID" FROM "tblModel" WHERE "Source" = NEW."Source_ID");
+END;
+CREATE TRIGGER IF NOT EXISTS "trgSourceDelete" AFTER DELETE ON "tblSource" BEGIN
+	INSERT INTO "ftsSource" ("ftsSource", rowid, "Source_Name", "Source_Website")
+	VALUES ('delete', OLD."Source_ID", OLD."Source_Name", OLD."Source_Website");
+END;
+
+INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+SELECT m."Model_ID", m."Model_Name", m."Set_Name", m."Source_Note", m."Format", a."Artist_Name", s."Source_Name"
+FROM "tblModel" AS m
+LEFT JOIN "tblArtist" AS a ON m."Artist" = a."Artist_ID"
+LEFT JOIN "tblSource" AS s ON m."Source" = s."Source_ID";
+
+INSERT INTO "ftsArtist" ("ftsArtist") VALUES ('rebuild');
+INSERT INTO "ftsSource" ("ftsSource") VALUES ('rebuild');
@@ -0,0 +1,61 @@
+-- rebuild: tblModel
+-- Version 4: indexes and foreign keys for the artist and source columns.
+-- tblModel is rebuilt in chunks to add the foreign keys. The statements
+-- after the new table run once the copy has replaced tblModel, which
+-- drops its triggers, so they are created again.
+CREATE TABLE "tblModel_new" (
+	"Model_ID"	INTEGER UNIQUE,
+	"Model_Name"	TEXT,
+	"Artist"	INTEGER,
+	"Set_Name"	TEXT,
+	"Source"	INTEGER,
+	"Source_Note"	TEXT,
+	"Supports"	INTEGER,
+	"Format"	TEXT,
+	"Printed"	INTEGER,
+	PRIMARY KEY("Model_ID" AUTOINCREMENT),
+	FOREIGN KEY("Artist") REFERENCES "tblArtist"("Artist_ID") ON DELETE RESTRICT,
+	FOREIGN KEY("Source") REFERENCES "tblSource"("Source_ID") ON DELETE RESTRICT
+);
+CREATE TRIGGER IF NOT EXISTS "trgModelInsert" AFTER INSERT ON "tblModel" BEGIN
+	INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+	VALUES (NEW."Model_ID", NEW."Model_Name", NEW."Set_Name", NEW."Source_Note", NEW."Format",
+		(SELECT "Artist_Name" FROM "tblArtist" WHERE "Artist_ID" = NEW."Artist"),
+		(SELECT "Source_Name" FROM "tblSource" WHERE "Source_ID" = NEW."Source"));
+END;
+CREATE TRIGGER IF NOT EXISTS "trgModelUpdate" AFTER UPDATE ON "tblModel" BEGIN
+	DELETE FROM "ftsModel" WHERE rowid = OLD."Model_ID";
+	INSERT INTO "ftsModel" (rowid, "Model_Name", "Set_Name", "Source_Note", "Format", "Artist_Name", "Source_Name")
+	VALUES (NEW."Model_ID", NEW."Model_Name", NEW."Set_Name", NEW."Source_Note", NEW."Format",
+		(SELECT "Artist_Name" FROM "tblArtist" WHERE "Artist_ID" = NEW."Artist"),
+		(SELECT "Source_Name" FROM "tblSource" WHERE "Source_ID" = NEW."Source"));
+END;
+CREATE TRIGGER IF NOT EXISTS "trgModelDelete" AFTER DELETE ON "tblModel" BEGIN
+	DELETE FROM "ftsModel" WHERE rowid = OLD."Model_ID";
+END;
+CREATE INDEX IF NOT EXISTS "idxModelArtist" ON "tblModel" ("Artist");
+CREATE INDEX IF NOT EXISTS "idxModelSource" ON "tblModel" ("Source");
+CREATE INDEX IF NOT EXISTS "idxArtistName" ON "tblArtist" ("Artist_Name");
+CREATE INDEX IF NOT EXISTS "idxSourceName" ON "tblSource" ("Source_Name");
+-- Models whose artist or source was never saved, or has been deleted,
+-- are moved to an "Unknown" one so the foreign keys hold.
+INSERT INTO "tblArtist" ("Artist_Name")
+SELECT 'Unknown'
+WHERE EXISTS (SELECT 1 FROM "tblModel" AS m
+		WHERE m."Artist" IS NOT NULL
+		AND NOT EXISTS (SELECT 1 FROM "tblArtist" AS a WHERE a."Artist_ID" = m."Artist"))
+	AND NOT EXISTS (SELECT 1 FROM "tblArtist" WHERE "Artist_Name" = 'Unknown');
+UPDATE "tblModel"
+SET "Artist" = (SELECT MIN("Artist_ID") FROM "tblArtist" WHERE "Artist_Name" = 'Unknown')
+WHERE "Artist" IS NOT NULL
+	AND NOT EXISTS (SELECT 1 FROM "tblArtist" AS a WHERE a."Artist_ID" = "tblModel"."Artist");
+INSERT INTO "tblSource" ("Source_Name")
+SELECT 'Unknown'
+WHERE EXISTS (SELECT 1 FROM "tblModel" AS m
+		WHERE m."Source" IS NOT NULL
+		AND NOT EXISTS (SELECT 1 FROM "tblSource" AS s WHERE s."Source_ID" = m."Source"))
+	AND NOT EXISTS (SELECT 1 FROM "tblSource" WHERE "Source_Name" = 'Unknown');
+UPDATE "tblModel"
+SET "Source" = (SELECT MIN("Source_ID") FROM "tblSource" WHERE "Source_Name" = 'Unknown')
+WHERE "Source" IS NOT NULL
+	AND NOT EXISTS (SELECT 1 FROM "tblSource" AS s WHERE s."Source_ID" = "tblModel"."Source");
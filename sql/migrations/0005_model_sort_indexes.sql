@@ -0,0 +1,4 @@
+-- Version 5: indexes for paging through models in name, set or format order
+CREATE INDEX IF NOT EXISTS "idxModelName" ON "tblModel" (IFNULL("Model_Name", '') COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxModelSet" ON "tblModel" (IFNULL("Set_Name", '') COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxModelFormat" ON "tblModel" (IFNULL("Format", '') COLLATE NOCASE);
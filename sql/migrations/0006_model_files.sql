@@ -0,0 +1,15 @@
+-- Version 6: model files found under the artist folders by the scanner
+CREATE TABLE IF NOT EXISTS "tblFile" (
+	"File_ID"	INTEGER UNIQUE,
+	"File_Path"	TEXT NOT NULL UNIQUE,
+	"Artist"	INTEGER NOT NULL,
+	"Model"	INTEGER,
+	"File_Size"	INTEGER NOT NULL,
+	"File_Modified"	INTEGER NOT NULL,
+	"File_Extension"	TEXT NOT NULL,
+	PRIMARY KEY("File_ID" AUTOINCREMENT),
+	FOREIGN KEY("Artist") REFERENCES "tblArtist"("Artist_ID") ON DELETE CASCADE,
+	FOREIGN KEY("Model") REFERENCES "tblModel"("Model_ID") ON DELETE SET NULL
+);
+CREATE INDEX IF NOT EXISTS "idxFileArtist" ON "tblFile" ("Artist");
+CREATE INDEX IF NOT EXISTS "idxFileModel" ON "tblFile" ("Model");
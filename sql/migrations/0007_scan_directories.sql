@@ -0,0 +1,21 @@
+-- Version 7: the directories under the artist folders, with what they
+-- looked like when they were last scanned, so a rescan only has to
+-- read the directories that changed
+CREATE TABLE IF NOT EXISTS "tblDirectory" (
+	"Directory_ID"	INTEGER UNIQUE,
+	"Directory_Path"	TEXT NOT NULL UNIQUE,
+	"Artist"	INTEGER NOT NULL,
+	"Parent"	INTEGER,
+	"Directory_Modified"	INTEGER NOT NULL,
+	"Directory_Inode"	INTEGER NOT NULL,
+	PRIMARY KEY("Directory_ID" AUTOINCREMENT),
+	FOREIGN KEY("Artist") REFERENCES "tblArtist"("Artist_ID") ON DELETE CASCADE,
+	FOREIGN KEY("Parent") REFERENCES "tblDirectory"("Directory_ID") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idxDirectoryArtist" ON "tblDirectory" ("Artist");
+CREATE INDEX IF NOT EXISTS "idxDirectoryParent" ON "tblDirectory" ("Parent");
+-- Files found before directories were recorded are found again by the
+-- next scan
+DELETE FROM "tblFile";
+ALTER TABLE "tblFile" ADD COLUMN "Directory" INTEGER REFERENCES "tblDirectory"("Directory_ID") ON DELETE CASCADE;
+CREATE INDEX IF NOT EXISTS "idxFileDirectory" ON "tblFile" ("Directory");
@@ -0,0 +1,14 @@
+-- Version 8: content hashes of the model files, used to find files that
+-- are the same under different artist folders
+CREATE TABLE IF NOT EXISTS "tblHash" (
+	"File"	INTEGER NOT NULL UNIQUE,
+	"Hash_Size"	INTEGER NOT NULL,
+	"Hash_Modified"	INTEGER NOT NULL,
+	"Hash_Partial"	TEXT NOT NULL,
+	"Hash_Full"	TEXT,
+	PRIMARY KEY("File"),
+	FOREIGN KEY("File") REFERENCES "tblFile"("File_ID") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idxHashPartial" ON "tblHash" ("Hash_Size", "Hash_Partial");
+CREATE INDEX IF NOT EXISTS "idxHashFull" ON "tblHash" ("Hash_Full");
+CREATE INDEX IF NOT EXISTS "idxFileSize" ON "tblFile" ("File_Size");
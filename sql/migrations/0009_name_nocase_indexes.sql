@@ -0,0 +1,3 @@
+-- Version 9: artist and source names are searched without case
+CREATE INDEX IF NOT EXISTS "idxArtistNameNoCase" ON "tblArtist" ("Artist_Name" COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS "idxSourceNameNoCase" ON "tblSource" ("Source_Name" COLLATE NOCASE);
@@ -1,3 +0,0 @@
-CREATE TABLE tblSchema (label TEXT NOT NULL, version INTEGER NOT NULL);
-
-INSERT INTO tblSchema (label, version) VALUES ("current", 2);
@@ -0,0 +1,155 @@
+import pathlib
+import unittest
+
+import jbs.database.database_cache as dbcache
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+class CountingConnection:
+    """Wraps a connection and counts the statements run through it."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.queries = 0
+
+    def cursor(self):
+        wrapper = self
+
+        class Cursor:
+            def __init__(self):
+                self.cursor = wrapper.connection.cursor()
+
+            def execute(self, *args):
+                wrapper.queries += 1
+                return self.cursor.execute(*args)
+
+            def __getattr__(self, name):
+                return getattr(self.cursor, name)
+
+        return Cursor()
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+class TestLookupCache(unittest.TestCase):
+    def setUp(self):
+        self.connection = db.connect_database(database=':memory:')
+        db.modify_database_schema(connection=self.connection, sql_file=schema)
+        self.cache = dbcache.LookupCache()
+        self.artist_id = dbqueries.add_artist(
+            connection=self.connection,
+            artist=inv.Artist(0, 'test_artist', '', '', ''),
+            cache=self.cache
+            )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'test_source', ''),
+            cache=self.cache
+            )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_repeated_lookups_are_hits(self):
+        counting = CountingConnection(self.connection)
+        for _ in range(5):
+            artist_id = dbqueries.get_artist_id(
+                connection=counting,
+                artist_name='test_artist',
+                cache=self.cache
+                )
+        self.assertEqual(artist_id, self.artist_id)
+        # The first lookup reads the table, the rest are cached
+        self.assertEqual(counting.queries, 1)
+        self.assertEqual(self.cache.artists.stats()['hits'], 4)
+
+    def test_both_directions(self):
+        self.assertEqual(
+            self.cache.artists.get_name(
+                connection=self.connection,
+                row_id=self.artist_id
+                ),
+            'test_artist'
+            )
+        self.assertEqual(
+            self.cache.artists.get_id(
+                connection=self.connection,
+                name='test_artist'
+                ),
+            self.artist_id
+            )
+
+    def test_add_updates_loaded_cache(self):
+        self.cache.artists.get_ids(connection=self.connection)
+        new_id = dbqueries.add_artist(
+            connection=self.connection,
+            artist=inv.Artist(0, 'new_artist', '', '', ''),
+            cache=self.cache
+            )
+        counting = CountingConnection(self.connection)
+        self.assertEqual(
+            self.cache.artists.get_id(connection=counting, name='new_artist'),
+            new_id
+            )
+        self.assertEqual(counting.queries, 0)
+
+    def test_delete_removes_name(self):
+        dbqueries.delete_artist(
+            connection=self.connection,
+            artist_id=self.artist_id,
+            cache=self.cache
+            )
+        self.assertEqual(
+            dbqueries.get_artist_id(
+                connection=self.connection,
+                artist_name='test_artist',
+                cache=self.cache
+                ),
+            0
+            )
+
+    def test_missing_name_is_looked_up(self):
+        self.cache.sources.get_ids(connection=self.connection)
+        # Added without the cache, e.g. by another program
+        source_id = dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'other_source', '')
+            )
+        self.assertEqual(
+            self.cache.sources.get_id(
+                connection=self.connection,
+                name='other_source'
+                ),
+            source_id
+            )
+        self.assertEqual(self.cache.sources.stats()['misses'], 2)
+
+    def test_bulk_models_use_cache(self):
+        self.cache.sources.get_ids(connection=self.connection)
+        dbqueries.add_artists_bulk(
+            connection=self.connection,
+            artists=[inv.Artist(0, 'bulk_artist', '', '', '')],
+            cache=self.cache
+            )
+        self.assertFalse(self.cache.artists.loaded)
+        counting = CountingConnection(self.connection)
+        added = dbqueries.add_models_bulk(
+            connection=counting,
+            models=[inv.Model(0, 'test_name', '', 'bulk_artist', 'test_source',
+                '', False, '', '', False)] * 3,
+            cache=self.cache
+            )
+        self.assertEqual(added, 3)
+        # Only tblArtist is read again, tblSource was already cached
+        self.assertEqual(counting.queries, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import jbs.database.database_connections as dbconnections
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+class TestSqliteSettings(unittest.TestCase):
+    def test_defaults(self):
+        settings = db.get_sqlite_settings(settings={'synchronous': 'full'})
+        self.assertEqual(settings['synchronous'], 'FULL')
+        self.assertEqual(settings['journal_mode'], 'WAL')
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            db.get_sqlite_settings(settings={'journal_mode': 'WAL; DROP'})
+        with self.assertRaises(ValueError):
+            db.get_sqlite_settings(settings={'cache_size': '-2000'})
+        with self.assertRaises(ValueError):
+            db.get_sqlite_settings(settings={'page_size': 4096})
+
+
+class TestConnectionManager(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = pathlib.Path(self.directory.name).joinpath('test.db')
+        self.connections = dbconnections.ConnectionManager(
+            database=self.database,
+            settings={'busy_timeout': 100},
+            pool_size=2
+            )
+        with self.connections.writer() as connection:
+            db.modify_database_schema(connection=connection, sql_file=schema)
+
+    def tearDown(self):
+        self.connections.close()
+        self.directory.cleanup()
+
+    def test_wal_and_pragmas(self):
+        with self.connections.writer() as connection:
+            cur = connection.cursor()
+            self.assertEqual(
+                cur.execute('PRAGMA journal_mode;').fetchone()[0],
+                'wal'
+                )
+            self.assertEqual(cur.execute('PRAGMA busy_timeout;').fetchone()[0], 100)
+            self.assertEqual(cur.execute('PRAGMA temp_store;').fetchone()[0], 2)
+
+    def test_reader_is_read_only(self):
+        with self.connections.reader() as connection:
+            with self.assertRaises(sqlite3.OperationalError):
+                connection.execute(
+                    'INSERT INTO tblSource (Source_Name) VALUES ("test");'
+                    )
+
+    def test_pool_reuses_connections(self):
+        with self.connections.reader() as first:
+            with self.connections.reader() as second:
+                self.assertIsNot(first, second)
+        with self.connections.reader() as third:
+            self.assertIn(third, (first, second))
+        self.assertEqual(self.connections.opened, 2)
+
+    def test_read_during_write(self):
+        # The writer holds an open transaction while a reader on
+        # another thread still sees the last committed data.
+        results = []
+        with self.connections.writer() as connection:
+            connection.execute(
+                'INSERT INTO tblArtist (Artist_Name) VALUES ("test_artist");'
+                )
+
+            def read():
+                with self.connections.reader() as reader:
+                    results.append(dbqueries.get_all_artists(connection=reader))
+
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join(timeout=5)
+            connection.commit()
+
+        self.assertEqual(results, [[]])
+        with self.connections.reader() as reader:
+            artists = dbqueries.get_all_artists(connection=reader)
+        self.assertEqual(artists[0].name, 'test_artist')
+
+    def test_in_memory_readers_use_writer(self):
+        connections = dbconnections.ConnectionManager(database=':memory:')
+        with connections.reader() as connection:
+            self.assertIs(connection, connections.write_connection)
+        connections.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import jbs.database.database_connections as dbconnections
+import jbs.database.database_executor as dbexecutor
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+def slow_query(connection):
+    cur = connection.cursor()
+    cur.execute(
+        'WITH RECURSIVE counter(x) AS '
+        '(SELECT 1 UNION ALL SELECT x + 1 FROM counter) '
+        'SELECT max(x) FROM counter;'
+        )
+    return cur.fetchone()
+
+
+def fail(connection):
+    raise ValueError("test_error")
+
+
+class TestDatabaseExecutor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = pathlib.Path(self.directory.name).joinpath('test.db')
+        connection = db.connect_database(database=self.database)
+        db.modify_database_schema(connection=connection, sql_file=schema)
+        dbqueries.add_artist(
+            connection=connection,
+            artist=inv.Artist(0, 'test_artist', '', '', '')
+            )
+        db.close_database(connection=connection)
+        self.connections = dbconnections.ConnectionManager(
+            database=self.database
+            )
+        self.executor = dbexecutor.DatabaseExecutor(
+            connections=self.connections
+            )
+
+    def tearDown(self):
+        self.executor.shutdown(timeout=5)
+        self.connections.close()
+        self.directory.cleanup()
+
+    def wait(self, job):
+        deadline = time.monotonic() + 5
+        while not job.done:
+            self.assertLess(time.monotonic(), deadline)
+            self.executor.process_results()
+            time.sleep(0.01)
+
+    def test_callback(self):
+        results = []
+        job = self.executor.submit(
+            func=dbqueries.get_all_artists,
+            callback=results.append,
+            read_only=True
+            )
+        self.wait(job)
+        self.assertEqual(results[0][0].name, 'test_artist')
+        self.assertEqual(self.executor.pending(), 0)
+
+    def test_error_callback(self):
+        errors = []
+        job = self.executor.submit(func=fail, error_callback=errors.append)
+        self.wait(job)
+        self.assertIsInstance(errors[0], ValueError)
+
+    def test_error_without_callback(self):
+        self.executor.submit(func=fail)
+        time.sleep(0.1)
+        with self.assertRaises(ValueError):
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                self.executor.process_results()
+                time.sleep(0.01)
+
+    def test_cancel_running_query(self):
+        results = []
+        job = self.executor.submit(
+            func=slow_query,
+            callback=results.append,
+            read_only=True
+            )
+        while job.connection is None:
+            time.sleep(0.01)
+        self.executor.cancel(job)
+        self.wait(job)
+        self.assertEqual(results, [])
+        self.assertIsInstance(job.error, sqlite3.OperationalError)
+
+    def test_cancel_while_waiting_for_connection(self):
+        calls = []
+        with self.connections.write_lock:
+            job = self.executor.submit(
+                func=lambda connection: calls.append(connection)
+                )
+            # The writer has taken the job and waits for the connection
+            while not self.executor.write_requests.empty():
+                time.sleep(0.01)
+            self.executor.cancel(job)
+        self.wait(job)
+        self.assertEqual(calls, [])
+
+    def test_read_while_writing(self):
+        # A long write doesn't hold up read only jobs.
+        results = []
+        write = self.executor.submit(func=slow_query)
+        while write.connection is None:
+            time.sleep(0.01)
+        read = self.executor.submit(
+            func=dbqueries.get_all_artists,
+            callback=results.append,
+            read_only=True
+            )
+        self.wait(read)
+        self.assertFalse(write.done)
+        self.assertEqual(len(results[0]), 1)
+        self.executor.cancel(write)
+        self.wait(write)
+
+    def test_background_leaves_readers_free(self):
+        # Long jobs without a connection don't take a read only thread.
+        started = threading.Event()
+        release = threading.Event()
+
+        def long_job():
+            started.set()
+            release.wait(timeout=5)
+            return 'walked'
+
+        walked = []
+        jobs = [
+            self.executor.submit_background(func=long_job, callback=walked.append)
+            for _ in range(dbexecutor.READ_WORKERS)
+            ]
+        started.wait(timeout=5)
+        results = []
+        read = self.executor.submit(
+            func=dbqueries.get_all_artists,
+            callback=results.append,
+            read_only=True
+            )
+        self.wait(read)
+        self.assertEqual(len(results[0]), 1)
+        self.assertEqual(walked, [])
+        release.set()
+        for job in jobs:
+            self.wait(job)
+        self.assertEqual(walked, ['walked'] * dbexecutor.READ_WORKERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
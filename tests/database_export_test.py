@@ -0,0 +1,101 @@
+import csv
+import json
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+
+import jbs.database.database_export as dbexport
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+class TestExportTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+        self.connection = db.connect_database(database=':memory:')
+        db.modify_database_schema(connection=self.connection, sql_file=schema)
+        dbqueries.add_artist(
+            connection=self.connection,
+            artist=inv.Artist(0, 'test_artist', '', '', 'test_folder')
+            )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'test_source', '')
+            )
+        dbqueries.add_models_bulk(
+            connection=self.connection,
+            models=(
+                inv.Model(0, f'model_{i}', 'test_set', 'test_artist',
+                    'test_source', "it's", True, 'stl', '', False)
+                for i in range(5)
+                )
+            )
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_csv(self):
+        export_file = self.path.joinpath('models.csv')
+        progress = []
+        written = dbexport.export_table(
+            connection=self.connection,
+            record_type='model',
+            export_file=export_file,
+            batch_size=2,
+            progress=progress.append
+            )
+        with open(file=export_file, newline='') as exported:
+            rows = list(csv.reader(exported))
+        self.assertEqual(written, 5)
+        self.assertEqual(tuple(rows[0]), dbexport.EXPORT_COLUMNS['model'])
+        self.assertEqual(rows[1][3], 'test_artist')
+        self.assertEqual(progress, [2, 4, 5])
+
+    def test_jsonl_is_typed(self):
+        export_file = self.path.joinpath('models.jsonl')
+        dbexport.export_table(
+            connection=self.connection,
+            record_type='model',
+            export_file=export_file
+            )
+        with open(file=export_file) as exported:
+            first = json.loads(exported.readline())
+        self.assertIs(first['supports'], True)
+        self.assertIs(first['printed'], False)
+        self.assertEqual(first['id'], 1)
+
+    def test_sql_dump_loads(self):
+        export_file = self.path.joinpath('artists.sql')
+        dbexport.export_table(
+            connection=self.connection,
+            record_type='artist',
+            export_file=export_file
+            )
+        copy = sqlite3.connect(':memory:')
+        copy.executescript(export_file.read_text())
+        self.assertEqual(
+            copy.execute('SELECT Artist_Name FROM tblArtist;').fetchall(),
+            [('test_artist',)]
+            )
+        copy.close()
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            dbexport.export_table(
+                connection=self.connection,
+                record_type='model',
+                export_file=self.path.joinpath('models.xlsx')
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
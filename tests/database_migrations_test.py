@@ -0,0 +1,321 @@
+import logging
+import pathlib
+import tempfile
+import unittest
+
+import jbs.database.database_migrations as dbmigrations
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+sql = pathlib.Path(__file__).resolve().parent.parent.joinpath('sql')
+schema = sql.joinpath('empty_database.sql')
+migrations = sql.joinpath('migrations')
+
+
+def schema_objects(connection):
+    return connection.execute(
+        "SELECT type, name, tbl_name FROM sqlite_master "
+        "WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name;"
+        ).fetchall()
+
+
+class TestMigrate(unittest.TestCase):
+    def setUp(self):
+        self.connection = db.connect_database(database=':memory:')
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_new_database_matches_empty_schema(self):
+        applied = dbmigrations.migrate(
+            connection=self.connection,
+            directory=migrations
+            )
+        self.assertEqual(
+            [migration.version for migration in applied],
+            list(range(1, dbmigrations.latest_version(directory=migrations) + 1))
+            )
+
+        expected = db.connect_database(database=':memory:')
+        expected.executescript(schema.read_text())
+        self.assertEqual(schema_objects(self.connection), schema_objects(expected))
+        self.assertEqual(
+            dbmigrations.get_schema_version(connection=self.connection),
+            dbmigrations.get_schema_version(connection=expected)
+            )
+        expected.close()
+
+    def test_existing_data_is_kept(self):
+        dbmigrations.migrate(
+            connection=self.connection,
+            directory=migrations,
+            target=2
+            )
+        self.connection.execute(
+            "INSERT INTO tblArtist (Artist_Name) VALUES ('Dragon Forge');"
+            )
+        self.connection.execute(
+            "INSERT INTO tblSource (Source_Name) VALUES ('Kickstarter');"
+            )
+        self.connection.execute(
+            "INSERT INTO tblModel (Model_Name, Artist, Source) "
+            "VALUES ('Red Dragon', 1, 1);"
+            )
+        self.connection.commit()
+
+        dbmigrations.migrate(connection=self.connection, directory=migrations)
+        self.assertEqual(
+            [model.model for model in dbqueries.full_text_search_models(
+                connection=self.connection,
+                search_text='dragon'
+                )],
+            ['Red Dragon']
+            )
+        self.assertEqual(
+            self.connection.execute('PRAGMA foreign_keys;').fetchone()[0],
+            1
+            )
+
+    def test_database_without_schema_table(self):
+        dbmigrations.migrate(
+            connection=self.connection,
+            directory=migrations,
+            target=1
+            )
+        self.assertEqual(
+            dbmigrations.get_schema_version(connection=self.connection),
+            1
+            )
+        applied = dbmigrations.migrate(
+            connection=self.connection,
+            directory=migrations
+            )
+        self.assertEqual(applied[0].version, 2)
+
+    def test_dry_run_changes_nothing(self):
+        with self.assertLogs(dbmigrations.logger, level=logging.INFO):
+            pending = dbmigrations.migrate(
+                connection=self.connection,
+                directory=migrations,
+                dry_run=True
+                )
+        self.assertTrue(pending)
+        self.assertEqual(schema_objects(self.connection), [])
+
+    def test_is_current(self):
+        self.assertFalse(dbmigrations.is_current(
+            connection=self.connection,
+            directory=migrations
+            ))
+        dbmigrations.migrate(connection=self.connection, directory=migrations)
+        self.assertTrue(dbmigrations.is_current(
+            connection=self.connection,
+            directory=migrations
+            ))
+        self.assertEqual(
+            dbmigrations.migrate(connection=self.connection, directory=migrations),
+            []
+            )
+
+
+class TestFailedMigration(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.migrations = pathlib.Path(self.directory.name)
+        self.migrations.joinpath('0001_tables.sql').write_text(
+            'CREATE TABLE "tblSchema" ("label" TEXT, "version" INTEGER);\n'
+            'CREATE TABLE "tblOne" ("id" INTEGER);\n'
+            )
+        self.migrations.joinpath('0002_broken.sql').write_text(
+            '-- The second statement fails\n'
+            'CREATE TABLE "tblTwo" ("id" INTEGER);\n'
+            'INSERT INTO "tblMissing" VALUES (1);\n'
+            )
+        self.connection = db.connect_database(database=':memory:')
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_rolled_back_and_resumed(self):
+        with self.assertRaises(SystemExit):
+            with self.assertLogs(dbmigrations.logger, level=logging.ERROR):
+                dbmigrations.migrate(
+                    connection=self.connection,
+                    directory=self.migrations
+                    )
+        self.assertEqual(
+            dbmigrations.get_schema_version(connection=self.connection),
+            1
+            )
+        self.assertNotIn(
+            ('table', 'tblTwo', 'tblTwo'),
+            schema_objects(self.connection)
+            )
+
+        self.migrations.joinpath('0002_broken.sql').write_text(
+            'CREATE TABLE "tblTwo" ("id" INTEGER);\n'
+            )
+        applied = dbmigrations.migrate(
+            connection=self.connection,
+            directory=self.migrations
+            )
+        self.assertEqual([migration.version for migration in applied], [2])
+
+    def test_duplicate_versions(self):
+        self.migrations.joinpath('0002_other.sql').write_text('')
+        with self.assertRaises(ValueError):
+            dbmigrations.find_migrations(directory=self.migrations)
+
+
+class TestRebuild(unittest.TestCase):
+    def setUp(self):
+        self.connection = db.connect_database(database=':memory:')
+        dbmigrations.migrate(
+            connection=self.connection,
+            directory=migrations,
+            target=3
+            )
+        self.connection.execute(
+            "INSERT INTO tblArtist (Artist_Name) VALUES ('Dragon Forge');"
+            )
+        self.connection.execute(
+            "INSERT INTO tblSource (Source_Name) VALUES ('Kickstarter');"
+            )
+        self.connection.executemany(
+            "INSERT INTO tblModel (Model_Name, Artist, Source) VALUES (?, 1, 1);",
+            [(f'Model {number}',) for number in range(25)]
+            )
+        self.connection.commit()
+        self.progress = []
+
+    def tearDown(self):
+        self.connection.close()
+
+    def migrate(self, stop=None):
+        return dbmigrations.migrate(
+            connection=self.connection,
+            directory=migrations,
+            chunk_size=10,
+            progress=lambda migration, copied, total: self.progress.append(
+                (migration.version, copied, total)
+                ),
+            stop=stop
+            )
+
+    def model_names(self):
+        return [row[0] for row in self.connection.execute(
+            'SELECT Model_Name FROM tblModel ORDER BY Model_ID;'
+            )]
+
+    def test_copied_in_chunks(self):
+        applied = self.migrate()
+        self.assertEqual(
+            [migration.version for migration in applied],
+            list(range(4, dbmigrations.latest_version(directory=migrations) + 1))
+            )
+        self.assertEqual(self.progress, [(4, 10, 25), (4, 20, 25), (4, 25, 25)])
+        self.assertEqual(len(self.model_names()), 25)
+
+        expected = db.connect_database(database=':memory:')
+        expected.executescript(schema.read_text())
+        self.assertEqual(schema_objects(self.connection), schema_objects(expected))
+        expected.close()
+
+    def test_paused_and_resumed(self):
+        applied = self.migrate(stop=lambda: len(self.progress) == 1)
+        self.assertEqual(applied, [])
+        self.assertEqual(
+            dbmigrations.get_schema_version(connection=self.connection),
+            3
+            )
+
+        # The program keeps using the old table while it is paused
+        self.connection.execute(
+            "UPDATE tblModel SET Model_Name = 'Red Dragon' WHERE Model_ID = 1;"
+            )
+        self.connection.execute('DELETE FROM tblModel WHERE Model_ID IN (2, 20);')
+        self.connection.execute(
+            "INSERT INTO tblModel (Model_Name, Artist, Source) "
+            "VALUES ('Goblin', 1, 1);"
+            )
+        self.connection.commit()
+
+        applied = self.migrate()
+        self.assertEqual(
+            [migration.version for migration in applied],
+            list(range(4, dbmigrations.latest_version(directory=migrations) + 1))
+            )
+        names = self.model_names()
+        self.assertEqual(len(names), 24)
+        self.assertEqual(names[0], 'Red Dragon')
+        self.assertNotIn('Model 1', names)
+        self.assertNotIn('Model 19', names)
+        self.assertEqual(names[-1], 'Goblin')
+        self.assertEqual(
+            [model.model for model in dbqueries.full_text_search_models(
+                connection=self.connection,
+                search_text='goblin'
+                )],
+            ['Goblin']
+            )
+        self.assertNotIn(
+            dbmigrations.REBUILD_STATE_TABLE,
+            [row[1] for row in schema_objects(self.connection)]
+            )
+
+    def test_deleted_ids_not_reused(self):
+        self.connection.execute('DELETE FROM tblModel WHERE Model_ID = 25;')
+        self.connection.commit()
+        self.migrate()
+        self.connection.execute(
+            "INSERT INTO tblModel (Model_Name, Artist, Source) "
+            "VALUES ('Goblin', 1, 1);"
+            )
+        self.assertEqual(
+            self.connection.execute('SELECT MAX(Model_ID) FROM tblModel;').fetchone()[0],
+            26
+            )
+
+    def test_orphaned_models_are_repaired(self):
+        # Older versions saved a model without an artist as artist 0
+        self.connection.execute(
+            "INSERT INTO tblModel (Model_Name, Artist, Source) "
+            "VALUES ('Goblin', 0, 7);"
+            )
+        self.connection.commit()
+        with self.assertLogs(dbmigrations.logger, level=logging.WARNING) as logs:
+            self.migrate()
+        self.assertIn('tblModel rows 26', '\n'.join(logs.output))
+        self.assertEqual(
+            dbmigrations.get_schema_version(connection=self.connection),
+            dbmigrations.latest_version(directory=migrations)
+            )
+        self.assertEqual(
+            self.connection.execute('PRAGMA foreign_key_check;').fetchall(),
+            []
+            )
+        models = dbqueries.full_text_search_models(
+            connection=self.connection,
+            search_text='goblin'
+            )
+        self.assertEqual(
+            [(model.model, model.artist, model.source) for model in models],
+            [('Goblin', 'Unknown', 'Unknown')]
+            )
+        self.assertEqual(len(self.model_names()), 26)
+
+
+class TestStatements(unittest.TestCase):
+    def test_triggers_stay_together(self):
+        migration = dbmigrations.find_migrations(directory=migrations)[2]
+        statements = list(migration.statements())
+        trigger = [statement for statement in statements
+            if 'TRIGGER IF NOT EXISTS "trgModelUpdate"' in statement]
+        self.assertEqual(len(trigger), 1)
+        self.assertTrue(trigger[0].endswith('END;'))
+
+
+if __name__ == '__main__':
+    unittest.main()
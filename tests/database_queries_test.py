@@ -0,0 +1,465 @@
+import pathlib
+import unittest
+
+import jbs.database.database_cache as dbcache
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+def create_database():
+    connection = db.connect_database(database=':memory:')
+    with open(file=schema, mode='r') as sql:
+        connection.executescript(sql.read())
+    return connection
+
+
+class TestWriteQueries(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        self.artist_id = dbqueries.add_artist(
+            connection=self.connection,
+            artist=inv.Artist(0, 'test_artist', 'test_website', 'test_email',
+                'test_folder')
+            )
+        self.source_id = dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'test_source', 'test_website')
+            )
+        self.model_id = dbqueries.add_model(
+            connection=self.connection,
+            model=inv.Model(0, 'test_name', 'test_set', 'test_artist',
+                'test_source', 'test_source_note', True, 'test_format', '',
+                False)
+            )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_add_returns_ids(self):
+        self.assertEqual(
+            (self.artist_id, self.source_id, self.model_id),
+            (1, 1, 1)
+            )
+
+    def test_get_model(self):
+        model = dbqueries.get_model(
+            connection=self.connection,
+            model_id=self.model_id
+            )
+        self.assertEqual(model.artist, 'test_artist')
+        self.assertEqual(model.folder, 'test_folder')
+
+    def test_get_missing_source(self):
+        self.assertIsNone(
+            dbqueries.get_source(connection=self.connection, source_id=99)
+            )
+
+    def test_delete_artist_with_models_is_rejected(self):
+        self.assertIsNone(
+            dbqueries.delete_artist(
+                connection=self.connection,
+                artist_id=self.artist_id
+                )
+            )
+        self.assertIsNotNone(
+            dbqueries.get_artist(
+                connection=self.connection,
+                artist_id=self.artist_id
+                )
+            )
+
+    def test_add_model_with_unknown_artist(self):
+        self.assertIsNone(
+            dbqueries.add_model(
+                connection=self.connection,
+                model=inv.Model(0, 'test_name', '', 'missing', 'test_source',
+                    '', False, '', '', False)
+                )
+            )
+
+    def test_delete_returns_id(self):
+        self.assertEqual(
+            dbqueries.delete_model(
+                connection=self.connection,
+                model_id=self.model_id
+                ),
+            self.model_id
+            )
+        self.assertIsNone(
+            dbqueries.get_model(
+                connection=self.connection,
+                model_id=self.model_id
+                )
+            )
+
+
+class TestFullTextSearch(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        for name in ('Dragon Forge', 'Wyvern Works'):
+            dbqueries.add_artist(
+                connection=self.connection,
+                artist=inv.Artist(0, name, '', '', '')
+                )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'Kickstarter', '')
+            )
+        for name, set_name, artist in (
+            ('Red Dragon', 'Wyrms', 'Wyvern Works'),
+            ('Knight', 'Dragon Slayers', 'Dragon Forge'),
+            ('Goblin', 'Caves', 'Wyvern Works')
+            ):
+            dbqueries.add_model(
+                connection=self.connection,
+                model=inv.Model(0, name, set_name, artist, 'Kickstarter', '',
+                    False, 'stl', '', False)
+                )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_build_match_query_quotes_terms(self):
+        self.assertEqual(
+            dbqueries.build_match_query('red "dra'),
+            '"red"* "dra"*'
+            )
+
+    def test_prefix_match(self):
+        results = dbqueries.full_text_search_models(
+            connection=self.connection,
+            search_text='gob'
+            )
+        self.assertEqual([model.model for model in results], ['Goblin'])
+
+    def test_multiple_terms(self):
+        results = dbqueries.full_text_search_models(
+            connection=self.connection,
+            search_text='drag wyv'
+            )
+        self.assertEqual([model.model for model in results], ['Red Dragon'])
+
+    def test_ranked_by_name(self):
+        results = dbqueries.full_text_search_models(
+            connection=self.connection,
+            search_text='dragon'
+            )
+        self.assertEqual(results[0].model, 'Red Dragon')
+        self.assertEqual(len(results), 2)
+
+    def test_artist_rename_is_indexed(self):
+        self.connection.execute(
+            'UPDATE tblArtist SET Artist_Name = "Ogre Den" '
+            'WHERE Artist_Name = "Dragon Forge";'
+            )
+        models = dbqueries.full_text_search_models(
+            connection=self.connection,
+            search_text='ogre'
+            )
+        artists = dbqueries.full_text_search_artists(
+            connection=self.connection,
+            search_text='forge'
+            )
+        self.assertEqual([model.model for model in models], ['Knight'])
+        self.assertEqual(artists, [])
+
+    def test_deleted_model_is_removed(self):
+        dbqueries.delete_model(connection=self.connection, model_id=3)
+        results = dbqueries.full_text_search_models(
+            connection=self.connection,
+            search_text='goblin'
+            )
+        self.assertEqual(results, [])
+
+    def test_source_search(self):
+        results = dbqueries.full_text_search_sources(
+            connection=self.connection,
+            search_text='kick'
+            )
+        self.assertEqual([source.name for source in results], ['Kickstarter'])
+
+
+class TestBulkInsert(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        dbqueries.add_artists_bulk(
+            connection=self.connection,
+            artists=(inv.Artist(0, f'artist_{i}', '', '', '') for i in range(3)),
+            chunk_size=2
+            )
+        dbqueries.add_sources_bulk(
+            connection=self.connection,
+            sources=[inv.Source(0, 'test_source', '')]
+            )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_artists_added(self):
+        self.assertEqual(
+            len(dbqueries.get_all_artists(connection=self.connection)),
+            3
+            )
+
+    def test_models_added_across_chunks(self):
+        models = (
+            inv.Model(0, f'model_{i}', '', f'artist_{i % 3}', 'test_source',
+                '', i % 2 == 0, 'stl', '', 1)
+            for i in range(25)
+            )
+        added = dbqueries.add_models_bulk(
+            connection=self.connection,
+            models=models,
+            chunk_size=7
+            )
+        results = dbqueries.get_all_models(connection=self.connection)
+        self.assertEqual(added, 25)
+        self.assertEqual(len(results), 25)
+        self.assertTrue(results[0].supports)
+        self.assertTrue(results[0].printed)
+
+    def test_unknown_artist_is_skipped(self):
+        added = dbqueries.add_models_bulk(
+            connection=self.connection,
+            models=[
+                inv.Model(0, 'known', '', 'artist_0', 'test_source', '',
+                    False, '', '', False),
+                inv.Model(0, 'unknown', '', 'missing', 'test_source', '',
+                    False, '', '', False)
+                ]
+            )
+        self.assertEqual(added, 1)
+
+
+class TestBulkDelete(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        dbqueries.add_artists_bulk(
+            connection=self.connection,
+            artists=(inv.Artist(0, f'artist_{i}', '', '', '') for i in range(3))
+            )
+        dbqueries.add_sources_bulk(
+            connection=self.connection,
+            sources=[inv.Source(0, 'used_source', ''), inv.Source(0, 'spare', '')]
+            )
+        dbqueries.add_models_bulk(
+            connection=self.connection,
+            models=(
+                inv.Model(0, f'model_{i}', '', 'artist_0', 'used_source', '',
+                    False, 'stl', '', False)
+                for i in range(5)
+                )
+            )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_delete_models(self):
+        outcome = dbqueries.delete_models_bulk(
+            connection=self.connection,
+            model_ids=[1, '2', 99]
+            )
+        self.assertEqual(
+            outcome,
+            {1: dbqueries.DELETED, 2: dbqueries.DELETED, 99: dbqueries.NOT_FOUND}
+            )
+        self.assertEqual(
+            [model.id for model in dbqueries.get_all_models(connection=self.connection)],
+            [3, 4, 5]
+            )
+        self.assertEqual(
+            dbqueries.full_text_search_models(
+                connection=self.connection,
+                search_text='model_1'
+                ),
+            []
+            )
+
+    def test_delete_artists_checks_models(self):
+        cache = dbcache.LookupCache()
+        cache.artists.get_ids(connection=self.connection)
+        outcome = dbqueries.delete_artists_bulk(
+            connection=self.connection,
+            artist_ids=[1, 2, 3, 4],
+            cache=cache
+            )
+        self.assertEqual(outcome, {
+            1: dbqueries.IN_USE,
+            2: dbqueries.DELETED,
+            3: dbqueries.DELETED,
+            4: dbqueries.NOT_FOUND
+            })
+        self.assertEqual(
+            [artist.name for artist in dbqueries.get_all_artists(connection=self.connection)],
+            ['artist_0']
+            )
+        self.assertEqual(cache.artists.get_ids(connection=self.connection), {'artist_0': 1})
+
+    def test_delete_sources_checks_models(self):
+        outcome = dbqueries.delete_sources_bulk(
+            connection=self.connection,
+            source_ids=[1, 2]
+            )
+        self.assertEqual(outcome, {1: dbqueries.IN_USE, 2: dbqueries.DELETED})
+
+    def test_empty(self):
+        self.assertEqual(
+            dbqueries.delete_models_bulk(connection=self.connection, model_ids=[]),
+            {}
+            )
+
+
+class TestRowFactory(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        dbqueries.add_artists_bulk(
+            connection=self.connection,
+            artists=[inv.Artist(0, 'artist_0', '', '', ''),
+                inv.Artist(0, 'artist_1', '', '', '')]
+            )
+        dbqueries.add_sources_bulk(
+            connection=self.connection,
+            sources=[inv.Source(0, 'test_source', '')]
+            )
+        dbqueries.add_models_bulk(
+            connection=self.connection,
+            models=(
+                inv.Model(0, f'model_{i}', '', f'artist_{i % 2}',
+                    'test_source', '', i % 2 == 0, 'stl', '', False)
+                for i in range(10)
+                )
+            )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_models_are_objects(self):
+        model = dbqueries.get_all_models(connection=self.connection)[0]
+        self.assertIsInstance(model, inv.Model)
+        self.assertIs(model.supports, True)
+        self.assertIs(model.printed, False)
+
+    def test_iter_models_in_batches(self):
+        models = dbqueries.iter_models(connection=self.connection, batch_size=3)
+        self.assertNotIsInstance(models, list)
+        self.assertEqual(
+            [model.model for model in models],
+            [f'model_{i}' for i in range(10)]
+            )
+
+    def test_iter_search_model(self):
+        models = dbqueries.iter_search_model(
+            connection=self.connection,
+            field='Model_Name',
+            search_text='model_1',
+            batch_size=1
+            )
+        self.assertEqual([model.model for model in models], ['model_1'])
+
+    def test_iter_associated_models(self):
+        models = list(dbqueries.iter_associated_models(
+            connection=self.connection,
+            field='Artist',
+            search_id=2,
+            batch_size=2
+            ))
+        self.assertEqual(len(models), 5)
+        self.assertTrue(all(model.artist == 'artist_1' for model in models))
+
+    def test_connection_row_factory_is_unchanged(self):
+        dbqueries.get_all_artists(connection=self.connection)
+        row = self.connection.execute('SELECT Artist_Name FROM tblArtist;').fetchone()
+        self.assertEqual(row, ('artist_0',))
+
+
+class TestModelsPage(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        dbqueries.add_artists_bulk(
+            connection=self.connection,
+            artists=[inv.Artist(0, 'artist_0', '', '', ''),
+                inv.Artist(0, 'artist_1', '', '', '')]
+            )
+        dbqueries.add_sources_bulk(
+            connection=self.connection,
+            sources=[inv.Source(0, 'test_source', '')]
+            )
+        # Duplicate names and a missing set check the tie breaking
+        dbqueries.add_models_bulk(
+            connection=self.connection,
+            models=(
+                inv.Model(0, f'Model_{i % 4}', None if i == 3 else f'set_{i}',
+                    f'artist_{i % 2}', 'test_source', '', False, 'stl', '',
+                    False)
+                for i in range(11)
+                )
+            )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def read_pages(self, **kwargs):
+        models = []
+        pages = 0
+        token = None
+        while True:
+            page, token = dbqueries.get_models_page(
+                connection=self.connection,
+                after=token,
+                limit=3,
+                **kwargs
+                )
+            models.extend(page)
+            pages += 1
+            if token is None:
+                return models, pages
+
+    def test_pages_by_id(self):
+        models, pages = self.read_pages()
+        self.assertEqual([model.id for model in models], list(range(1, 12)))
+        self.assertEqual(pages, 4)
+
+    def test_pages_by_name(self):
+        models, _ = self.read_pages(order_by='model')
+        expected = sorted(
+            dbqueries.get_all_models(connection=self.connection),
+            key=lambda model: (model.model.lower(), model.id)
+            )
+        self.assertEqual(models, expected)
+
+    def test_pages_descending_with_null(self):
+        models, _ = self.read_pages(order_by='set', descending=True)
+        self.assertEqual(len({model.id for model in models}), 11)
+        self.assertIsNone(models[-1].set)
+
+    def test_pages_by_artist(self):
+        models, _ = self.read_pages(order_by='artist')
+        self.assertEqual(
+            [model.artist for model in models],
+            ['artist_0'] * 6 + ['artist_1'] * 5
+            )
+
+    def test_exact_last_page(self):
+        page, token = dbqueries.get_models_page(
+            connection=self.connection,
+            limit=11
+            )
+        self.assertEqual(len(page), 11)
+        self.assertIsNone(token)
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            dbqueries.get_models_page(
+                connection=self.connection,
+                order_by='Model_Name; DROP TABLE tblModel'
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import pathlib
+import unittest
+
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_search as dbsearch
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+def create_database():
+    connection = db.connect_database(database=':memory:')
+    with open(file=schema, mode='r') as sql:
+        connection.executescript(sql.read())
+    return connection
+
+
+class TestParseQuery(unittest.TestCase):
+    def test_terms(self):
+        self.assertEqual(
+            dbsearch.parse_query('artist:"Dragon Forge" Name:drag* -printed:yes gob'),
+            [
+                dbsearch.Term(field='artist', value='Dragon Forge'),
+                dbsearch.Term(field='model', value='drag', prefix=True),
+                dbsearch.Term(field='printed', value='yes', negated=True),
+                dbsearch.Term(field=None, value='gob'),
+                ]
+            )
+
+    def test_incomplete_query(self):
+        self.assertEqual(
+            dbsearch.parse_query('set: note:"half typed'),
+            [dbsearch.Term(field='source_note', value='half typed')]
+            )
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            dbsearch.parse_query('colour:red')
+
+    def test_invalid_flag(self):
+        with self.assertRaises(ValueError):
+            dbsearch.parse_query('printed:maybe')
+
+    def test_values_are_parameters(self):
+        sql, params = dbsearch.compile_query('set:"x\'; DROP TABLE tblModel; --"')
+        self.assertNotIn('DROP', sql)
+        self.assertIn('%x\'; DROP TABLE tblModel; --%', params.values())
+
+
+class TestSearchModels(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        for name in ('Dragon Forge', 'Wyvern Works'):
+            dbqueries.add_artist(
+                connection=self.connection,
+                artist=inv.Artist(0, name, '', '', '')
+                )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'Kickstarter', '')
+            )
+        for name, set_name, artist, supports, model_format, printed in (
+            ('Red Dragon', 'Wyrms', 'Wyvern Works', True, 'stl', False),
+            ('Knight', 'Dragon Slayers', 'Dragon Forge', True, 'STL, OBJ', False),
+            ('Goblin', 'Caves', 'Wyvern Works', False, 'stl', False),
+            ('Orc', '100%_Orcs', 'Dragon Forge', True, 'obj', True),
+            ):
+            dbqueries.add_model(
+                connection=self.connection,
+                model=inv.Model(0, name, set_name, artist, 'Kickstarter', '',
+                    supports, model_format, '', printed)
+                )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def search(self, query):
+        return [model.model for model in dbsearch.search_models(
+            connection=self.connection,
+            query=query
+            )]
+
+    def test_multiple_fields(self):
+        self.assertEqual(
+            self.search('printed:no supports:yes format:stl'),
+            ['Red Dragon', 'Knight']
+            )
+
+    def test_artist_name(self):
+        self.assertEqual(self.search('artist:"Dragon Forge"'), ['Knight', 'Orc'])
+        self.assertEqual(self.search('artist:Dragon'), [])
+        self.assertEqual(self.search('artist:Dragon*'), ['Knight', 'Orc'])
+
+    def test_names_ignore_case(self):
+        self.assertEqual(self.search('artist:"dragon forge"'), ['Knight', 'Orc'])
+        self.assertEqual(self.search('artist:drag*'), ['Knight', 'Orc'])
+        self.assertEqual(self.search('artist:DRAGON'), [])
+        self.assertEqual(len(self.search('source:kickstarter')), 4)
+        self.assertEqual(len(self.search('source:KICK*')), 4)
+
+    def test_prefix(self):
+        self.assertEqual(self.search('set:dragon*'), ['Knight'])
+        self.assertEqual(self.search('name:o*'), ['Orc'])
+
+    def test_negation(self):
+        self.assertEqual(self.search('-format:stl'), ['Orc'])
+        self.assertEqual(self.search('artist:"Wyvern Works" -dragon'), ['Goblin'])
+
+    def test_wildcards_are_literal(self):
+        self.assertEqual(self.search('set:%_'), ['Orc'])
+        self.assertEqual(self.search('set:_'), ['Orc'])
+
+    def test_words_with_fields(self):
+        self.assertEqual(
+            sorted(self.search('dragon printed:no')),
+            ['Knight', 'Red Dragon']
+            )
+        self.assertEqual(self.search('dragon -artist:"Dragon Forge"'), ['Red Dragon'])
+
+    def test_empty_query(self):
+        self.assertEqual(len(self.search('')), 4)
+
+    def test_limit(self):
+        models = dbsearch.search_models(
+            connection=self.connection,
+            query='format:stl',
+            limit=1
+            )
+        self.assertEqual(len(models), 1)
+
+    def test_artist_uses_index(self):
+        sql, params = dbsearch.compile_query('artist:dragon*')
+        plan = ' '.join(
+            row[3] for row in self.connection.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            )
+        self.assertIn('idxArtistNameNoCase', plan)
+
+
+class TestSearchModelColumns(unittest.TestCase):
+    def test_unknown_column(self):
+        connection = create_database()
+        with self.assertRaises(ValueError):
+            dbqueries.search_model(
+                connection=connection,
+                field='Model_Name = 1 OR 1',
+                search_text=''
+                )
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import pathlib
+import tempfile
+import unittest
+
+import jbs.database.database_connections as dbconnections
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+class TestDataSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = pathlib.Path(self.directory.name).joinpath('test.db')
+        self.connections = dbconnections.ConnectionManager(database=self.database)
+        with self.connections.writer() as connection:
+            db.modify_database_schema(connection=connection, sql_file=schema)
+            dbqueries.add_artist(
+                connection=connection,
+                artist=inv.Artist(0, 'test_artist', '', '', '')
+                )
+        self.snapshot = self.connections.snapshot
+
+    def tearDown(self):
+        self.connections.close()
+        self.directory.cleanup()
+
+    def get_artists(self):
+        with self.connections.reader() as connection:
+            return self.snapshot.get_artists(connection=connection)
+
+    def test_shared_until_changed(self):
+        first = self.get_artists()
+        second = self.get_artists()
+        self.assertIs(first, second)
+        self.assertEqual(
+            (self.snapshot.artists.misses, self.snapshot.artists.hits),
+            (1, 1)
+            )
+
+    def test_reloaded_after_write(self):
+        self.get_artists()
+        with self.connections.writer() as connection:
+            dbqueries.add_source(
+                connection=connection,
+                source=inv.Source(0, 'test_source', '')
+                )
+        self.get_artists()
+        self.assertEqual(self.snapshot.artists.misses, 2)
+
+    def test_reloaded_after_other_program_writes(self):
+        self.get_artists()
+        other = db.connect_database(database=self.database)
+        dbqueries.add_artist(
+            connection=other,
+            artist=inv.Artist(0, 'other_artist', '', '', '')
+            )
+        db.close_database(connection=other)
+        self.assertEqual(len(self.get_artists()), 2)
+
+    def test_model_store_rebuilt_after_write(self):
+        with self.connections.reader() as connection:
+            store = self.snapshot.get_model_store(connection=connection)
+            self.assertIs(self.snapshot.get_model_store(connection=connection), store)
+        self.assertEqual(len(store), 0)
+
+        with self.connections.writer() as connection:
+            dbqueries.add_source(
+                connection=connection,
+                source=inv.Source(0, 'test_source', '')
+                )
+            dbqueries.add_model(
+                connection=connection,
+                model=inv.Model(0, 'test_model', '', 'test_artist',
+                    'test_source', '', False, 'stl', '', False)
+                )
+        with self.connections.reader() as connection:
+            store = self.snapshot.get_model_store(connection=connection)
+        self.assertEqual([model.model for model in store.select()], ['test_model'])
+
+    def test_structured_query_uses_model_store(self):
+        with self.connections.writer() as connection:
+            dbqueries.add_source(
+                connection=connection,
+                source=inv.Source(0, 'test_source', '')
+                )
+            dbqueries.add_model(
+                connection=connection,
+                model=inv.Model(0, 'test_model', '', 'test_artist',
+                    'test_source', '', False, 'stl', '', False)
+                )
+        with self.connections.reader() as connection:
+            models = self.snapshot.search_models(
+                connection=connection,
+                query='format:stl printed:no'
+                )
+            self.assertEqual([model.model for model in models], ['test_model'])
+            self.assertEqual(self.snapshot.models.misses, 1)
+            self.snapshot.search_models(connection=connection, query='format:st*')
+            self.assertEqual(self.snapshot.models.misses, 1)
+            # Words without a field use the full-text index instead
+            models = self.snapshot.search_models(connection=connection, query='test')
+            self.assertEqual(len(models), 1)
+
+    def test_in_memory_uses_write_counter(self):
+        connections = dbconnections.ConnectionManager(database=':memory:')
+        version = connections.data_version()
+        self.assertEqual(connections.data_version(), version)
+        with connections.writer() as connection:
+            db.modify_database_schema(connection=connection, sql_file=schema)
+        self.assertNotEqual(connections.data_version(), version)
+        connections.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
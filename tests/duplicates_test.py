@@ -0,0 +1,197 @@
+import hashlib
+import os
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+import jbs.database.database_files as dbfiles
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.duplicates as duplicates
+import jbs.inventory as inv
+import jbs.scanner as scanner
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+LARGE = bytes(range(256)) * 800
+DECOY = LARGE[:100000] + b'x' + LARGE[100001:]
+
+
+class TestDuplicates(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.directory.name)
+        for name, contents in (
+            ('Dragon Forge/red_dragon.stl', LARGE),
+            ('Dragon Forge/knight.stl', b'knight'),
+            ('Dragon Forge/unique.zip', b'only one this size'),
+            ('Wyvern Works/Red Dragon/red_dragon_copy.stl', LARGE),
+            ('Wyvern Works/decoy.stl', DECOY),
+            ('Wyvern Works/knight.obj', b'knight'),
+            ('Wyvern Works/goblin.stl', b'goblin'),
+            ):
+            path = self.root.joinpath(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(contents)
+
+        self.connection = db.connect_database(database=':memory:')
+        with open(file=schema, mode='r') as sql:
+            self.connection.executescript(sql.read())
+        for name in ('Dragon Forge', 'Wyvern Works'):
+            dbqueries.add_artist(
+                connection=self.connection,
+                artist=inv.Artist(0, name, '', '', name)
+                )
+        self.scan()
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def scan(self):
+        scan = scanner.scan_artist_folders(
+            connection=self.connection,
+            root=self.root,
+            full=True
+            )
+        scanner.save_scan(connection=self.connection, scan=scan)
+
+    def hash(self):
+        hashing = duplicates.hash_model_files(connection=self.connection, workers=2)
+        return duplicates.save_hashing(connection=self.connection, hashing=hashing)
+
+    def duplicates(self):
+        return [
+            (duplicate.group, pathlib.Path(duplicate.path).name)
+            for duplicate in dbfiles.get_duplicates(connection=self.connection)
+            ]
+
+    def test_duplicates(self):
+        report = self.hash()
+        self.assertEqual(self.duplicates(), [
+            (1, 'red_dragon.stl'),
+            (1, 'red_dragon_copy.stl'),
+            (2, 'knight.stl'),
+            (2, 'knight.obj'),
+            ])
+        self.assertEqual((report.duplicates, report.wasted), (4, len(LARGE) + 6))
+
+    def test_only_partial_collisions_are_read_whole(self):
+        report = self.hash()
+        self.assertEqual(report.candidates, 6)
+        self.assertEqual(report.partial, 6)
+        # Small files are read whole by their partial hash
+        self.assertEqual(report.full, 3)
+        self.assertEqual(report.saved, 6)
+
+    def test_cached_hashes(self):
+        self.hash()
+        report = self.hash()
+        self.assertEqual((report.cached, report.partial, report.full), (6, 0, 0))
+        self.assertEqual(len(self.duplicates()), 4)
+
+    def test_changed_file_is_hashed_again(self):
+        self.hash()
+        path = self.root.joinpath('Wyvern Works', 'knight.obj')
+        path.write_bytes(b'Knight')
+        os.utime(path, ns=(1, 1))
+        self.scan()
+        self.assertEqual(len(self.duplicates()), 2)
+        report = self.hash()
+        self.assertEqual((report.cached, report.partial), (5, 1))
+        self.assertEqual(len(self.duplicates()), 2)
+
+    def test_changed_file_without_scan(self):
+        self.hash()
+        path = self.root.joinpath('Wyvern Works', 'knight.obj')
+        path.write_bytes(b'Knight')
+        os.utime(path, ns=(1, 1))
+        report = self.hash()
+        self.assertEqual((report.cached, report.partial), (5, 1))
+        self.assertEqual(len(self.duplicates()), 2)
+        self.assertEqual(
+            self.connection.execute(
+                'SELECT Hash_Modified FROM tblHash AS h '
+                'INNER JOIN tblFile AS f ON f.File_ID = h.File '
+                'WHERE f.File_Path = ?;',
+                (str(path),)
+                ).fetchone()[0],
+            1
+            )
+        # The scan that notices the change keeps the new hash
+        self.scan()
+        report = self.hash()
+        self.assertEqual((report.cached, report.partial), (6, 0))
+
+    def test_hash_without_connection(self):
+        candidates = dbfiles.get_hash_candidates(connection=self.connection)
+        self.connection.close()
+        hashing = duplicates.hash_files(candidates=candidates, workers=2)
+        self.connection = db.connect_database(database=':memory:')
+        self.assertEqual(len(hashing.hashes), 6)
+        self.assertEqual(hashing.report.duplicates, 4)
+
+    def test_removed_file(self):
+        self.hash()
+        self.root.joinpath('Dragon Forge', 'knight.stl').unlink()
+        self.scan()
+        self.assertEqual(len(self.duplicates()), 2)
+        self.assertEqual(
+            self.connection.execute('SELECT COUNT(*) FROM tblHash;').fetchone()[0],
+            5
+            )
+
+    def test_unreadable_file(self):
+        self.root.joinpath('Wyvern Works', 'goblin.stl').unlink()
+        report = self.hash()
+        self.assertEqual(report.error_count, 1)
+        self.assertEqual(len(self.duplicates()), 4)
+
+    def test_stop(self):
+        hashing = duplicates.hash_model_files(
+            connection=self.connection,
+            workers=1,
+            stop=lambda: True
+            )
+        self.assertLessEqual(len(hashing.hashes), duplicates.PARTIAL_BATCH_SIZE)
+        self.assertEqual(hashing.report.full, 0)
+
+
+class TestHashFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name).joinpath('model.zip')
+        self.path.write_bytes(LARGE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_streamed(self):
+        with unittest.mock.patch.object(duplicates, 'READ_SIZE', 1000):
+            self.assertEqual(
+                duplicates.hash_file(path=self.path),
+                hashlib.blake2b(LARGE).hexdigest()
+                )
+
+    def test_partial(self):
+        self.assertEqual(
+            duplicates.hash_file(path=self.path, partial=True),
+            hashlib.blake2b(
+                LARGE[:duplicates.PARTIAL_SIZE] + LARGE[-duplicates.PARTIAL_SIZE:]
+                ).hexdigest()
+            )
+
+    def test_small_partial_is_full(self):
+        self.path.write_bytes(b'solid')
+        self.assertEqual(
+            duplicates.hash_file(path=self.path, partial=True),
+            duplicates.hash_file(path=self.path)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+import jbs.database.database_cache as dbcache
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.importer as importer
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+class TestValidateRow(unittest.TestCase):
+    def test_model_row(self):
+        model = importer.validate_row(
+            record_type='model',
+            row={'Model': 'test_name', 'artist': 'test_artist',
+                'source': 'test_source', 'supports': 'yes', 'printed': '0'}
+            )
+        self.assertEqual(model.model, 'test_name')
+        self.assertTrue(model.supports)
+        self.assertFalse(model.printed)
+
+    def test_missing_artist(self):
+        with self.assertRaises(ValueError):
+            importer.validate_row(
+                record_type='model',
+                row={'model': 'test_name', 'source': 'test_source'}
+                )
+
+    def test_invalid_flag(self):
+        with self.assertRaises(ValueError):
+            importer.parse_flag('maybe')
+
+
+class TestImportFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+        self.connection = db.connect_database(database=':memory:')
+        db.modify_database_schema(connection=self.connection, sql_file=schema)
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_csv_creates_missing_artists(self):
+        data_file = self.path.joinpath('models.csv')
+        data_file.write_text(
+            'id,model,set,artist,source,source_note,supports,format,folder,'
+            'printed\n'
+            '1,Red Dragon,Wyrms,Dragon Forge,Kickstarter,,True,stl,,False\n'
+            '2,Knight,,Dragon Forge,Patreon,,False,stl,,True\n'
+            '3,,,Dragon Forge,Patreon,,False,stl,,True\n'
+            )
+        progress = []
+        report = importer.import_file(
+            connection=self.connection,
+            data_file=data_file,
+            record_type='model',
+            chunk_size=1,
+            progress=progress.append
+            )
+        self.assertEqual((report.rows, report.added), (3, 2))
+        self.assertEqual(report.created_artists, 1)
+        self.assertEqual(report.created_sources, 2)
+        self.assertEqual(report.errors, [(4, 'Missing model')])
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(
+            len(dbqueries.get_all_models(connection=self.connection)),
+            2
+            )
+
+    def test_names_resolved_once(self):
+        data_file = self.path.joinpath('models.csv')
+        data_file.write_text(
+            'model,artist,source\n'
+            + ''.join(f'Model {number},Artist {number % 3},Kickstarter\n'
+                for number in range(12))
+            )
+        cache = dbcache.LookupCache()
+        commits = []
+        self.connection.set_trace_callback(
+            lambda statement: commits.append(statement)
+                if statement == 'COMMIT' else None
+            )
+        with unittest.mock.patch.object(
+            dbqueries,
+            'get_artist_ids',
+            wraps=dbqueries.get_artist_ids
+            ) as get_artist_ids:
+            report = importer.import_file(
+                connection=self.connection,
+                data_file=data_file,
+                record_type='model',
+                chunk_size=4
+                )
+        self.assertEqual(get_artist_ids.call_count, 1)
+        self.assertEqual((report.added, report.created_artists), (12, 3))
+        # One commit per batch of models, artists and sources
+        self.assertEqual(len(commits), 3)
+
+        # The cache learns the new names instead of being read again
+        data_file.write_text('model,artist,source\nGoblin,Wyvern Works,Patreon\n')
+        report = importer.import_file(
+            connection=self.connection,
+            data_file=data_file,
+            record_type='model',
+            cache=cache
+            )
+        self.assertEqual(report.created_artists, 1)
+        self.assertIn('Wyvern Works', cache.artists.get_ids(connection=self.connection))
+        self.assertEqual(cache.artists.stats()['misses'], 1)
+
+    def test_jsonl_artists(self):
+        data_file = self.path.joinpath('artists.jsonl')
+        data_file.write_text(
+            '{"name": "Dragon Forge", "website": "example.com"}\n'
+            '\n'
+            'not json\n'
+            '{"name": "Wyvern Works"}\n'
+            )
+        report = importer.import_file(
+            connection=self.connection,
+            data_file=data_file,
+            record_type='artist'
+            )
+        self.assertEqual(report.added, 2)
+        self.assertEqual(report.errors, [(3, 'Line is not a JSON object')])
+
+
+if __name__ == '__main__':
+    unittest.main()
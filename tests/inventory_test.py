@@ -172,5 +172,38 @@ class TestFactory(unittest.TestCase):
         self.source = self.factory.createSource(self.source_data)
         self.assertIsInstance(self.source, inv.Source)
 
+class TestRecordTuple(unittest.TestCase):
+    def setUp(self):
+        self.result = inv.Model(
+            1, 'test_name', 'test_set', 'test_artist', 'test_source',
+            'test_source_note', True, 'test_format', 'test_folder', False
+            )
+
+    def test_astuple(self):
+        self.assertEqual(
+            self.result.astuple(),
+            (1, 'test_name', 'test_set', 'test_artist', 'test_source',
+                'test_source_note', True, 'test_format', 'test_folder', False)
+            )
+
+    def test_astuple_exclude(self):
+        self.assertEqual(
+            inv.Source(1, 'test_name', 'test_website').astuple(exclude='id'),
+            ('test_name', 'test_website')
+            )
+
+    def test_asdict(self):
+        self.assertEqual(
+            inv.Artist(1, 'test_name', '', '', '').asdict(),
+            {'id': 1, 'name': 'test_name', 'website': '', 'email': '',
+                'folder': ''}
+            )
+
+    def test_no_instance_dict(self):
+        self.result.astuple(exclude='id')
+        self.assertFalse(hasattr(self.result, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.result.exclude = 'id'
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
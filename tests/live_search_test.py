@@ -0,0 +1,249 @@
+import pathlib
+import unittest
+
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+import jbs.live_search as live_search
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+MODEL_FILTER = live_search.full_text_filter(
+    'model', 'set', 'source_note', 'format', 'artist', 'source'
+    )
+
+
+def create_database():
+    connection = db.connect_database(database=':memory:')
+    with open(file=schema, mode='r') as sql:
+        connection.executescript(sql.read())
+    return connection
+
+
+class FakeWidget:
+    """Records the callbacks scheduled with after."""
+    def __init__(self):
+        self.scheduled = {}
+        self.count = 0
+
+    def after(self, delay, func, *args):
+        self.count += 1
+        timer = f'after#{self.count}'
+        self.scheduled[timer] = (func, args)
+        return timer
+
+    def after_cancel(self, timer):
+        self.scheduled.pop(timer, None)
+
+    def run(self):
+        for func, args in list(self.scheduled.values()):
+            func(*args)
+        self.scheduled = {}
+
+
+class FakeExecutor:
+    """Runs submitted jobs straight away on one connection."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.cancelled = []
+
+    def submit(self, func, callback=None, error_callback=None, read_only=False,
+        **kwargs):
+        callback(func(connection=self.connection, **kwargs))
+        return None
+
+    def cancel(self, job):
+        self.cancelled.append(job)
+
+
+class TestSettings(unittest.TestCase):
+    def test_defaults(self):
+        self.assertEqual(
+            live_search.get_search_settings(),
+            live_search.DEFAULT_SEARCH_SETTINGS
+            )
+
+    def test_override(self):
+        settings = live_search.get_search_settings(settings={'delay': 100})
+        self.assertEqual(settings['delay'], 100)
+        self.assertTrue(settings['live'])
+
+    def test_invalid(self):
+        for settings in ({'delay': -1}, {'delay': 'fast'}, {'live': 'yes'},
+            {'debounce': 5}):
+            with self.assertRaises(ValueError):
+                live_search.get_search_settings(settings=settings)
+
+
+class TestFilters(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        dbqueries.add_artist(
+            connection=self.connection,
+            artist=inv.Artist(0, 'Dragon Forge', '', '', '')
+            )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'Kickstarter', '')
+            )
+        for name, set_name in (
+            ('Red Dragon', 'Wyrms'),
+            ('Knight_Captain', 'Dragon Slayers'),
+            ('Goblin Archer', 'Caves'),
+            ('Élan Vital', 'Cafés'),
+            ):
+            dbqueries.add_model(
+                connection=self.connection,
+                model=inv.Model(0, name, set_name, 'Dragon Forge', 'Kickstarter',
+                    '', False, 'stl', '', False)
+                )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_full_text_filter_agrees_with_database(self):
+        models = dbqueries.get_all_models(connection=self.connection)
+        for term in ('dra', 'red dra', 'cap', 'elan', 'cafe', 'kick gob', 'zzz'):
+            expected = dbqueries.full_text_search_models(
+                connection=self.connection,
+                search_text=term
+                )
+            filtered = [model for model in models if MODEL_FILTER(model, term)]
+            self.assertEqual(
+                sorted(model.id for model in filtered),
+                sorted(model.id for model in expected),
+                term
+                )
+
+    def test_like_filter_agrees_with_database(self):
+        models = dbqueries.get_all_models(connection=self.connection)
+        matches = live_search.like_filter('model')
+        for term in ('DRAG', 'n a', 'élan', 'ÉLAN'):
+            expected = dbqueries.search_model(
+                connection=self.connection,
+                field='Model_Name',
+                search_text=term
+                )
+            filtered = [model for model in models if matches(model, term)]
+            self.assertEqual(
+                [model.id for model in filtered],
+                [model.id for model in expected],
+                term
+                )
+
+    def test_full_text_narrows(self):
+        self.assertTrue(live_search.full_text_narrows('dra', 'drag'))
+        self.assertTrue(live_search.full_text_narrows('dra', 'red dra'))
+        self.assertTrue(live_search.full_text_narrows('', 'red'))
+        self.assertFalse(live_search.full_text_narrows('drag', 'dra'))
+        self.assertFalse(live_search.full_text_narrows('red dra', 'dra'))
+        self.assertFalse(live_search.full_text_narrows('knight', 'knight_c'))
+
+    def test_like_narrows(self):
+        self.assertTrue(live_search.like_narrows('rag', 'Drag'))
+        self.assertFalse(live_search.like_narrows('drag', 'dra'))
+        self.assertFalse(live_search.like_narrows('dr', 'dr%n'))
+
+
+class TestLiveSearch(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_database()
+        dbqueries.add_artist(
+            connection=self.connection,
+            artist=inv.Artist(0, 'Wyvern Works', '', '', '')
+            )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'Kickstarter', '')
+            )
+        for name in ('Red Dragon', 'Green Dragon', 'Goblin'):
+            self.add_model(name=name)
+
+        self.widget = FakeWidget()
+        self.executor = FakeExecutor(connection=self.connection)
+        self.search = live_search.LiveSearch(
+            widget=self.widget,
+            executor=self.executor,
+            version=lambda: self.connection.total_changes
+            )
+        self.results = []
+
+    def tearDown(self):
+        self.connection.close()
+
+    def add_model(self, name):
+        dbqueries.add_model(
+            connection=self.connection,
+            model=inv.Model(0, name, '', 'Wyvern Works', 'Kickstarter', '',
+                False, 'stl', '', False)
+            )
+
+    def run_search(self, term):
+        return self.search.search(
+            key='All_Fields',
+            term=term,
+            func=dbqueries.full_text_search_models,
+            callback=self.show,
+            matches=MODEL_FILTER,
+            narrows=live_search.full_text_narrows,
+            search_text=term
+            )
+
+    def show(self, results):
+        self.results = sorted(model.model for model in results)
+
+    def test_refinement_reuses_results(self):
+        self.run_search(term='dr')
+        self.assertEqual(self.results, ['Green Dragon', 'Red Dragon'])
+        self.run_search(term='dr gre')
+        self.assertEqual(self.results, ['Green Dragon'])
+        self.assertEqual((self.search.queries, self.search.reused), (1, 1))
+
+    def test_broader_search_queries_again(self):
+        self.run_search(term='dragon')
+        self.run_search(term='g')
+        self.assertEqual(self.results, ['Goblin', 'Green Dragon'])
+        self.assertEqual(self.search.queries, 2)
+
+    def test_commit_invalidates_results(self):
+        self.run_search(term='dr')
+        self.add_model(name='Dragon Turtle')
+        self.run_search(term='dra')
+        self.assertEqual(
+            self.results,
+            ['Dragon Turtle', 'Green Dragon', 'Red Dragon']
+            )
+        self.assertEqual(self.search.queries, 2)
+
+    def test_schedule_debounces(self):
+        for term in ('g', 'go', 'gob'):
+            self.search.schedule(
+                key='All_Fields',
+                term=term,
+                run=lambda term=term: self.run_search(term=term)
+                )
+        self.assertEqual(len(self.widget.scheduled), 1)
+        self.widget.run()
+        self.assertEqual(self.results, ['Goblin'])
+        self.assertEqual(self.search.queries, 1)
+
+        # A key that doesn't change the text doesn't search again
+        self.search.schedule(
+            key='All_Fields',
+            term='gob',
+            run=lambda: self.run_search(term='gob')
+            )
+        self.assertEqual(self.widget.scheduled, {})
+
+    def test_cancel(self):
+        self.search.schedule(key='All_Fields', term='g', run=lambda: None)
+        self.search.cancel()
+        self.assertEqual(self.widget.scheduled, {})
+        self.assertIsNone(self.search.timer)
+
+
+if __name__ == '__main__':
+    unittest.main()
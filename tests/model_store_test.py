@@ -0,0 +1,158 @@
+import pathlib
+import unittest
+
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_search as dbsearch
+import jbs.database.database_utils as db
+import jbs.inventory as inv
+import jbs.model_store as model_store
+from jbs.model_store import field
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+MODELS = [
+    inv.Model(1, 'Red Dragon', 'Wyrms', 'Dragon Forge', 'Kickstarter', '',
+        True, 'stl', 'dragons', False),
+    inv.Model(2, 'Knight', 'Dragon Slayers', 'Dragon Forge', 'Patreon', 'May',
+        False, 'STL, OBJ', 'knights', False),
+    inv.Model(3, 'Goblin', 'Caves', 'Wyvern Works', 'Patreon', '',
+        True, 'obj', 'goblins', True),
+    inv.Model(4, 'Orc', None, 'Wyvern Works', 'Kickstarter', None,
+        True, 'stl', '', False),
+    ]
+
+
+class TestModelStore(unittest.TestCase):
+    def setUp(self):
+        self.store = model_store.ModelStore.from_models(MODELS)
+
+    def ids(self, where):
+        return self.store.select_ids(where=where)
+
+    def test_select_all(self):
+        self.assertEqual(self.store.select(), MODELS)
+        self.assertEqual(len(self.store), 4)
+
+    def test_flags(self):
+        self.assertEqual(self.ids(field('printed').equals(True)), [3])
+        self.assertEqual(self.ids(field('supports').equals(False)), [2])
+
+    def test_flag_words(self):
+        self.assertEqual(self.ids(field('printed').equals('no')), [1, 2, 4])
+        self.assertEqual(self.ids(field('printed').equals('Yes')), [3])
+        with self.assertRaises(ValueError):
+            self.ids(field('printed').equals('maybe'))
+
+    def test_starts_with(self):
+        self.assertEqual(self.ids(field('model').starts_with('o')), [4])
+        self.assertEqual(self.ids(field('model').starts_with('RED')), [1])
+        self.assertEqual(self.ids(field('set').starts_with('')), [1, 2, 3, 4])
+        self.assertEqual(self.ids(field('artist').starts_with('wyv')), [3, 4])
+
+    def test_text_contains(self):
+        self.assertEqual(self.ids(field('set').contains('dragon')), [2])
+        self.assertEqual(self.ids(field('model').contains('o')), [1, 3, 4])
+        self.assertEqual(self.ids(field('source_note').contains('')), [1, 2, 3, 4])
+
+    def test_encoded_columns(self):
+        self.assertEqual(self.ids(field('artist').equals('dragon forge')), [1, 2])
+        self.assertEqual(self.ids(field('format').contains('stl')), [1, 2, 4])
+        self.assertEqual(self.ids(field('source').equals('Nobody')), [])
+
+    def test_combined(self):
+        where = (field('printed').equals(False) & field('supports').equals(True)
+            & field('format').contains('stl'))
+        self.assertEqual(self.ids(where), [1, 4])
+        self.assertEqual(self.store.count(where), 2)
+
+        where = field('source').equals('Patreon') | field('model').equals('orc')
+        self.assertEqual(self.ids(where), [2, 3, 4])
+        self.assertEqual(self.ids(~field('format').contains('stl')), [3])
+
+    def test_limit(self):
+        self.assertEqual(
+            [model.id for model in self.store.select(limit=2)],
+            [1, 2]
+            )
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            field('colour')
+
+    def test_conditions_are_cached(self):
+        where = field('model').contains('o')
+        self.ids(where)
+        self.assertIn(where.key(), self.store.cache)
+
+    def test_empty_store(self):
+        store = model_store.ModelStore.from_models([])
+        self.assertEqual(store.select(where=field('printed').equals(False)), [])
+
+
+class TestLoad(unittest.TestCase):
+    def test_load_matches_queries(self):
+        connection = db.connect_database(database=':memory:')
+        with open(file=schema, mode='r') as sql:
+            connection.executescript(sql.read())
+        dbqueries.add_artist(
+            connection=connection,
+            artist=inv.Artist(0, 'Dragon Forge', '', '', '')
+            )
+        dbqueries.add_source(
+            connection=connection,
+            source=inv.Source(0, 'Kickstarter', '')
+            )
+        for name in ('Red Dragon', 'Goblin'):
+            dbqueries.add_model(
+                connection=connection,
+                model=inv.Model(0, name, '', 'Dragon Forge', 'Kickstarter', '',
+                    True, 'stl', '', False)
+                )
+
+        store = model_store.ModelStore.load(connection=connection)
+        self.assertEqual(
+            store.select(),
+            dbqueries.get_all_models(connection=connection)
+            )
+        connection.close()
+
+    def test_query_matches_database(self):
+        connection = db.connect_database(database=':memory:')
+        with open(file=schema, mode='r') as sql:
+            connection.executescript(sql.read())
+        for name in ('Dragon Forge', 'Wyvern Works'):
+            dbqueries.add_artist(
+                connection=connection,
+                artist=inv.Artist(0, name, '', '', '')
+                )
+        for name in ('Kickstarter', 'Patreon'):
+            dbqueries.add_source(
+                connection=connection,
+                source=inv.Source(0, name, '')
+                )
+        for model in MODELS:
+            dbqueries.add_model(connection=connection, model=model)
+
+        store = model_store.ModelStore.load(connection=connection)
+        for query in (
+            '',
+            'printed:no supports:yes format:stl',
+            'artist:"Dragon Forge" -set:dragon',
+            'artist:wyv* source:patreon',
+            'name:o* -printed:yes',
+            'note:may',
+            ):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    store.select(where=model_store.compile_query(query)),
+                    dbsearch.search_models(connection=connection, query=query)
+                    )
+        self.assertIsNone(model_store.compile_query('printed:no dragon'))
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import jbs.name_index as name_index
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = name_index.NameIndex(names=[
+            'Red Dragon Studio',
+            'dragon forge',
+            'Artisan Guild',
+            'Titan Forge',
+            'Arcane Minis',
+            ])
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(
+            self.index.matches(text='Dra'),
+            ['dragon forge', 'Red Dragon Studio']
+            )
+
+    def test_word_matches(self):
+        self.assertEqual(
+            self.index.matches(text='forge'),
+            ['dragon forge', 'Titan Forge']
+            )
+        self.assertEqual(
+            self.index.matches(text='dragon st'),
+            ['Red Dragon Studio']
+            )
+
+    def test_empty_text_lists_names_in_order(self):
+        self.assertEqual(
+            self.index.matches(text=''),
+            ['Arcane Minis', 'Artisan Guild', 'dragon forge', 'Red Dragon Studio', 'Titan Forge']
+            )
+
+    def test_limit(self):
+        self.assertEqual(self.index.matches(text='ar', limit=1), ['Arcane Minis'])
+        index = name_index.NameIndex(names=(f'Artist {n:04}' for n in range(5000)))
+        self.assertEqual(len(index.matches(text='artist', limit=20)), 20)
+
+    def test_find_ignores_case(self):
+        self.assertEqual(self.index.find(text=' titan forge '), 'Titan Forge')
+        self.assertIsNone(self.index.find(text='Titan'))
+
+    def test_add_and_remove(self):
+        self.index.add(name='Bard Works')
+        self.assertEqual(self.index.matches(text='wor'), ['Bard Works'])
+        self.assertEqual(self.index.find(text='bard works'), 'Bard Works')
+
+        self.index.remove(name='Bard Works')
+        self.index.remove(name='Not There')
+        self.assertEqual(self.index.matches(text='wor'), [])
+        self.assertIsNone(self.index.find(text='bard works'))
+        self.assertEqual(len(self.index), 5)
+
+    def test_rebuild(self):
+        self.index.rebuild(names=['Only One'])
+        self.assertEqual(self.index.matches(text=''), ['Only One'])
+        self.assertEqual(self.index.matches(text='one'), ['Only One'])
+
+
+if __name__ == '__main__':
+    unittest.main()
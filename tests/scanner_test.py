@@ -0,0 +1,332 @@
+import os
+import pathlib
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+import jbs.database.database_files as dbfiles
+import jbs.database.database_queries as dbqueries
+import jbs.database.database_utils as db
+import jbs.duplicates as duplicates
+import jbs.inventory as inv
+import jbs.scanner as scanner
+
+schema = pathlib.Path(__file__).resolve().parent.parent.joinpath(
+    'sql',
+    'empty_database.sql'
+    )
+
+
+class ScannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.directory.name)
+        for name in (
+            'Dragon Forge/Red_Dragon/red_dragon_body.stl',
+            'Dragon Forge/Red_Dragon/supported/red_dragon_body.lys',
+            'Dragon Forge/knight.OBJ',
+            'Dragon Forge/unknown.3mf',
+            'Dragon Forge/notes.txt',
+            'Wyvern Works/Goblin.zip',
+            ):
+            path = self.root.joinpath(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'solid')
+
+        self.connection = db.connect_database(database=':memory:')
+        with open(file=schema, mode='r') as sql:
+            self.connection.executescript(sql.read())
+        for name, folder in (
+            ('Dragon Forge', 'Dragon Forge'),
+            ('Wyvern Works', str(self.root.joinpath('Wyvern Works'))),
+            ('Missing', 'Nowhere'),
+            ('No Folder', ''),
+            ):
+            dbqueries.add_artist(
+                connection=self.connection,
+                artist=inv.Artist(0, name, '', '', folder)
+                )
+        dbqueries.add_source(
+            connection=self.connection,
+            source=inv.Source(0, 'Kickstarter', '')
+            )
+        for name, artist in (
+            ('Red Dragon', 'Dragon Forge'),
+            ('Knight', 'Dragon Forge'),
+            ('Goblin', 'Wyvern Works'),
+            ):
+            dbqueries.add_model(
+                connection=self.connection,
+                model=inv.Model(0, name, '', artist, 'Kickstarter', '',
+                    False, 'stl', '', False)
+                )
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def scan(self, workers=4, verify=False, stop=None, progress=None):
+        scan = scanner.scan_artist_folders(
+            connection=self.connection,
+            root=self.root,
+            verify=verify,
+            workers=workers,
+            stop=stop,
+            progress=progress
+            )
+        return scanner.save_scan(connection=self.connection, scan=scan)
+
+    def files(self):
+        return {
+            pathlib.Path(model_file.path).relative_to(self.root).as_posix():
+                (model_file.model, model_file.extension)
+            for model_file in dbfiles.get_files(connection=self.connection)
+            }
+
+
+class TestScanner(ScannerTestCase):
+    def test_scan(self):
+        report = self.scan()
+        self.assertEqual(self.files(), {
+            'Dragon Forge/Red_Dragon/red_dragon_body.stl': (1, 'STL'),
+            'Dragon Forge/Red_Dragon/supported/red_dragon_body.lys': (1, 'LYS'),
+            'Dragon Forge/knight.OBJ': (2, 'OBJ'),
+            'Dragon Forge/unknown.3mf': (None, '3MF'),
+            'Wyvern Works/Goblin.zip': (3, 'ZIP'),
+            })
+        self.assertEqual(
+            (report.folders, report.directories, report.files, report.linked),
+            (2, 4, 5, 4)
+            )
+        self.assertEqual(report.added, 5)
+        self.assertEqual(report.error_count, 1)
+        self.assertEqual(
+            [model_file.extension for model_file in dbfiles.get_model_files(
+                connection=self.connection,
+                model_id=1
+                )],
+            ['STL', 'LYS']
+            )
+
+    def test_rescan(self):
+        self.scan()
+        self.root.joinpath('Dragon Forge', 'unknown.3mf').unlink()
+        changed = self.root.joinpath('Wyvern Works', 'Goblin.zip')
+        changed.write_bytes(b'a larger file')
+        report = self.scan(workers=1)
+        self.assertEqual(
+            (report.added, report.updated, report.removed),
+            (0, 1, 1)
+            )
+        self.assertEqual(len(self.files()), 4)
+
+        report = self.scan()
+        self.assertEqual(
+            (report.added, report.updated, report.removed),
+            (0, 0, 0)
+            )
+
+    def test_deleted_model_unlinks_files(self):
+        self.scan()
+        dbqueries.delete_models_bulk(connection=self.connection, model_ids=[3])
+        self.assertEqual(self.files()['Wyvern Works/Goblin.zip'], (None, 'ZIP'))
+
+    def test_stopped_scan_keeps_files(self):
+        self.scan()
+        scan = scanner.scan_artist_folders(
+            connection=self.connection,
+            root=self.root,
+            stop=lambda: True
+            )
+        report = scanner.save_scan(connection=self.connection, scan=scan)
+        self.assertEqual(report.removed, 0)
+        self.assertEqual(len(self.files()), 5)
+
+    def test_walk_without_connection(self):
+        state = scanner.read_scan_state(connection=self.connection, root=self.root)
+        reader = self.connection
+        self.connection = db.connect_database(database=':memory:')
+        reader.close()
+        scan = scanner.walk_artist_folders(state=state)
+        self.assertEqual(scan.report.files, 5)
+        self.assertEqual(scan.report.linked, 4)
+
+    def test_links_are_not_followed(self):
+        try:
+            os.symlink(self.root, self.root.joinpath('Dragon Forge', 'loop'))
+        except (OSError, NotImplementedError):
+            self.skipTest("Links are not supported")
+        self.assertEqual(self.scan().files, 5)
+
+
+class TestIncrementalScan(ScannerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.age()
+        self.scan()
+
+    def age(self, hours=1):
+        # Directories changed in the last couple of seconds are always
+        # read again, so they are made older
+        past = (int(time.time()) - 3600 * hours) * 10**9
+        past -= past % (3600 * 10**9)
+        for directory in [self.root, *self.root.rglob('*')]:
+            if directory.is_dir():
+                os.utime(directory, ns=(past, past))
+
+    def test_unchanged_directories_are_skipped(self):
+        report = self.scan()
+        self.assertEqual((report.directories, report.skipped), (0, 4))
+        self.assertEqual(
+            (report.added, report.updated, report.removed),
+            (0, 0, 0)
+            )
+        self.assertEqual(len(self.files()), 5)
+
+    def test_only_changed_directories_are_read(self):
+        self.root.joinpath('Dragon Forge', 'Red_Dragon', 'red_dragon_wing.stl').write_bytes(b'solid')
+        self.root.joinpath('Wyvern Works', 'Goblin.zip').unlink()
+        report = self.scan()
+        self.assertEqual((report.directories, report.skipped), (2, 2))
+        self.assertEqual(
+            (report.added, report.updated, report.removed),
+            (1, 0, 1)
+            )
+        self.assertEqual(
+            self.files()['Dragon Forge/Red_Dragon/red_dragon_wing.stl'],
+            (1, 'STL')
+            )
+        self.assertNotIn('Wyvern Works/Goblin.zip', self.files())
+
+    def test_deleted_directory(self):
+        supported = self.root.joinpath('Dragon Forge', 'Red_Dragon', 'supported')
+        supported.joinpath('red_dragon_body.lys').unlink()
+        supported.rmdir()
+        report = self.scan()
+        self.assertEqual(report.removed, 1)
+        self.assertEqual(len(self.files()), 4)
+        self.assertNotIn(
+            str(supported),
+            dbfiles.get_directories(connection=self.connection)
+            )
+
+    def test_changed_in_place_needs_verify(self):
+        knight = self.root.joinpath('Dragon Forge', 'knight.OBJ')
+        knight.write_bytes(b'a new knight')
+        self.age()
+        report = self.scan()
+        self.assertEqual((report.skipped, report.updated), (4, 0))
+
+        report = self.scan(verify=True)
+        self.assertEqual((report.directories, report.skipped), (1, 3))
+        self.assertEqual(report.updated, 1)
+
+        # Same size, only the modification time tells them apart
+        knight.write_bytes(b'a old knight')
+        os.utime(knight, ns=(1, 1))
+        self.age()
+        self.assertEqual(self.scan(verify=True).updated, 1)
+        self.assertEqual(self.scan(verify=True).updated, 0)
+
+    def test_failed_subdirectory_is_read_again(self):
+        orc = self.root.joinpath('Dragon Forge', 'Orc')
+        orc.mkdir()
+        orc.joinpath('orc.stl').write_bytes(b'solid')
+        self.age(hours=2)
+        read_directory = scanner.read_directory
+        failures = [str(orc)]
+
+        def flaky(directory, extensions):
+            if directory in failures:
+                failures.remove(directory)
+                raise PermissionError(13, 'Permission denied')
+            return read_directory(directory, extensions)
+
+        with unittest.mock.patch.object(scanner, 'read_directory', flaky):
+            self.assertEqual(self.scan().error_count, 2)
+        self.assertNotIn('Dragon Forge/Orc/orc.stl', self.files())
+
+        report = self.scan()
+        self.assertEqual(report.added, 1)
+        self.assertIn('Dragon Forge/Orc/orc.stl', self.files())
+        self.assertEqual(self.scan().directories, 0)
+
+    def test_stopped_before_subdirectory(self):
+        orc = self.root.joinpath('Dragon Forge', 'Orc')
+        orc.mkdir()
+        orc.joinpath('orc.stl').write_bytes(b'solid')
+        self.age(hours=2)
+        reports = []
+        self.scan(
+            workers=1,
+            progress=reports.append,
+            stop=lambda: bool(reports) and reports[-1].directories > 0
+            )
+        self.assertNotIn('Dragon Forge/Orc/orc.stl', self.files())
+
+        self.assertEqual(self.scan().added, 1)
+        self.assertIn('Dragon Forge/Orc/orc.stl', self.files())
+
+    def test_full_scan(self):
+        report = scanner.save_scan(
+            connection=self.connection,
+            scan=scanner.scan_artist_folders(
+                connection=self.connection,
+                root=self.root,
+                full=True
+                )
+            )
+        self.assertEqual((report.directories, report.skipped), (4, 0))
+
+    def test_small_batches(self):
+        self.root.joinpath('Dragon Forge', 'Orc').mkdir()
+        self.root.joinpath('Dragon Forge', 'Orc', 'orc.stl').write_bytes(b'solid')
+        scan = scanner.scan_artist_folders(connection=self.connection, root=self.root)
+        added, updated, removed = dbfiles.save_directories(
+            connection=self.connection,
+            directories=scan.directories,
+            deleted=scan.deleted,
+            roots=scan.roots,
+            batch_size=1
+            )
+        self.assertEqual((added, updated, removed), (1, 0, 0))
+        self.assertEqual(len(self.files()), 6)
+
+    def test_artist_folder_moved(self):
+        self.connection.execute(
+            "UPDATE tblArtist SET Artist_Folder = 'Dragon Forge/Red_Dragon' "
+            "WHERE Artist_Name = 'Dragon Forge';"
+            )
+        self.connection.commit()
+        report = self.scan()
+        self.assertEqual(report.removed, 2)
+        self.assertEqual(len(self.files()), 3)
+
+
+class TestScanSettings(unittest.TestCase):
+    def test_defaults(self):
+        self.assertEqual(
+            scanner.get_scan_settings(settings={'workers': 2}),
+            {
+                'root': '',
+                'workers': 2,
+                'hash_workers': duplicates.HASH_WORKERS,
+                'verify': False
+                }
+            )
+
+    def test_invalid(self):
+        for settings in (
+            {'workers': 0}, {'workers': '4'}, {'hash_workers': 0}, {'depth': 1},
+            {'root': 1}, {'verify': 1}
+            ):
+            with self.assertRaises(ValueError):
+                scanner.get_scan_settings(settings=settings)
+
+    def test_normalize_name(self):
+        self.assertEqual(scanner.normalize_name('Red_Dragon--v2 '), 'red dragon v2')
+
+
+if __name__ == '__main__':
+    unittest.main()
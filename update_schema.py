@@ -2,29 +2,116 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import os
+import argparse
+import logging
+import pathlib
 import sys
 
+# jbs.logging is imported to create the root logger before the other
+# modules are imported otherwise they get a different root logger.
+import jbs.logging
 import jbs.config as config
+import jbs.database.database_migrations as dbmigrations
 import jbs.database.database_utils as db
 
-scriptpath = os.path.dirname(os.path.realpath(sys.argv[0])) + os.sep
-default_database = scriptpath + "3D_Models.db"
-sql_update = scriptpath + 'sql' + os.sep +'update_database.sql'
-default_config = scriptpath + "config.json"
-
-def main():
-    if os.path.exists(default_database):
-        connection = db.connect_database(default_database)
-        db.modify_database_schema(connection, sql_update)
-        db.close_database(connection)
-    elif os.path.exists(default_config):
-        configuration = config.get_config(default_config)
-        connection = db.connect_database(configuration['database'])
-        db.modify_database_schema(connection, sql_update)
-        db.close_database(connection)
+scriptpath = pathlib.Path(__file__).resolve().parent
+
+default_database = scriptpath.joinpath('3D_Models.db')
+default_config = scriptpath.joinpath('config.json')
+sql_migrations = scriptpath.joinpath('sql', 'migrations')
+
+
+def print_progress(
+    migration: dbmigrations.Migration,
+    copied: int,
+    total: int
+    ) -> None:
+    print(
+        f"\r{migration.version} {migration.name}: {copied} of {total} rows copied",
+        end='',
+        flush=True
+        )
+
+
+def main() -> None:
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.NOTSET)
+
+    parser = argparse.ArgumentParser(
+        description="Apply the schema migrations a database doesn't have yet."
+        )
+    parser.add_argument(
+        '-n', '--dry-run',
+        action='store_true',
+        help="Only list the migrations that would be applied"
+        )
+    parser.add_argument(
+        '-t', '--target',
+        type=int,
+        help="Schema version to stop at, the latest if not given"
+        )
+    parser.add_argument(
+        '-c', '--chunk-size',
+        type=int,
+        default=dbmigrations.REBUILD_CHUNK_SIZE,
+        help="Rows copied per transaction when a table is rebuilt"
+        )
+    parser.add_argument(
+        '-d', '--database',
+        type=pathlib.Path,
+        help="Database to update"
+        )
+    args = parser.parse_args()
+
+    configuration = {}
+    if default_config.exists():
+        configuration = config.get_config(config_file=default_config)
+
+    if args.database:
+        database = args.database
+    elif default_database.exists():
+        database = default_database
+    elif 'database' in configuration:
+        database = configuration['database']
     else:
         print("No Database Found")
+        sys.exit(1)
+
+    logger.info(f"Updating the schema of {database}")
+    connection = db.connect_database(
+        database=database,
+        settings=configuration.get('sqlite')
+        )
+    version = dbmigrations.get_schema_version(connection=connection)
+    print(f"Database schema is version {version}")
+    try:
+        migrations = dbmigrations.migrate(
+            connection=connection,
+            directory=sql_migrations,
+            dry_run=args.dry_run,
+            target=args.target,
+            chunk_size=args.chunk_size,
+            progress=print_progress
+            )
+    except (OSError, ValueError) as e:
+        logger.error(e)
+        print(e)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        # Only the chunk being copied is lost, the rest is committed
+        connection.rollback()
+        print("\nPaused, run again to continue the update")
+        sys.exit(1)
+    finally:
+        db.close_database(connection=connection)
+
+    if any(migration.rebuild_table() for migration in migrations):
+        print()
+    for migration in migrations:
+        action = "Would apply" if args.dry_run else "Applied"
+        print(f"{action} {migration.version} {migration.name}")
+    if not migrations:
+        print("Database schema is up to date")
 
 if __name__ == '__main__':
     main()